@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# bench_io_sim.py
+#
+# 시뮬레이터 백엔드(io/lib/hal.py)로 센서 루프 + 거리 필터 + LED(I2C) 갱신을 가상 시간으로 돌리기
+# - 실행: python3 benchmarks/bench_io_sim.py [--seconds 60] [--i2c-latency 0.0005] [--i2c-failure 0.01]
+# - 가상 시계라서 실제로 기다리지 않고, seed가 같으면 결과도 같다 (라즈베리파이/CI 어디서나 비교 가능)
+# - 센서마다 차가 들어왔다 나가는 거리 변화를 주고, 센서당 측정 속도, 점유 이벤트, I2C 쓰기/실패 수 출력
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'io', 'lib'))
+
+import hal  # noqa: E402
+
+
+def run(args):
+    backend = hal.SimBackend(seed=args.seed, echo_delay=args.echo_delay, echo_loss_rate=args.echo_loss,
+                             i2c_latency=args.i2c_latency, i2c_failure_rate=args.i2c_failure)
+    hal.set_backend(backend)
+
+    import sensor
+    import actuator
+    from distance_filter import DistancePipeline
+
+    if args.busy_wait:
+        sensor.use_busy_wait()
+
+    clock = backend.clock
+    gpio = backend.gpio
+    bus = backend.i2c(1)
+    stop_event = threading.Event()
+
+    # 센서 i는 period초마다 차가 들어왔다(distance 10cm) 나간다(120cm), 센서마다 위상을 어긋나게
+    def scenario(index):
+        phase = (clock.monotonic() + index * args.period / sensor.SENSOR_COUNT) % args.period
+        return 10.0 if phase < args.period / 2 else 120.0
+
+    def on_state(index, occupied):
+        if occupied:
+            actuator.turn_on_led(index)
+        else:
+            actuator.turn_off_led(index)
+
+    pipeline = DistancePipeline(sensor.SENSOR_COUNT, args.threshold, on_state=on_state)
+
+    def feed(index, distance):
+        pipeline.feed(index, distance)
+        for sensor_index, trig_pin in enumerate(sensor.trig_pins):
+            gpio.set_distance(trig_pin, scenario(sensor_index))
+        if clock.monotonic() >= args.seconds:
+            stop_event.set()
+
+    started = time.perf_counter()
+    sensor.measure_parallel(feed, stop_event=stop_event)
+    real = time.perf_counter() - started
+
+    virtual = clock.monotonic()
+    return {
+        'backend': 'busy' if args.busy_wait else 'edge',
+        'virtual_s': round(virtual, 3),
+        'real_s': round(real, 3),
+        'rates_hz': sensor.ranging_stats.rates(),
+        'timeouts': sum(sensor.ranging_stats.timeouts),
+        'readings': pipeline.readings(),
+        'state_events': pipeline.state_events,
+        'expected_state_events': int(virtual / args.period * 2 * sensor.SENSOR_COUNT),
+        'i2c_writes': len(bus.writes),
+        'i2c_failures': bus.failures,
+        'gpio_inputs': gpio.inputs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="시뮬레이터 백엔드로 센서/LED 루프 가상 시간 벤치마크")
+    parser.add_argument('--seconds', type=float, default=60.0, help="가상 시간 (초)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--period', type=float, default=10.0, help="센서마다 차가 들어왔다 나가는 주기 (초)")
+    parser.add_argument('--threshold', type=float, default=30.0, help="점유 판정 거리 (cm)")
+    parser.add_argument('--echo-delay', type=float, default=0.0005, help="트리거 후 에코 시작까지 (초)")
+    parser.add_argument('--echo-loss', type=float, default=0.0, help="에코가 안 돌아올 확률")
+    parser.add_argument('--i2c-latency', type=float, default=0.0005, help="I2C 쓰기 한 번 (초)")
+    parser.add_argument('--i2c-failure', type=float, default=0.0, help="I2C 쓰기 실패 확률")
+    parser.add_argument('--busy-wait', action='store_true', help="엣지 콜백 대신 바쁜 대기로 측정")
+    parser.add_argument('--json', help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    result = run(args)
+    for key, value in result.items():
+        print(f"{key:>22}: {value}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"결과 저장: {args.json}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# bench_ultrasonic.py
+#
+# 라즈베리파이 없이 io/lib/sensor.py 초음파 측정 백엔드 비교 (엣지 콜백 vs 바쁜 대기)
+# - 실행: python3 benchmarks/bench_ultrasonic.py [--distances 5,30,100,300] [--readings 200]
+# - io/lib/hal.py 시뮬레이터 백엔드(실제 시간을 따르는 시계)로 sensor.py를 import 한다
+# - 측정 하나당 CPU 시간과 벽시계 시간, 거리 오차(평균/표준편차/p99) 출력
+# - --schedule 초: 센서 5개를 따로 시뮬레이션 (이웃 센서끼리 간섭)해서 측정 스케줄별 센서당 측정 속도와 오차 비교
+#   (차례로 measure_thread / pinmap 묶음 measure_parallel / 전부 한 번에 쏘는 묶음)
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'io', 'lib'))
+
+import hal  # noqa: E402
+
+
+def import_sensor():
+    """실제 시간 시뮬레이터 백엔드로 sensor.py import (CPU 시간이 실제 대기 방식대로 나오도록)"""
+    backend = hal.SimBackend(realtime=True)
+    hal.set_backend(backend)
+
+    import sensor
+    return sensor, backend.gpio
+
+
+def bench_backend(sensor, gpio, backend, distance, readings, interval):
+    if backend == 'edge':
+        if not sensor.use_edge_detection():
+            raise RuntimeError("엣지 검출 설정 실패")
+    else:
+        sensor.use_busy_wait()
+
+    trig_pin, echo_pin = sensor.trig_pins[0], sensor.echo_pins[0]
+    gpio.set_distance(trig_pin, distance)
+    values = []
+    cpu = wall = 0.0
+    for _ in range(readings):
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        value = sensor.measure_distance(trig_pin, echo_pin)
+        wall += time.perf_counter() - wall_start
+        cpu += time.process_time() - cpu_start
+        values.append(value)
+        time.sleep(interval)
+
+    values = np.array(values, dtype=np.float64)
+    valid = values[values >= 0]
+    errors = valid - distance
+    return {
+        'backend': backend,
+        'distance_cm': distance,
+        'readings': readings,
+        'timeouts': int(readings - len(valid)),
+        'cpu_ms': round(cpu / readings * 1000, 3),
+        'wall_ms': round(wall / readings * 1000, 3),
+        'cpu_ratio': round(cpu / wall, 2) if wall else 0.0,
+        'error_mean_cm': round(float(errors.mean()), 2) if len(errors) else None,
+        'error_std_cm': round(float(errors.std()), 2) if len(errors) else None,
+        'error_p99_cm': round(float(np.percentile(np.abs(errors), 99)), 2) if len(errors) else None,
+    }
+
+
+def setup_sensors(sensor, gpio, distances, crosstalk_distance):
+    """센서마다 TRIG/ECHO 쌍과 거리 설정, 이웃 센서(인덱스 ±1)끼리는 crosstalk_distance 만에 초음파가 닿는다"""
+    for trig_pin, echo_pin, distance in zip(sensor.trig_pins, sensor.echo_pins, distances):
+        gpio.pair_echo(trig_pin, echo_pin, distance)
+    for index in range(sensor.SENSOR_COUNT - 1):
+        gpio.add_crosstalk(sensor.trig_pins[index], sensor.echo_pins[index + 1], crosstalk_distance)
+        gpio.add_crosstalk(sensor.trig_pins[index + 1], sensor.echo_pins[index], crosstalk_distance)
+
+
+def bench_schedule(sensor, name, run, distances, seconds):
+    """run(callback, stop_event)를 seconds초 돌려서 센서별 측정 속도와 오차"""
+    values = [[] for _ in range(sensor.SENSOR_COUNT)]
+
+    def callback(index, distance):
+        values[index].append(distance)
+
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run, args=(callback, stop_event), daemon=True)
+    started = time.perf_counter()
+    thread.start()
+    time.sleep(seconds)
+    stop_event.set()
+    thread.join()
+    elapsed = time.perf_counter() - started
+
+    rates = [len(readings) / elapsed for readings in values]
+    errors = np.concatenate([np.abs(np.array(readings) - distance)
+                             for readings, distance in zip(values, distances) if readings])
+    return {
+        'schedule': name,
+        'rates_hz': [round(rate, 1) for rate in rates],
+        'min_rate_hz': round(min(rates), 1),
+        'error_p50_cm': round(float(np.percentile(errors, 50)), 2),
+        'error_max_cm': round(float(errors.max()), 2),
+        'bad_readings': int(np.count_nonzero(errors > 5.0)),  # 5cm 넘게 틀린 측정 (간섭/타임아웃)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="초음파 측정 백엔드 CPU/지터 벤치마크")
+    parser.add_argument('--distances', default='5,30,100,300', help="가상 거리 목록 (cm)")
+    parser.add_argument('--readings', type=int, default=200, help="거리/백엔드마다 측정 횟수")
+    parser.add_argument('--interval', type=float, default=0.002, help="측정 사이 쉬는 시간 (초)")
+    parser.add_argument('--schedule', type=float, help="스케줄 비교를 스케줄마다 이 시간(초) 동안 실행")
+    parser.add_argument('--sensor-distances', default='40,55,70,85,100', help="--schedule 센서별 거리 (cm)")
+    parser.add_argument('--crosstalk', type=float, default=45.0, help="--schedule 이웃 센서 초음파가 닿는 거리 (cm)")
+    parser.add_argument('--json', help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    sensor, gpio = import_sensor()
+
+    results = []
+    print(f"{'backend':>8} {'cm':>6} {'cpu ms':>8} {'wall ms':>8} {'cpu/wall':>8} "
+          f"{'err mean':>9} {'err std':>8} {'err p99':>8} {'timeout':>7}")
+    for distance in (float(v) for v in args.distances.split(',')):
+        for backend in ('busy', 'edge'):
+            result = bench_backend(sensor, gpio, backend, distance, args.readings, args.interval)
+            results.append(result)
+            print(f"{backend:>8} {distance:>6.0f} {result['cpu_ms']:>8.3f} {result['wall_ms']:>8.3f} "
+                  f"{result['cpu_ratio']:>8.2f} {result['error_mean_cm']:>9.2f} {result['error_std_cm']:>8.2f} "
+                  f"{result['error_p99_cm']:>8.2f} {result['timeouts']:>7}")
+
+    if args.schedule:
+        distances = [float(v) for v in args.sensor_distances.split(',')]
+        setup_sensors(sensor, gpio, distances, args.crosstalk)
+        sensor.use_edge_detection()
+        schedules = [
+            ('sequential', lambda cb, stop: sensor.measure_thread(0.01, cb, stop_event=stop)),
+            ('groups', lambda cb, stop: sensor.measure_parallel(cb, stop_event=stop)),
+            ('all-at-once', lambda cb, stop: sensor.measure_parallel(
+                cb, groups=[list(range(sensor.SENSOR_COUNT))], stop_event=stop)),
+        ]
+        print()
+        print(f"스케줄 비교 (묶음 {sensor.SENSOR_FIRE_GROUPS}, 최소 재발사 {sensor.SENSOR_MIN_REFIRE * 1000:.0f}ms)")
+        print(f"{'schedule':>12} {'min Hz':>7} {'err p50':>8} {'err max':>8} {'bad':>5}  센서별 Hz")
+        for name, run in schedules:
+            result = bench_schedule(sensor, name, run, distances, args.schedule)
+            results.append(result)
+            print(f"{name:>12} {result['min_rate_hz']:>7.1f} {result['error_p50_cm']:>8.2f} "
+                  f"{result['error_max_cm']:>8.2f} {result['bad_readings']:>5}  {result['rates_hz']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"결과 저장: {args.json}")
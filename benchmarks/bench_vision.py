@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# bench_vision.py
+#
+# 카메라/라즈베리파이 없이 ParkingTracker 비전 파이프라인 성능 측정
+# - 실행: python3 benchmarks/bench_vision.py [--resolutions 640x360,1280x720] [--cars 0,5,20]
+# - 단계별 (detect, process, draw, run) 프레임/초, p50/p99 프레임 지연, 최대 메모리 출력
+# - 배경은 저장소의 image.jpg, 차량은 색상 사각형을 주차장 영역 안에 격자로 그려 넣는다
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parking_tracker import ParkingTracker  # noqa: E402
+from parking.gpio_stub import StubGPIO  # noqa: E402
+from parking.sources import FrameSource  # noqa: E402
+
+# BGR 색상 (color_ranges의 각 색상 안에 들어가는 값)
+CAR_COLORS = [(0, 0, 255), (255, 0, 0), (0, 165, 255), (0, 255, 255)]
+
+
+class SyntheticSource(FrameSource):
+    """미리 만든 프레임 목록을 돌려가며 내보내는 소스"""
+
+    def __init__(self, frames, **kwargs):
+        super().__init__(**kwargs)
+        self.frames = frames
+
+    def _read_frame(self):
+        return True, self.frames[self.frames_read % len(self.frames)].copy()
+
+
+def parking_area_for(width, height):
+    """setup_default_parking_area와 같은 중앙 영역"""
+    margin_x, margin_y = width // 4, height // 4
+    return [(margin_x, margin_y), (width - margin_x, margin_y),
+            (width - margin_x, height - margin_y), (margin_x, height - margin_y)]
+
+
+def make_frames(background, width, height, car_count, frame_count=8):
+    """주차장 영역 안에 car_count대의 차량을 격자로 배치, 프레임마다 조금씩 이동"""
+    base = cv2.resize(background, (width, height), interpolation=cv2.INTER_AREA)
+    area = parking_area_for(width, height)
+    x0, y0 = area[0]
+    x1, y1 = area[2]
+
+    columns = max(int(np.ceil(np.sqrt(car_count))), 1)
+    rows = max(int(np.ceil(car_count / columns)), 1)
+    cell_w = (x1 - x0) // columns
+    cell_h = (y1 - y0) // rows
+    car_w = max(int(cell_w * 0.5), 4)
+    car_h = max(int(cell_h * 0.5), 4)
+
+    frames = []
+    for f in range(frame_count):
+        frame = base.copy()
+        shift = f * max(width // 640, 1)
+        for i in range(car_count):
+            cx = x0 + (i % columns) * cell_w + cell_w // 4 + shift
+            cy = y0 + (i // columns) * cell_h + cell_h // 4
+            cv2.rectangle(frame, (cx, cy), (cx + car_w, cy + car_h), CAR_COLORS[i % len(CAR_COLORS)], -1)
+        frames.append(frame)
+    return frames
+
+
+def make_tracker(frames, options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker = ParkingTracker(headless=True, source=SyntheticSource(frames), gpio=StubGPIO())
+    height, width = frames[0].shape[:2]
+    tracker.parking_area = parking_area_for(width, height)
+    tracker.save_interval = 10 ** 9  # 벤치마크 중에는 저장하지 않음
+    tracker.headless_delay = 0
+    tracker.processing_scale = options.scale
+    tracker.refine_full_resolution = options.refine
+    tracker.detect_interval = options.detect_interval
+    tracker.motion_gating = options.motion_gate
+    return tracker
+
+
+def summarize(latencies, peak_bytes):
+    latencies = np.asarray(latencies)
+    total = latencies.sum()
+    return {
+        'fps': len(latencies) / total if total > 0 else float('inf'),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'peak_mb': peak_bytes / 1e6,
+    }
+
+
+def measure(step, count):
+    """step(i)을 count번 돌린 프레임별 지연과, 한 번 더 돌린 구간의 최대 추가 메모리"""
+    for i in range(min(count, 5)):  # 캐시/버퍼 준비
+        step(i)
+
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        step(i)
+        latencies.append(time.perf_counter() - start)
+
+    # tracemalloc은 느리므로 시간 측정과 따로 돌린다
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(min(count, 20)):
+        step(i)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return summarize(latencies, peak)
+
+
+def bench_stages(frames, options):
+    results = {}
+
+    tracker = make_tracker(frames, options)
+    results['detect'] = measure(lambda i: tracker.detect_cars_by_color(frames[i % len(frames)]), options.frames)
+
+    tracker = make_tracker(frames, options)
+    results['process'] = measure(lambda i: tracker.process_frame(frames[i % len(frames)], i / 30.0), options.frames)
+
+    tracker = make_tracker(frames, options)
+    # process_frame 결과는 링 버퍼라 프레임 수만큼 보관하려면 복사한다
+    detections = [tracker.process_frame(frame, i / 30.0).copy() for i, frame in enumerate(frames)]
+    results['draw'] = measure(
+        lambda i: tracker.draw_interface(frames[i % len(frames)].copy(), detections[i % len(frames)]),
+        options.frames)
+
+    results['run'] = bench_run(frames, options)
+    return results
+
+
+def bench_run(frames, options):
+    """run() 루프 전체 (헤드리스, 경고/콘솔 출력 포함), 출력 간격을 프레임 지연으로 본다"""
+    tracker = make_tracker(frames, options)
+    tracker.pipelined = options.pipeline
+    tracker.cap.max_frames = options.frames
+
+    stamps = []
+    handle_output = tracker.handle_output
+
+    def timed_output(*args):
+        keep_running = handle_output(*args)
+        stamps.append(time.perf_counter())
+        return keep_running
+
+    tracker.handle_output = timed_output
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    if not stamps:
+        return summarize([float('inf')], peak)
+    return summarize(np.diff([start] + stamps), peak)
+
+
+def parse_resolution(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ParkingTracker 비전 파이프라인 벤치마크")
+    parser.add_argument('--resolutions', default='640x360,1280x720,1920x1080')
+    parser.add_argument('--cars', default='0,4,16,48', help="프레임당 차량 수 목록")
+    parser.add_argument('--frames', type=int, default=100, help="단계별 측정 프레임 수")
+    parser.add_argument('--image', default=os.path.join(ROOT, 'image.jpg'), help="배경 이미지")
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--refine', action='store_true')
+    parser.add_argument('--detect-interval', type=int, default=1)
+    parser.add_argument('--motion-gate', action='store_true')
+    parser.add_argument('--pipeline', action='store_true', help="run 단계를 파이프라인 모드로 측정")
+    parser.add_argument('--json', help="결과를 JSON 파일로 저장")
+    options = parser.parse_args()
+
+    background = cv2.imread(options.image)
+    if background is None:
+        print(f"배경 이미지를 읽을 수 없다: {options.image}")
+        return 1
+
+    rows = []
+    print(f"{'resolution':>10} {'cars':>5} {'stage':>8} {'fps':>9} {'p50 ms':>8} {'p99 ms':>8} {'peak MB':>8}")
+    for resolution in options.resolutions.split(','):
+        width, height = parse_resolution(resolution)
+        for car_count in (int(c) for c in options.cars.split(',')):
+            frames = make_frames(background, width, height, car_count)
+            for stage, result in bench_stages(frames, options).items():
+                print(f"{resolution:>10} {car_count:>5} {stage:>8} {result['fps']:>9.1f} "
+                      f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['peak_mb']:>8.2f}")
+                rows.append(dict(resolution=resolution, cars=car_count, stage=stage, **result))
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"결과 저장: {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# frame_bus.py
+#
+# 카메라를 한 프로세스만 열고, 프레임을 공유 메모리 프레임 버스(parking/framebus.py)로 내보낸다
+# - 실행: python3 camera/frame_bus.py [--name safepark] [--source 동영상/이미지/스트림 URL] [--slots 4]
+# - 소비자: python3 parking_tracker.py --source shm://safepark  (여러 프로세스가 동시에 붙을 수 있음)
+# - 소비자가 느려도 기다리지 않는다 (소비자는 최신 프레임으로 건너뜀)
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parking.camera import find_camera  # noqa: E402
+from parking.framebus import FrameBusWriter  # noqa: E402
+from parking.sources import open_source  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="공유 메모리 프레임 버스 송출")
+    parser.add_argument('--name', default='safepark', help="공유 메모리 이름 (소비자는 shm://이름)")
+    parser.add_argument('--source', help="카메라 대신 쓸 소스 (동영상, 이미지, 디렉토리, 스트림 URL)")
+    parser.add_argument('--fps', type=float, help="--source 재생 속도")
+    parser.add_argument('--slots', type=int, default=4, help="링 슬롯 수")
+    args = parser.parse_args()
+
+    if args.source:
+        cap = open_source(args.source, fps=args.fps)
+    else:
+        cap, _ = find_camera()
+    if cap is None or not cap.isOpened():
+        print("프레임 소스를 열 수 없다")
+        sys.exit(1)
+
+    ret, frame = cap.read()
+    if not ret:
+        print("첫 프레임을 읽을 수 없다")
+        sys.exit(1)
+
+    writer = FrameBusWriter(args.name, frame.shape, slots=args.slots)
+    print(f"프레임 버스 송출: shm://{args.name} {frame.shape[1]}x{frame.shape[0]}, 슬롯 {args.slots}개")
+    started = time.monotonic()
+    try:
+        while ret:
+            writer.publish(frame)
+            if writer.published % 300 == 0:
+                print(f"송출 {writer.published}프레임, {writer.published / (time.monotonic() - started):.1f} fps")
+            ret, frame = cap.read()
+        print("소스가 끝났다")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+        cap.release()
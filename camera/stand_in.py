@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# stand_in.py
+#
+# camera.sh (mjpg-streamer) 대신 쓰는 로컬 MJPEG over HTTP 송출기 (카메라 없이 네트워크 입력 시험용)
+# - 실행: python3 camera/stand_in.py [--source image.jpg] [--port 5000] [--fps 15]
+# - 수신: python3 parking_tracker.py --source "http://localhost:5000/?action=stream"
+# - 프레임마다 움직이는 사각형과 번호를 그려서 정지 화면이 아닌 스트림을 만든다
+# - 인코딩/송출은 parking/stream.py MjpegBroadcaster (한 번 인코딩해서 모든 클라이언트에 전송)
+# - RTP/H.264 송출은 h264udp/camera 또는 GStreamer로:
+#   gst-launch-1.0 videotestsrc ! x264enc tune=zerolatency ! rtph264pay pt=96 config-interval=1 ! udpsink host=127.0.0.1 port=5000
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parking.sources import open_source  # noqa: E402
+from parking.stream import MjpegBroadcaster  # noqa: E402
+
+
+def run(source, broadcaster, fps, animate=True):
+    """소스에서 읽은 프레임을 fps에 맞춰 송출기에 넘긴다 (클라이언트가 없으면 인코딩하지 않음)"""
+    interval = 1.0 / fps
+    next_time = time.monotonic()
+    sequence = 0
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            print("소스에서 프레임을 읽을 수 없다")
+            return
+
+        if animate:
+            height, width = frame.shape[:2]
+            x = int((sequence * 8) % max(width - 80, 1))
+            cv2.rectangle(frame, (x, height - 60), (x + 80, height - 20), (255, 255, 255), -1)
+            cv2.putText(frame, f"#{sequence}", (10, height - 30), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.8, (255, 255, 255), 2)
+        broadcaster.publish(frame)
+        sequence += 1
+
+        next_time += interval
+        delay = next_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_time = time.monotonic()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 MJPEG over HTTP 송출기 (camera.sh 대용)")
+    parser.add_argument('--source', default=os.path.join(ROOT, 'image.jpg'), help="이미지, 이미지 디렉토리 또는 동영상")
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--fps', type=float, default=15.0)
+    parser.add_argument('--quality', type=int, default=80, help="JPEG 품질")
+    parser.add_argument('--static', action='store_true', help="움직이는 표시 없이 원본 그대로 송출")
+    args = parser.parse_args()
+
+    source = open_source(args.source)
+    broadcaster = MjpegBroadcaster(jpeg_quality=args.quality)
+    broadcaster.serve_http(args.port)
+    print(f"MJPEG 송출: http://localhost:{args.port}/?action=stream ({args.fps}fps)")
+    try:
+        run(source, broadcaster, args.fps, animate=not args.static)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broadcaster.close()
+        source.release()
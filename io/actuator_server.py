@@ -1,6 +1,11 @@
 # actuator_server.py
+import os
 import socket
-import lib.actuator as actuator
+import sys
+
+# lib 모듈은 평평하게 import 한다 (io_server.py 참고)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib'))
+import actuator
 from portmap import ACTUATOR_SERVER_PORT
 
 def turn_on_led(led_index):
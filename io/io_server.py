@@ -1,12 +1,20 @@
 # io_server.py
 
+import os
+import sys
 import threading
 # FastAPI import
 from fastapi import FastAPI, HTTPException
 
+# lib 모듈은 서로 평평하게 import 하므로 (from pinmap import ...) lib 폴더를 경로에 넣고 같은 이름으로만 가져온다
+# (lib.sensor와 sensor처럼 두 이름으로 가져오면 모듈이 두 번 로드된다)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib'))
+
 # 액추에이터와 센서
 import actuator_server
-import lib.sensor as sensor
+import sensor
+from distance_filter import DistancePipeline
+from dht_sampler import DHTSampler
 
 # 포트 정보
 from portmap import IO_SERVER_PORT
@@ -18,6 +26,7 @@ app = FastAPI()
 # 센서 ---------------------------------------
 # 거리 센서
 distance_data = {i: -1 for i in range(sensor.SENSOR_COUNT)}
+occupied_data = {i: False for i in range(sensor.SENSOR_COUNT)}
 distance_data_lock = threading.Lock() # 동시 접근하기 때문에 락 걸어줘야 함
 threshold_distance = 30  # 예시 거리 임계값
 
@@ -41,29 +50,44 @@ sensor_led_off_map = [
 ]
 
 
-# 센서 거리 측정 시 호출 될 콜백 함수
+# 필터 값이 바뀌었을 때 호출 될 콜백 함수 (원시 측정값은 distance_pipeline이 거름)
 def distance_callback(sensor_index, distance):
     # 값 업데이트
     with distance_data_lock:
         distance_data[sensor_index] = distance
 
+# 점유 상태가 바뀌었을 때 호출 될 콜백 함수 (히스테리시스 적용, 바뀔 때만 LED/I2C 갱신)
+# 센서마다 첫 유효 측정값에서도 한 번 불려서 부팅 직후 빈 칸 LED도 맞춰 둔다
+def occupancy_callback(sensor_index, occupied):
+    with distance_data_lock:
+        occupied_data[sensor_index] = occupied
+
     # 거리 임계값에 따라 LED 상태 변경
-    if distance < threshold_distance:
+    if occupied:
         # 해당 센서에 대응하는 LED를 켜고 끕니다.
         for led_index in sensor_led_on_map[sensor_index]:
             actuator_server.turn_on_led(led_index)
         for led_index in sensor_led_off_map[sensor_index]:
             actuator_server.turn_off_led(led_index)
     else:
-        # 해당 센서에 대응하는 LED를 켜고 끕니다.
-        for led_index in sensor_led_off_map[sensor_index]:
+        # 해당 센서에 대응하는 LED를 반대로 끄고 켭니다.
+        for led_index in sensor_led_on_map[sensor_index]:
             actuator_server.turn_off_led(led_index)
         for led_index in sensor_led_off_map[sensor_index]:
             actuator_server.turn_on_led(led_index)
 
-# 스레드
+# 센서별 중앙값/EMA 필터, 타임아웃/튀는 값 제거, 바뀔 때만 콜백
+distance_pipeline = DistancePipeline(
+    sensor.SENSOR_COUNT,
+    threshold_distance,
+    on_distance=distance_callback,
+    on_state=occupancy_callback,
+    hysteresis=5.0,
+)
+
+# 스레드 (pinmap의 SENSOR_FIRE_GROUPS 묶음 단위로 동시에 측정, 10초마다 센서별 측정 속도 출력)
 def distance_thread_func():
-    sensor.measure_distance(0.01, distance_callback)
+    sensor.measure_parallel(distance_pipeline.feed, report_interval=10)
 
 distance_thread = threading.Thread(target=distance_thread_func)
 distance_thread.start()
@@ -80,7 +104,40 @@ def get_sensor_distance(sensor_index: int):
         raise HTTPException(status_code=404, detail="Sensor not found")
     
     # 현재 거리 데이터 반환
-    return {"sensor_index": sensor_index, "distance": distance_data[sensor_index]}
+    with distance_data_lock:
+        return {
+            "sensor_index": sensor_index,
+            "distance": distance_data[sensor_index],
+            "occupied": occupied_data[sensor_index],
+        }
+
+# 센서별 실제 측정 속도 엔드포인트
+@app.get("/sensor/rates")
+def get_sensor_rates():
+    """
+    마지막 보고 이후 센서별 초당 측정 수를 조회합니다.
+    """
+    return {
+        "rates": sensor.ranging_stats.rates(),
+        "timeouts": sensor.ranging_stats.timeouts,
+        "readings": distance_pipeline.readings(),
+        "distance_events": distance_pipeline.distance_events,
+        "state_events": distance_pipeline.state_events,
+    }
+
+# 온습도 센서
+# 센서 읽기(재시도 포함 수 초)는 샘플러 스레드에서만, 엔드포인트는 캐시만 읽는다
+dht_sampler = DHTSampler()
+dht_sampler.start()
+
+# 온습도 엔드포인트 (캐시된 마지막 성공 값, age/stale과 시도/실패 횟수)
+# 기다릴 일이 없으므로 스레드 풀을 거치지 않도록 async
+@app.get("/sensor/dht")
+async def get_sensor_dht():
+    """
+    마지막으로 읽은 습도/온도를 조회합니다. (센서를 직접 읽지 않음)
+    """
+    return dht_sampler.latest()
 
 
 
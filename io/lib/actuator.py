@@ -1,16 +1,20 @@
 # actuator.py
-import RPi.GPIO as GPIO
 import time
-import smbus
+
+from hal import get_backend
 
 CONSOLE_PREFIX = "Actuator: "
 
+# 하드웨어 백엔드 (라즈베리파이 또는 시뮬레이터, hal.py 참고)
+hal = get_backend()
+GPIO = hal.gpio
+
 
 # LED ----------------------------------------------------------------
 LED_I2C_ADDRESS = 0x08 # 아두이노 LED I2C 주소
 MAX_LED_INDEX = 11  # 최대 LED 인덱스 (0부터 시작하므로 11은 12번째 LED)
 
-bus = smbus.SMBus(1)  # 라즈베리파이 GPIO2(SDA), GPIO3(SCL) 를 연결
+bus = hal.i2c(1)  # 라즈베리파이 GPIO2(SDA), GPIO3(SCL) 를 연결
 
 def turn_on_led(led_index):
     # 입력값 검증
@@ -20,7 +24,7 @@ def turn_on_led(led_index):
     
     print(f"{CONSOLE_PREFIX}LED {led_index} ON")
     try:
-        bus.write_byte(LED_I2C_ADDRESS, 0, [led_index, 1])
+        bus.write_i2c_block_data(LED_I2C_ADDRESS, 0, [led_index, 1])
     except Exception as e:
         print(f"{CONSOLE_PREFIX}Error turning on LED {led_index}: {e}")
 
@@ -32,7 +36,7 @@ def turn_off_led(led_index):
     
     print(f"{CONSOLE_PREFIX}LED {led_index} OFF")
     try:
-        bus.write_byte(LED_I2C_ADDRESS, 0, [led_index, 0])
+        bus.write_i2c_block_data(LED_I2C_ADDRESS, 0, [led_index, 0])
     except Exception as e:
         print(f"{CONSOLE_PREFIX}Error turning off LED {led_index}: {e}")
 
@@ -0,0 +1,121 @@
+# dht_sampler.py
+#
+# DHT22 온습도 백그라운드 샘플러
+# - 자기 스레드에서만 센서를 읽는다 (비트뱅잉/재시도가 수 초 걸려도 요청 처리나 초음파 루프를 막지 않음)
+# - 마지막으로 성공한 습도/온도를 시각과 함께 캐시, latest()는 락 없이 그 스냅샷을 돌려준다
+# - read_retry 대신 한 번씩 읽고 재시도는 여기서 (시도/실패/재시도 횟수를 셀 수 있도록)
+# - 실패를 (-1, -1) 같은 값으로 덮어쓰지 않는다: 값은 마지막 성공 그대로, age/stale로 오래됐는지 표시
+
+import threading
+
+from hal import get_backend
+from pinmap import DHT_PIN, DHT_INTERVAL, DHT_RETRY_DELAY, DHT_RETRIES, DHT_STALE_AFTER
+
+CONSOLE_PREFIX = "DHT: "
+
+# DHT22 측정 범위, 밖이면 잘못 읽은 값으로 보고 버림
+HUMIDITY_RANGE = (0.0, 100.0)
+TEMPERATURE_RANGE = (-40.0, 80.0)
+
+
+class DHTSampler:
+    def __init__(self, pin=DHT_PIN, interval=DHT_INTERVAL, retries=DHT_RETRIES,
+                 retry_delay=DHT_RETRY_DELAY, stale_after=DHT_STALE_AFTER, backend=None):
+        self.pin = pin
+        self.interval = interval        # 샘플링 주기 (초, 주기 시작 기준)
+        self.retries = retries          # 한 주기에서 읽기 시도 횟수
+        self.retry_delay = retry_delay  # 실패 후 다시 읽기까지 (초)
+        self.stale_after = stale_after  # 마지막 성공이 이보다 오래되면 stale (초)
+        self.hal = backend or get_backend()
+        self.clock = self.hal.clock
+
+        # 캐시 (한 번에 통째로 바꿔 끼우므로 읽는 쪽은 락이 필요 없다)
+        # (습도, 온도, 성공 시각 time(), 성공 시각 monotonic())
+        self._sample = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # 통계
+        self.attempts = 0       # 센서 읽기 시도
+        self.failures = 0       # 실패한 읽기 (응답 없음, 체크섬 오류, 범위 밖)
+        self.retried = 0        # 재시도한 횟수
+        self.failed_cycles = 0  # 모든 시도가 실패한 주기
+        self.samples = 0        # 성공한 주기
+
+    # 읽은 값이 쓸 만한지 (라이브러리는 실패하면 None, 가끔 범위 밖 값)
+    @staticmethod
+    def _valid(humidity, temperature):
+        if humidity is None or temperature is None:
+            return False
+        return (HUMIDITY_RANGE[0] <= humidity <= HUMIDITY_RANGE[1]
+                and TEMPERATURE_RANGE[0] <= temperature <= TEMPERATURE_RANGE[1])
+
+    # 한 주기: 성공할 때까지 retries번 시도, 성공하면 True
+    def sample_once(self):
+        for attempt in range(self.retries):
+            if attempt:
+                self.retried += 1
+                if self.clock.wait(self._stop_event, self.retry_delay):
+                    return False
+
+            self.attempts += 1
+            humidity, temperature = self.hal.read_dht_once(self.pin)
+            if self._valid(humidity, temperature):
+                self._sample = (round(humidity, 1), round(temperature, 1),
+                                self.clock.time(), self.clock.monotonic())
+                self.samples += 1
+                return True
+            self.failures += 1
+
+        self.failed_cycles += 1
+        return False
+
+    def run(self):
+        while not self._stop_event.is_set():
+            started = self.clock.monotonic()
+            self.sample_once()
+            wait = started + self.interval - self.clock.monotonic()
+            if wait > 0:
+                self.clock.wait(self._stop_event, wait)
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="dht-sampler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # 마지막으로 성공한 값과 메타데이터 (센서를 읽지 않음, 막히지 않음)
+    # 아직 성공한 적이 없으면 humidity/temperature는 None
+    def latest(self):
+        sample = self._sample
+        if sample is None:
+            humidity = temperature = timestamp = age = None
+            stale = True
+        else:
+            humidity, temperature, timestamp, measured = sample
+            age = round(self.clock.monotonic() - measured, 3)
+            stale = age > self.stale_after
+        return {
+            "humidity": humidity,
+            "temperature": temperature,
+            "timestamp": timestamp,
+            "age": age,
+            "stale": stale,
+            "attempts": self.attempts,
+            "failures": self.failures,
+            "retries": self.retried,
+            "failed_cycles": self.failed_cycles,
+            "samples": self.samples,
+        }
+
+    def report(self):
+        state = self.latest()
+        return (f"{CONSOLE_PREFIX}humidity {state['humidity']} temperature {state['temperature']} "
+                f"(age {state['age']}s, attempts {self.attempts}, failures {self.failures}, "
+                f"failed cycles {self.failed_cycles})")
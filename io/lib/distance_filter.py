@@ -0,0 +1,195 @@
+# distance_filter.py
+#
+# 초음파 센서 원시 측정값과 소비자(io_server 등) 사이의 필터 단계
+# - 센서별 최근 측정값 링 버퍼의 중앙값 + EMA로 지터 제거
+# - 타임아웃(-1), 측정 범위 밖 값, 갑자기 튀는 값은 버림 (같은 방향으로 계속 나오면 실제 변화로 받아들임)
+# - 점유 판정은 히스테리시스 (threshold 아래로 내려가면 점유, threshold + hysteresis 위로 올라가면 빈 칸)
+# - 콜백은 필터 값이 min_change 이상 바뀌었을 때, 점유 상태가 바뀌었을 때만 호출
+
+from collections import deque
+import threading
+
+CONSOLE_PREFIX = "DistanceFilter: "
+
+NO_READING = -1  # 측정값 없음 (타임아웃이 이어짐)
+
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class DistanceFilter:
+    def __init__(self, threshold, hysteresis=5.0, window=5, alpha=0.5,
+                 min_distance=2.0, max_distance=400.0, max_jump=50.0, jump_confirm=3,
+                 timeout_limit=5):
+        self.threshold = threshold          # 이 값(cm)보다 가까우면 점유
+        self.hysteresis = hysteresis        # 빈 칸으로 돌아가려면 threshold + hysteresis보다 멀어야 함
+        self.alpha = alpha                  # EMA 가중치 (1이면 중앙값 그대로)
+        self.min_distance = min_distance    # 측정 범위 (HC-SR04: 2 ~ 400cm), 밖이면 버림
+        self.max_distance = max_distance
+        self.max_jump = max_jump            # 중앙값에서 이만큼 넘게 튀면 버림
+        self.jump_confirm = jump_confirm    # 튄 값이 연속으로 이만큼 나오면 실제 변화로 보고 버퍼를 새로 시작
+        self.timeout_limit = timeout_limit  # 타임아웃이 연속으로 이만큼 나오면 측정값 없음 (빈 칸)
+
+        self._window = deque(maxlen=window)
+        self._jumps = []
+        self._timeouts = 0
+        self.value = NO_READING
+        self.occupied = False
+
+        # 통계
+        self.readings = 0
+        self.rejected = 0
+
+    def _median(self):
+        return median(self._window)
+
+    # 원시 측정값 하나 반영, 필터 값 반환 (NO_READING이면 측정값 없음)
+    def update(self, distance):
+        self.readings += 1
+
+        if distance < 0:
+            self.rejected += 1
+            self._timeouts += 1
+            if self._timeouts >= self.timeout_limit:
+                self._reset(NO_READING)
+            return self.value
+        self._timeouts = 0
+
+        if distance < self.min_distance or distance > self.max_distance:
+            self.rejected += 1
+            return self.value
+
+        if self._window and abs(distance - self._median()) > self.max_jump:
+            # 튄 값은 모아 두었다가 연속으로 jump_confirm개가 나오고 서로 비슷하면 새 위치로 받아들인다
+            # (흩어진 반사 잡음은 연속으로 튀어도 서로 다르므로 버리고 지금 버퍼 유지)
+            self._jumps.append(distance)
+            if len(self._jumps) < self.jump_confirm:
+                self.rejected += 1
+                return self.value
+            jumps = self._jumps
+            if not self._agree(jumps):
+                self._jumps = []
+                self.rejected += 1
+                return self.value
+            self._reset(NO_READING)
+            self._window.extend(jumps)
+        else:
+            self._jumps = []
+            self._window.append(distance)
+
+        center = self._median()
+        if self.value == NO_READING:
+            self.value = center
+        else:
+            self.value = self.alpha * center + (1 - self.alpha) * self.value
+
+        self._update_state()
+        return self.value
+
+    # 모아 둔 튄 값들이 모두 자기들 중앙값에서 max_jump 안에 있는지
+    def _agree(self, values):
+        center = median(values)
+        return all(abs(value - center) <= self.max_jump for value in values)
+
+    def _reset(self, value):
+        self._window.clear()
+        self._jumps = []
+        self.value = value
+        self._update_state()
+
+    def _update_state(self):
+        if self.value == NO_READING:
+            self.occupied = False
+        elif self.occupied:
+            if self.value > self.threshold + self.hysteresis:
+                self.occupied = False
+        elif self.value < self.threshold:
+            self.occupied = True
+
+
+# 센서 여러 개의 필터 묶음, sensor.measure_parallel / measure_thread 콜백 자리에 feed를 넘긴다
+# on_distance(index, distance): 필터 값이 min_change(cm) 이상 바뀌었을 때 (NO_READING 전환 포함)
+# on_state(index, occupied): 점유 상태가 바뀌었을 때, 그리고 센서마다 첫 유효 측정값에서 한 번
+#   (부팅 직후 빈 칸도 LED 등 출력 상태를 한 번은 맞춰 두도록, 재시작 전 남은 상태 정정)
+class DistancePipeline:
+    def __init__(self, count, threshold, on_distance=None, on_state=None, min_change=1.0, **filter_options):
+        self.filters = [DistanceFilter(threshold, **filter_options) for _ in range(count)]
+        self.on_distance = on_distance
+        self.on_state = on_state
+        self.min_change = min_change
+        self._published = [NO_READING] * count
+        self._state_published = [False] * count
+        self._lock = threading.Lock()
+
+        # 통계
+        self.distance_events = 0
+        self.state_events = 0
+
+    def feed(self, index, distance):
+        with self._lock:
+            sensor_filter = self.filters[index]
+            was_occupied = sensor_filter.occupied
+            value = sensor_filter.update(distance)
+
+            published = self._published[index]
+            if value == published:
+                distance_changed = False
+            elif value == NO_READING or published == NO_READING:
+                distance_changed = True
+            else:
+                distance_changed = abs(value - published) >= self.min_change
+            if distance_changed:
+                self._published[index] = value
+                self.distance_events += 1
+
+            state_changed = sensor_filter.occupied != was_occupied
+            if not self._state_published[index] and value != NO_READING:
+                self._state_published[index] = True
+                state_changed = True
+            if state_changed:
+                self.state_events += 1
+
+        # 콜백은 락 밖에서 (콜백이 I2C 등으로 느려도 다른 센서 입력을 막지 않도록)
+        if distance_changed and self.on_distance is not None:
+            self.on_distance(index, round(value, 2) if value != NO_READING else NO_READING)
+        if state_changed and self.on_state is not None:
+            self.on_state(index, sensor_filter.occupied)
+
+    def readings(self):
+        return sum(sensor_filter.readings for sensor_filter in self.filters)
+
+    def report(self):
+        readings = self.readings()
+        rejected = sum(sensor_filter.rejected for sensor_filter in self.filters)
+        return (f"{CONSOLE_PREFIX}readings {readings}, rejected {rejected}, "
+                f"distance events {self.distance_events}, state events {self.state_events}")
+
+
+# 테스트 실시
+if __name__ == "__main__":
+    # 흩어진 반사 잡음: 연속으로 튀어도 서로 다르면 출력이 움직이지 않아야 함
+    sensor_filter = DistanceFilter(threshold=30)
+    for distance in [100, 100, 100, 100, 100]:
+        sensor_filter.update(distance)
+    for distance in [300, 20, 250, 5, 380, 160, 300, 20, 250]:
+        assert sensor_filter.update(distance) == 100, (distance, sensor_filter.value)
+    assert not sensor_filter.occupied
+
+    # 같은 쪽으로 반복되는 변화는 jump_confirm개째에 받아들임
+    for count, distance in enumerate([20, 21, 20], 1):
+        value = sensor_filter.update(distance)
+        if count < sensor_filter.jump_confirm:
+            assert value == 100
+    assert abs(sensor_filter.value - 20) < 1 and sensor_filter.occupied
+
+    # 타임아웃이 이어지면 측정값 없음 (빈 칸)
+    for _ in range(sensor_filter.timeout_limit):
+        sensor_filter.update(NO_READING)
+    assert sensor_filter.value == NO_READING and not sensor_filter.occupied
+
+    print(f"{CONSOLE_PREFIX}tests passed")
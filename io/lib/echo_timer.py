@@ -0,0 +1,73 @@
+# echo_timer.py
+#
+# 초음파 에코 펄스를 ECHO 핀 엣지 콜백으로 재는 측정기
+# io 서비스(sensor.py)와 주차장 추적(parking/warning.py)이 같이 쓰는 유일한 구현
+# - 바쁜 대기 대신 이벤트를 기다리므로 에코를 기다리는 동안 CPU를 거의 쓰지 않는다
+# - 시각은 콜백 스레드에서 clock.perf_counter_ns()로 (단조, 고해상도) 찍고,
+#   콜백 지연은 두 엣지에 비슷하게 붙으므로 펄스 길이에서는 대부분 상쇄된다
+# - gpio는 RPi.GPIO 모듈이나 같은 함수를 가진 객체, clock은 hal의 시계 (기본은 실제 시계)
+
+import threading
+
+from hal import RealClock
+
+CONSOLE_PREFIX = "EchoEdgeTimer: "
+
+
+class EchoEdgeTimer:
+    # 엣지 검출을 못 쓰는 GPIO면 RuntimeError/AttributeError (attach는 None)
+    def __init__(self, gpio, echo_pin, clock=None):
+        self.gpio = gpio
+        self.echo_pin = echo_pin
+        self.clock = clock or RealClock()
+        self._edges = []
+        self._armed = False
+        self._done = threading.Event()
+        gpio.add_event_detect(echo_pin, gpio.BOTH, callback=self._on_edge)
+
+    # 엣지 검출을 못 쓰면 None (호출하는 쪽은 바쁜 대기로 측정)
+    @classmethod
+    def attach(cls, gpio, echo_pin, clock=None):
+        try:
+            return cls(gpio, echo_pin, clock)
+        except (RuntimeError, AttributeError) as e:
+            print(f"{CONSOLE_PREFIX}edge detection unavailable on pin {echo_pin} ({e}), using busy-wait")
+            return None
+
+    def _on_edge(self, channel):
+        now = self.clock.perf_counter_ns()
+        if not self._armed:
+            return
+        # 상승/하강은 핀 레벨로 구분한다. 상승 엣지를 기록하기 전의 하강 엣지
+        # (이전 측정의 남은 엣지, arm() 때 이미 HIGH였던 에코의 끝)는 버린다
+        if self.gpio.input(channel):
+            self._edges = [now]
+        elif self._edges:
+            self._edges.append(now)
+            self._armed = False
+            self._done.set()
+
+    # 트리거 전에 호출 (이후 상승 엣지와 그 뒤 하강 엣지를 기록)
+    def arm(self):
+        self._edges = []
+        self._done.clear()
+        self._armed = True
+
+    # 펄스가 끝날 때까지 deadline(clock.monotonic())까지 대기, 거리(cm) 반환 (타임아웃이면 None)
+    def wait(self, deadline):
+        if not self.clock.wait(self._done, max(deadline - self.clock.monotonic(), 0)):
+            self._armed = False
+            return None
+
+        pulse_start, pulse_end = self._edges[:2]
+        return round((pulse_end - pulse_start) / 1e9 * 17150, 2)
+
+    # trigger()로 TRIG 펄스를 낸 뒤 거리(cm) 측정, 타임아웃이면 None
+    def measure(self, trigger, timeout=0.1):
+        self.arm()
+        trigger()
+        return self.wait(self.clock.monotonic() + timeout)
+
+    def close(self):
+        self._armed = False
+        self.gpio.remove_event_detect(self.echo_pin)
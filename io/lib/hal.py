@@ -0,0 +1,500 @@
+# hal.py
+#
+# 하드웨어 추상화: GPIO(+PWM), I2C, DHT, 시계를 백엔드 하나로 묶는다
+# - PiBackend: 실제 라즈베리파이 라이브러리 (RPi.GPIO, smbus, Adafruit_DHT), 시계는 time 모듈
+# - SimBackend: 라즈베리파이 없이 도는 결정적 시뮬레이터
+#   가상 시계 위에서 초음파 에코 지연, I2C 지연, DHT 지연과 실패(확률, seed 고정)를 흉내 낸다
+# - 선택: 환경 변수 SAFEPARK_HAL=pi|sim|auto (기본 auto: RPi.GPIO가 없으면 sim)
+#   벤치마크/시험에서는 sensor/actuator를 import 하기 전에 set_backend(SimBackend(...))
+#
+# sensor.py / actuator.py 는 모듈의 GPIO 대신 backend.gpio, time 대신 backend.clock 을 쓴다
+# (clock은 time 모듈과 같은 이름의 함수 + 이벤트 대기용 wait)
+
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+CONSOLE_PREFIX = "HAL: "
+
+
+# 시계 ----------------------------------------------------------------
+
+# 실제 시계 (time 모듈 그대로)
+class RealClock:
+    monotonic = staticmethod(time.monotonic)
+    perf_counter = staticmethod(time.perf_counter)
+    perf_counter_ns = staticmethod(time.perf_counter_ns)
+    sleep = staticmethod(time.sleep)
+    time = staticmethod(time.time)  # 이름이 모듈을 가리므로 마지막에
+
+    # event가 set되거나 timeout(초)이 지날 때까지 대기
+    @staticmethod
+    def wait(event, timeout):
+        return event.wait(timeout)
+
+
+# 가상 시계
+# realtime=False: sleep/wait/advance를 호출할 때만 시간이 흐르고, 예약된 이벤트도 그 호출 안에서 실행된다
+#   (실제로 기다리지 않음, 한 스레드가 시계를 돌릴 때 결정적)
+# realtime=True: 실제 시간을 따라가고, 예약된 이벤트는 전용 시계 스레드 하나가 시각 순서대로 실행한다
+#   (RPi.GPIO 엣지 콜백 스레드처럼). sleep/wait는 실제로 기다리기만 하고 이벤트를 실행하지 않으므로
+#   다른 스레드(DHT 샘플러 등)가 기다리는 동안 초음파 엣지를 대신 실행하거나 순서를 뒤섞지 않는다
+class VirtualClock:
+    EPOCH = 1_700_000_000.0  # time()의 기준 (가상 모드)
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self._now = 0.0
+        self._real_start = time.monotonic()
+        self._events = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def monotonic(self):
+        if self.realtime:
+            return time.monotonic() - self._real_start
+        return self._now
+
+    def time(self):
+        if self.realtime:
+            return time.time()
+        return self.EPOCH + self._now
+
+    def perf_counter(self):
+        return self.monotonic()
+
+    def perf_counter_ns(self):
+        return int(round(self.monotonic() * 1e9))
+
+    # when(시계 시각)에 callback() 실행 예약
+    # 가상 모드는 시계를 돌리는 스레드에서, 실시간 모드는 시계 스레드에서 실행된다
+    def call_at(self, when, callback):
+        with self._cond:
+            heapq.heappush(self._events, (when, next(self._sequence), callback))
+            if self.realtime:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run_events, name="sim-clock", daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+
+    # 실시간 모드 시계 스레드: 예약된 이벤트를 시각이 되면 하나씩 실행
+    def _run_events(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._events:
+                        self._cond.wait()
+                        continue
+                    delay = self._events[0][0] - self.monotonic()
+                    if delay > 0:
+                        self._cond.wait(delay)
+                        continue
+                    _, _, callback = heapq.heappop(self._events)
+                    break
+            try:
+                callback()
+            except Exception as e:
+                print(f"{CONSOLE_PREFIX}clock event error: {e}")
+
+    def _pop_due(self, until):
+        with self._cond:
+            if self._events and self._events[0][0] <= until:
+                return heapq.heappop(self._events)
+        return None
+
+    def _next_event_time(self):
+        with self._cond:
+            return self._events[0][0] if self._events else None
+
+    # target 시각까지 시간을 보낸다 (가상 모드는 그 사이 예약된 이벤트를 순서대로 실행)
+    def advance_to(self, target):
+        if self.realtime:
+            delay = target - self.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            return
+        while True:
+            event = self._pop_due(target)
+            if event is None:
+                break
+            when, _, callback = event
+            self._now = max(self._now, when)
+            callback()
+        self._now = max(self._now, target)
+
+    def advance(self, seconds):
+        self.advance_to(self.monotonic() + seconds)
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.advance(seconds)
+
+    # event가 set되거나 timeout(초)이 지날 때까지 대기
+    def wait(self, event, timeout):
+        if self.realtime:
+            return event.wait(timeout)
+        deadline = self._now + timeout
+        while not event.is_set():
+            next_time = self._next_event_time()
+            if next_time is None or next_time > deadline:
+                self._now = max(self._now, deadline)
+                break
+            self.advance_to(next_time)
+        return event.is_set()
+
+
+# 시뮬레이터 장치 ----------------------------------------------------------------
+
+SPEED_OF_SOUND_HALF = 17150.0  # cm/s, 왕복 시간 -> 거리 (sensor.py 계산과 맞춤)
+
+
+# RPi.GPIO 흉내 (초음파 센서 TRIG/ECHO 쌍 시뮬레이션 포함)
+# 에코 엣지는 시계에 예약되어 콜백된다 (실시간 시계면 시계 스레드, 가상 시계면 시계를 돌리는 스레드)
+class SimGPIO:
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, clock, rng, echo_delay=0.0005, input_cost=2e-6, echo_loss_rate=0.0):
+        self.clock = clock
+        self.rng = rng
+        self.echo_delay = echo_delay          # 트리거 후 에코 시작까지 (초)
+        self.input_cost = input_cost          # input() 한 번에 흐르는 가상 시간 (바쁜 대기가 끝나도록)
+        self.echo_loss_rate = echo_loss_rate  # 에코가 안 돌아올 확률 (타임아웃)
+        self.mode = None
+        self.modes = {}
+        self.levels = {}
+        self.pwms = {}
+        self._edge_callbacks = {}
+        self._sensors = {}    # TRIG 핀 -> [ECHO 핀, 거리 cm (None이면 에코 없음)]
+        self._crosstalk = {}  # ECHO 핀 -> [(다른 센서 TRIG 핀, 그 초음파가 닿는 거리 cm), ...]
+        self._fired = {}      # TRIG 핀 -> 마지막 트리거 시각
+        self._pulses = {}     # ECHO 핀 -> (시작, 끝, 번호) 시계 시각
+        self._pulse_ids = itertools.count()
+        self._in_callback = False
+
+        # 통계
+        self.triggers = 0
+        self.inputs = 0
+
+    # 초음파 센서 등록 (trig_pin 트리거에 echo_pin이 distance(cm) 왕복 시간만큼 HIGH)
+    def pair_echo(self, trig_pin, echo_pin, distance=100.0):
+        self._sensors[trig_pin] = [echo_pin, distance]
+
+    def set_distance(self, trig_pin, distance):
+        self._sensors[trig_pin][1] = distance
+
+    # trig_pin 센서의 초음파가 echo_pin 센서에 distance(cm) 왕복 시간만큼 뒤에 닿는다
+    # (그 센서 펄스 중간에 닿으면 펄스가 그때 끝나서 측정값이 짧아짐)
+    def add_crosstalk(self, trig_pin, echo_pin, distance):
+        self._crosstalk.setdefault(echo_pin, []).append((trig_pin, distance))
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, mode, **kwargs):
+        self.modes[pin] = mode
+        self.levels.setdefault(pin, self.LOW)
+
+    def output(self, pin, value):
+        value = self.HIGH if value else self.LOW
+        # TRIG 핀이 HIGH -> LOW 로 떨어지면 트리거 펄스 끝
+        if self.levels.get(pin) == self.HIGH and value == self.LOW:
+            self._fire(pin)
+        self.levels[pin] = value
+
+    # trig_pin 트리거에 반응하는 [(ECHO 핀, 거리 cm), ...]
+    def _echo_targets(self, trig_pin):
+        if trig_pin in self._sensors:
+            return [tuple(self._sensors[trig_pin])]
+        return []
+
+    def _arrival(self, fired, distance):
+        return fired + self.echo_delay + distance / SPEED_OF_SOUND_HALF
+
+    def _fire(self, trig_pin):
+        targets = self._echo_targets(trig_pin)
+        now = self.clock.monotonic()
+        self._fired[trig_pin] = now
+
+        # 이 초음파가 이미 진행 중인 다른 센서 펄스를 먼저 끝낸다 (간섭)
+        for echo_pin, crosses in self._crosstalk.items():
+            pulse = self._pulses.get(echo_pin)
+            if pulse is None:
+                continue
+            for cross_trig, cross_distance in crosses:
+                arrival = self._arrival(now, cross_distance)
+                if cross_trig == trig_pin and pulse[0] < arrival < pulse[1]:
+                    self._set_pulse(echo_pin, pulse[0], arrival, pulse[2])
+
+        if not targets:
+            return
+        self.triggers += 1
+        for echo_pin, distance in targets:
+            self._pulses.pop(echo_pin, None)
+            if distance is None or (self.echo_loss_rate and self.rng.random() < self.echo_loss_rate):
+                continue
+
+            start = self._arrival(now, 0.0)
+            end = self._arrival(now, distance)
+            # 먼저 쏜 다른 센서 초음파가 펄스 중간에 닿으면 그때 끝난다
+            for cross_trig, cross_distance in self._crosstalk.get(echo_pin, ()):
+                other = self._fired.get(cross_trig)
+                if other is not None and cross_trig != trig_pin:
+                    arrival = self._arrival(other, cross_distance)
+                    if start < arrival < end:
+                        end = arrival
+
+            pulse_id = next(self._pulse_ids)
+            self._set_pulse(echo_pin, start, end, pulse_id)
+            if echo_pin in self._edge_callbacks:
+                self.clock.call_at(start, lambda pin=echo_pin, pulse_id=pulse_id: self._pulse_edge(pin, pulse_id, None))
+
+    # 펄스 (다시) 설정, 끝이 바뀌면 하강 엣지를 새로 예약 (이전 예약은 _pulse_edge에서 무시)
+    # 엣지는 콜백이 등록된 핀만 예약 (아무도 시계를 안 돌릴 때 쌓였다가 나중 측정에 섞이지 않도록)
+    def _set_pulse(self, echo_pin, start, end, pulse_id):
+        self._pulses[echo_pin] = (start, end, pulse_id)
+        if echo_pin in self._edge_callbacks:
+            self.clock.call_at(end, lambda: self._pulse_edge(echo_pin, pulse_id, end))
+
+    # 예약된 엣지 실행, 그 사이 펄스가 바뀌었거나 (새 트리거, 간섭, cleanup) 지워졌으면 무시
+    # end가 None이면 상승 엣지, 아니면 그 시각에 끝나는 하강 엣지
+    def _pulse_edge(self, pin, pulse_id, end):
+        pulse = self._pulses.get(pin)
+        if pulse is None or pulse[2] != pulse_id:
+            return
+        if end is None:
+            self._edge(pin, self.RISING)
+        elif end == pulse[1]:
+            self._edge(pin, self.FALLING)
+
+    def _edge(self, pin, edge):
+        registered = self._edge_callbacks.get(pin)
+        if registered is None:
+            return
+        wanted, callback = registered
+        if callback is not None and wanted in (edge, self.BOTH):
+            self._in_callback = True
+            try:
+                callback(pin)
+            finally:
+                self._in_callback = False
+
+    def input(self, pin):
+        self.inputs += 1
+        # 콜백 안에서 읽는 핀 레벨은 그 엣지 시각 그대로 (시계를 돌리면 이벤트 실행 중에 다른 이벤트가 끼어든다)
+        if self.input_cost and not self.clock.realtime and not self._in_callback:
+            self.clock.advance(self.input_cost)
+        if self.modes.get(pin) != self.IN:
+            return self.levels.get(pin, self.LOW)
+        pulse = self._pulses.get(pin)
+        if pulse is None:
+            return self.LOW
+        start, end, _ = pulse
+        return self.HIGH if start <= self.clock.monotonic() < end else self.LOW
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        if pin in self._edge_callbacks:
+            raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+        self._edge_callbacks[pin] = (edge, callback)
+
+    def remove_event_detect(self, pin):
+        self._edge_callbacks.pop(pin, None)
+
+    def PWM(self, pin, frequency):
+        pwm = SimPWM(self.clock, pin, frequency)
+        self.pwms[pin] = pwm
+        return pwm
+
+    def cleanup(self, *args):
+        self.modes.clear()
+        self.levels.clear()
+        self._edge_callbacks.clear()
+        self._sensors.clear()
+        self._crosstalk.clear()
+        self._fired.clear()
+        self._pulses.clear()
+
+
+class SimPWM:
+    def __init__(self, clock, pin, frequency):
+        self.clock = clock
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = None
+        self.history = []  # (가상 시각, 듀티)
+
+    def start(self, duty):
+        self.ChangeDutyCycle(duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = duty
+        self.history.append((self.clock.monotonic(), duty))
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.duty = None
+
+
+# smbus.SMBus 흉내 (쓰기마다 latency만큼 시간이 흐르고 failure_rate 확률로 OSError)
+class SimI2CBus:
+    def __init__(self, clock, rng, latency=0.0005, failure_rate=0.0):
+        self.clock = clock
+        self.rng = rng
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.writes = []      # (가상 시각, 주소, 레지스터, 데이터)
+        self.registers = {}   # (주소, 레지스터) -> 읽을 때 돌려줄 바이트 목록
+        self.failures = 0
+
+    def _transfer(self):
+        self.clock.sleep(self.latency)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            self.failures += 1
+            raise OSError(121, "Remote I/O error")
+
+    def write_i2c_block_data(self, address, register, data):
+        self._transfer()
+        self.writes.append((self.clock.monotonic(), address, register, list(data)))
+
+    def write_byte_data(self, address, register, value):
+        self.write_i2c_block_data(address, register, [value])
+
+    def read_i2c_block_data(self, address, register, length):
+        self._transfer()
+        data = list(self.registers.get((address, register), []))
+        return (data + [0] * length)[:length]
+
+    def close(self):
+        pass
+
+
+# Adafruit_DHT.read_retry 흉내 (읽기마다 latency, failure_rate 확률로 (None, None))
+class SimDHT:
+    def __init__(self, clock, rng, latency=0.005, failure_rate=0.0, humidity=45.0, temperature=22.0):
+        self.clock = clock
+        self.rng = rng
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.humidity = humidity
+        self.temperature = temperature
+        self.reads = 0
+        self.failures = 0
+
+    def read(self, pin):
+        self.reads += 1
+        self.clock.sleep(self.latency)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            self.failures += 1
+            return None, None
+        return self.humidity, self.temperature
+
+
+# 백엔드 ----------------------------------------------------------------
+
+class PiBackend:
+    name = 'pi'
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        self.gpio = GPIO
+        self.clock = RealClock()
+
+    def i2c(self, bus_number):
+        import smbus
+        return smbus.SMBus(bus_number)
+
+    def read_dht(self, pin):
+        import Adafruit_DHT
+        return Adafruit_DHT.read_retry(Adafruit_DHT.DHT22, pin)
+
+    # 재시도 없이 한 번만 읽기 (실패하면 (None, None)), 재시도 간격은 호출하는 쪽이 정한다
+    def read_dht_once(self, pin):
+        import Adafruit_DHT
+        return Adafruit_DHT.read(Adafruit_DHT.DHT22, pin)
+
+    # 시뮬레이터에 센서 배선을 알려주는 자리 (실제 하드웨어는 할 일 없음)
+    def register_ultrasonic(self, trig_pin, echo_pin):
+        pass
+
+
+class SimBackend:
+    name = 'sim'
+
+    def __init__(self, seed=0, realtime=False, echo_delay=0.0005, input_cost=2e-6, echo_loss_rate=0.0,
+                 default_distance=100.0, i2c_latency=0.0005, i2c_failure_rate=0.0,
+                 dht_latency=0.005, dht_failure_rate=0.0):
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock(realtime=realtime)
+        self.gpio = SimGPIO(self.clock, self.rng, echo_delay, input_cost, echo_loss_rate)
+        self.dht = SimDHT(self.clock, self.rng, dht_latency, dht_failure_rate)
+        self.default_distance = default_distance
+        self.i2c_latency = i2c_latency
+        self.i2c_failure_rate = i2c_failure_rate
+        self.buses = {}
+
+    def i2c(self, bus_number):
+        if bus_number not in self.buses:
+            self.buses[bus_number] = SimI2CBus(self.clock, self.rng, self.i2c_latency, self.i2c_failure_rate)
+        return self.buses[bus_number]
+
+    def read_dht(self, pin):
+        return self.dht.read(pin)
+
+    def read_dht_once(self, pin):
+        return self.dht.read(pin)
+
+    def register_ultrasonic(self, trig_pin, echo_pin):
+        if trig_pin not in self.gpio._sensors:
+            self.gpio.pair_echo(trig_pin, echo_pin, self.default_distance)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+# 현재 백엔드 (처음 호출할 때 SAFEPARK_HAL 환경 변수로 결정)
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _create_backend(os.environ.get('SAFEPARK_HAL', 'auto'))
+        return _backend
+
+
+# 백엔드 지정 (sensor/actuator를 import 하기 전에 호출)
+def set_backend(backend):
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _create_backend(name):
+    if name == 'sim':
+        print(f"{CONSOLE_PREFIX}using simulator backend")
+        return SimBackend(realtime=True)
+    if name == 'pi':
+        return PiBackend()
+    try:
+        return PiBackend()
+    except (ImportError, RuntimeError) as e:
+        print(f"{CONSOLE_PREFIX}RPi.GPIO unavailable ({e}), using simulator backend")
+        return SimBackend(realtime=True)
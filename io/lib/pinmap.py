@@ -26,5 +26,18 @@ ECHO_4 = 21
 TRIG_5 = 23
 ECHO_5 = 24
 
+# 동시에 쏴도 서로 에코가 섞이지 않는 센서 묶음 (센서 인덱스, 0부터)
+# 설치 위치에 맞춰 수정: 이웃한 칸의 센서는 다른 묶음에 둔다
+SENSOR_FIRE_GROUPS = [
+    [0, 2, 4],
+    [1, 3],
+]
+SENSOR_MIN_REFIRE = 0.06  # 같은 센서를 다시 쏘기까지 최소 간격 (초), 이전 에코 잔향 대기
+SENSOR_GROUP_GAP = 0.005  # 한 묶음 측정이 끝나고 다음 묶음을 쏘기까지 간격 (초)
+
 # DH22 (온습도)
-DHT_PIN = 4
\ No newline at end of file
+DHT_PIN = 4
+DHT_INTERVAL = 10.0     # 온습도 샘플링 주기 (초)
+DHT_RETRY_DELAY = 2.0   # 읽기 실패 후 다시 읽기까지 (초), DHT22는 2초에 한 번까지만 읽을 수 있다
+DHT_RETRIES = 3         # 한 주기에서 읽기 시도 횟수
+DHT_STALE_AFTER = 60.0  # 마지막 성공한 읽기가 이보다 오래되면 stale (초)
\ No newline at end of file
@@ -1,15 +1,22 @@
 # sensor.py
 
-import RPi.GPIO as GPIO
-import time
+from hal import get_backend
+from echo_timer import EchoEdgeTimer
 
 CONSOLE_PREFIX = "Sensor: "
 
+# 하드웨어 백엔드 (라즈베리파이 또는 시뮬레이터, hal.py 참고)
+# 측정 시각과 대기도 백엔드 시계로 (시뮬레이터에서는 가상 시계)
+hal = get_backend()
+GPIO = hal.gpio
+clock = hal.clock
+
 from pinmap import TRIG_1, ECHO_1
 from pinmap import TRIG_2, ECHO_2
 from pinmap import TRIG_3, ECHO_3
 from pinmap import TRIG_4, ECHO_4
 from pinmap import TRIG_5, ECHO_5
+from pinmap import SENSOR_FIRE_GROUPS, SENSOR_MIN_REFIRE, SENSOR_GROUP_GAP
 
 trig_pins = []
 trig_pins.append(TRIG_1)
@@ -34,41 +41,192 @@ GPIO.setmode(GPIO.BCM)
 for trig_pin, echo_pin in zip(trig_pins, echo_pins):
     GPIO.setup(trig_pin, GPIO.OUT)
     GPIO.setup(echo_pin, GPIO.IN)
+    hal.register_ultrasonic(trig_pin, echo_pin)
 
-# 한번 거리 측정
-def measure_distance(trig_pin, echo_pin):
-    # Pulse 생성
+# 10us 트리거 펄스
+def send_trigger(trig_pin):
     GPIO.output(trig_pin, True)
-    time.sleep(0.00001)
+    clock.sleep(0.00001)
     GPIO.output(trig_pin, False)
 
-    timeout = time.time() + 0.1
+
+# ECHO 핀별 엣지 측정기 (비어 있으면 바쁜 대기로 측정)
+echo_timers = {}
+
+# 모든 ECHO 핀에 엣지 검출 설정, 하나라도 실패하면 전부 해제하고 바쁜 대기 사용
+def use_edge_detection():
+    try:
+        for echo_pin in echo_pins:
+            if echo_pin not in echo_timers:
+                echo_timers[echo_pin] = EchoEdgeTimer(GPIO, echo_pin, clock)
+    except (RuntimeError, AttributeError) as e:
+        print(f"{CONSOLE_PREFIX}edge detection unavailable ({e}), using busy-wait")
+        use_busy_wait()
+        return False
+    return True
+
+# 엣지 검출 해제, 이후 측정은 바쁜 대기
+def use_busy_wait():
+    for timer in echo_timers.values():
+        timer.close()
+    echo_timers.clear()
+
+# 한번 거리 측정 (엣지 검출이 설정되어 있으면 엣지 콜백, 아니면 바쁜 대기)
+def measure_distance(trig_pin, echo_pin):
+    timer = echo_timers.get(echo_pin)
+    if timer is not None:
+        distance = timer.measure(lambda: send_trigger(trig_pin))
+        return -1 if distance is None else distance  # 타임아웃 오류
+    return measure_distance_busy_wait(trig_pin, echo_pin)
+
+# 한번 거리 측정 (ECHO 핀을 계속 읽는 바쁜 대기, 엣지 검출을 못 쓸 때)
+def measure_distance_busy_wait(trig_pin, echo_pin):
+    # Pulse 생성
+    send_trigger(trig_pin)
+
+    timeout = clock.time() + 0.1
 
     # Echo HIGH 대기
-    while GPIO.input(echo_pin) == 0 and time.time() < timeout:
+    while GPIO.input(echo_pin) == 0 and clock.time() < timeout:
         pass
-    if time.time() >= timeout:
+    if clock.time() >= timeout:
         return -1  # 타임아웃 오류
 
-    pulse_start = time.time()
+    pulse_start = clock.time()
 
     # Echo LOW 대기
-    while GPIO.input(echo_pin) == 1 and time.time() < timeout:
+    while GPIO.input(echo_pin) == 1 and clock.time() < timeout:
         pass
-    if time.time() >= timeout:
+    if clock.time() >= timeout:
         return -1  # 타임아웃 오류
 
-    pulse_end = time.time()
+    pulse_end = clock.time()
 
     pulse_duration = pulse_end - pulse_start
     distance = pulse_duration * 17150
     distance = round(distance, 2)
     return distance
 
+use_edge_detection()
+
+# 한 묶음의 센서를 동시에 쏘고 에코를 함께 기다림, [(센서 인덱스, 거리), ...] 반환
+# 에코 최대 길이는 약 38ms (물체 없음), 4m 거리면 약 23ms
+ECHO_TIMEOUT = 0.04
+
+def measure_group(indices, timeout=ECHO_TIMEOUT):
+    timers = [echo_timers.get(echo_pins[index]) for index in indices]
+    if any(timer is None for timer in timers):
+        return measure_group_busy_wait(indices, timeout)
+
+    for timer in timers:
+        timer.arm()
+    for index in indices:
+        send_trigger(trig_pins[index])
+    deadline = clock.monotonic() + timeout
+    distances = [(index, timer.wait(deadline)) for index, timer in zip(indices, timers)]
+    return [(index, -1 if distance is None else distance) for index, distance in distances]
+
+# 엣지 검출을 못 쓸 때: 묶음의 ECHO 핀들을 한 루프에서 번갈아 읽음
+def measure_group_busy_wait(indices, timeout=ECHO_TIMEOUT):
+    for index in indices:
+        send_trigger(trig_pins[index])
+
+    deadline = clock.perf_counter() + timeout
+    starts = {}
+    distances = {}
+    while len(distances) < len(indices):
+        now = clock.perf_counter()
+        if now >= deadline:
+            break
+        for index in indices:
+            if index in distances:
+                continue
+            level = GPIO.input(echo_pins[index])
+            if index not in starts:
+                if level == 1:
+                    starts[index] = now
+            elif level == 0:
+                distances[index] = round((now - starts[index]) * 17150, 2)
+
+    return [(index, distances.get(index, -1)) for index in indices]
+
+# 센서별 측정 횟수로 실제 측정 속도 (Hz) 계산
+class RangingStats:
+    def __init__(self, count):
+        self.count = count
+        self.reset()
+
+    def reset(self):
+        self.readings = [0] * self.count
+        self.timeouts = [0] * self.count
+        self.started = clock.monotonic()
+
+    def record(self, index, distance):
+        self.readings[index] += 1
+        if distance < 0:
+            self.timeouts[index] += 1
+
+    # 센서별 초당 측정 수 (reset 이후)
+    def rates(self):
+        elapsed = clock.monotonic() - self.started
+        if elapsed <= 0:
+            return [0.0] * self.count
+        return [round(readings / elapsed, 2) for readings in self.readings]
+
+    def report(self):
+        rates = ", ".join(f"{index}: {rate:.1f}Hz" for index, rate in enumerate(self.rates()))
+        timeouts = sum(self.timeouts)
+        return f"{CONSOLE_PREFIX}ranging rate {rates} (timeouts {timeouts})"
+
+ranging_stats = RangingStats(SENSOR_COUNT)
+
+# 묶음 설정 확인: 모든 센서가 정확히 한 묶음에 있어야 한다
+def check_fire_groups(groups):
+    indices = sorted(index for group in groups for index in group)
+    if indices != list(range(SENSOR_COUNT)):
+        raise ValueError(f"SENSOR_FIRE_GROUPS must list every sensor 0..{SENSOR_COUNT - 1} exactly once: {groups}")
+
+# 묶음 단위 병렬 측정 루프
+# 묶음을 차례로 쏘고, 같은 센서는 SENSOR_MIN_REFIRE 이상 간격을 두고 다시 쏜다
+# 센서 하나의 측정 주기는 약 max(SENSOR_MIN_REFIRE, 묶음 수 x (에코 시간 + SENSOR_GROUP_GAP))
+# report_interval(초)마다 센서별 실제 측정 속도 출력, stop_event가 set되면 종료
+# callback(pinindex, distance)
+def measure_parallel(callback, groups=SENSOR_FIRE_GROUPS, min_refire=SENSOR_MIN_REFIRE,
+                     group_gap=SENSOR_GROUP_GAP, timeout=ECHO_TIMEOUT,
+                     stop_event=None, report_interval=None):
+    check_fire_groups(groups)
+    last_fired = [0.0] * SENSOR_COUNT
+    ranging_stats.reset()
+    next_report = clock.monotonic() + report_interval if report_interval else None
+
+    while stop_event is None or not stop_event.is_set():
+        for group in groups:
+            # 묶음에서 가장 최근에 쏜 센서 기준으로 최소 재발사 간격 대기
+            wait = max(last_fired[index] for index in group) + min_refire - clock.monotonic()
+            if wait > 0:
+                clock.sleep(wait)
+
+            fired_at = clock.monotonic()
+            for index in group:
+                last_fired[index] = fired_at
+
+            for index, distance in measure_group(group, timeout):
+                ranging_stats.record(index, distance)
+                callback(index, distance)
+
+            clock.sleep(group_gap)
+
+        if next_report is not None and clock.monotonic() >= next_report:
+            print(ranging_stats.report())
+            ranging_stats.reset()
+            next_report = clock.monotonic() + report_interval
+
 # 측정 돌리는 루프, interval(초)에 한번씩 돌아가면서 거리 센서의 거리를 측정
+# (센서를 하나씩 차례로 쏨, 묶음 병렬 측정은 measure_parallel)
+# stop_event가 set되면 종료
 # callback(pinindex, distance)
-def measure_thread(interval, callback):
-    while True:
+def measure_thread(interval, callback, stop_event=None):
+    while stop_event is None or not stop_event.is_set():
         
         index = 0
         
@@ -77,30 +235,29 @@ def measure_thread(interval, callback):
                 trig_pin, 
                 echo_pin)
             
+            ranging_stats.record(index, distance)
             callback(index, distance)
             
             index += 1
 
-            time.sleep(interval)
-
+            clock.sleep(interval)
 
-# DHT22 온습도 센서
-import Adafruit_DHT
 
-# 센서 타입
-sensor = Adafruit_DHT.DHT22
-from pinmap import DHT_PIN
+# DHT22 온습도 센서 (읽기는 백엔드가 담당)
+# 서버에서는 dht_sampler.DHTSampler를 쓴다 (백그라운드 스레드 + 캐시, 실패는 통계로)
+from dht_sampler import DHTSampler
 
-# callback(humidity, tempreture)
+# callback(humidity, tempreture), 한 주기의 시도가 모두 실패하면 (-1, -1)
 def measure_dht(interval, callback):
+    sampler = DHTSampler(interval=interval, backend=hal)
     while True:
-        humidity, temperature = Adafruit_DHT.read_retry(sensor, DHT_PIN)
-        if humidity is not None and temperature is not None:
-            callback(humidity, temperature)
+        if sampler.sample_once():
+            state = sampler.latest()
+            callback(state["humidity"], state["temperature"])
         else:
             callback(-1, -1)
-        
-        time.sleep(interval)
+
+        clock.sleep(interval)
 
 # TODO 불꽃 센서 
 
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# multi_tracker.py
+#
+# 카메라 여러 대를 프로세스 하나씩 (코어 고정) 돌리고 결과를 하나로 모은다 (parking/supervisor.py)
+# - 실행: python3 multi_tracker.py --config cameras.json [--jsonl results.jsonl] [--interval 1.0]
+# - 설정 형식은 parking/supervisor.py load_cameras 참고
+import argparse
+import json
+import sys
+import time
+
+from parking.supervisor import TrackerSupervisor, load_cameras
+
+
+def format_summary(summary):
+    lines = [f"전체: 차량 {summary['cars']}대, 경계 근처 {summary['near']}대, "
+             f"주차칸 {summary['occupied']}/{summary['slots']}"]
+    for name, camera in summary['cameras'].items():
+        state = "실행 중" if camera['alive'] else "중지"
+        lines.append(f"  {name}: {state} (pid {camera['pid']}, 코어 {camera['cpu']}, 재시작 {camera['restarts']}), "
+                     f"{camera['fps']:.1f} fps, 차량 {len(camera['cars'])}대, "
+                     f"주차칸 {len(camera['occupied'])}/{camera['slots']}, 버림 {camera['dropped']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="여러 카메라 동시 추적 (카메라마다 프로세스)")
+    parser.add_argument('--config', required=True, help="카메라 설정 JSON 파일")
+    parser.add_argument('--interval', type=float, default=1.0, help="집계 출력 간격 (초)")
+    parser.add_argument('--jsonl', help="집계 결과를 JSON Lines로 기록할 파일 ('-'이면 표준 출력)")
+    parser.add_argument('--stall-timeout', type=float, default=10.0, help="이 시간 동안 결과가 없으면 재시작 (초)")
+    args = parser.parse_args()
+
+    supervisor = TrackerSupervisor(load_cameras(args.config), stall_timeout=args.stall_timeout)
+    output = None
+    if args.jsonl:
+        output = sys.stdout if args.jsonl == '-' else open(args.jsonl, 'a')
+
+    supervisor.start()
+    next_report = time.monotonic() + args.interval
+    try:
+        while True:
+            supervisor.poll(timeout=min(0.5, args.interval))
+            if time.monotonic() < next_report:
+                continue
+            next_report += args.interval
+
+            summary = supervisor.aggregate()
+            if output is not None:
+                output.write(json.dumps(summary, ensure_ascii=False) + "\n")
+                output.flush()
+            if output is not sys.stdout:
+                print(format_summary(summary))
+    except KeyboardInterrupt:
+        print("프로그램 종료")
+    finally:
+        supervisor.stop()
+        if output is not None and output is not sys.stdout:
+            output.close()
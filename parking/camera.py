@@ -0,0 +1,205 @@
+# camera.py
+import json
+import os
+import threading
+import time
+
+import cv2
+
+CAMERA_CACHE_FILE = '.camera_cache.json'
+
+# 시도할 백엔드 (순서대로 우선)
+BACKENDS = [
+    (cv2.CAP_V4L2, "V4L2"),
+    (cv2.CAP_GSTREAMER, "GStreamer"),
+    (cv2.CAP_ANY, "Any"),
+]
+BACKEND_IDS = {name: backend for backend, name in BACKENDS}
+
+# 시도할 디바이스 번호
+DEVICE_IDS = [0, 1, 2]
+
+
+def open_camera(device_id, backend_name, width=1280, height=720, fps=15):
+    """카메라를 열고 해상도/FPS를 설정한 뒤 테스트 프레임까지 읽어 본다
+
+    성공하면 (cap, 설정 정보 dict), 실패하면 (None, None).
+    해상도는 첫 프레임을 읽기 전에 설정한다 (읽은 뒤 바꾸면 스트림을 다시 협상함).
+    """
+    cap = cv2.VideoCapture(device_id, BACKEND_IDS[backend_name])
+    try:
+        if not cap.isOpened():
+            cap.release()
+            return None, None
+
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        cap.set(cv2.CAP_PROP_FPS, fps)
+
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            cap.release()
+            return None, None
+    except Exception:
+        cap.release()
+        raise
+
+    info = {
+        'device': device_id,
+        'backend': backend_name,
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+    }
+    return cap, info
+
+
+def load_camera_cache(path=CAMERA_CACHE_FILE):
+    """마지막으로 성공한 카메라 설정 (없거나 깨졌으면 None)"""
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (not isinstance(entry, dict) or entry.get('backend') not in BACKEND_IDS
+            or not isinstance(entry.get('device'), int)):
+        return None
+    return entry
+
+
+def save_camera_cache(info, path=CAMERA_CACHE_FILE):
+    """성공한 카메라 설정 저장 (임시 파일에 쓰고 교체)"""
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(info, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"카메라 캐시 저장 실패: {e}")
+
+
+class _Probe:
+    """디바이스 하나를 별도 스레드에서 백엔드 순서대로 여는 시도
+
+    같은 디바이스를 여러 백엔드로 동시에 열면 서로 장치를 점유하므로 디바이스 안에서는 차례로 시도한다.
+    시간 초과로 버려지면 늦게 열린 카메라는 스스로 닫는다.
+    """
+
+    def __init__(self, device_id, backend_names, width, height, fps, done):
+        self.device_id = device_id
+        self.backend_names = backend_names
+        self.cap = None
+        self.info = None
+        self.error = None
+        self.finished = False
+        self._args = (width, height, fps)
+        self._abandoned = False
+        self._lock = threading.Lock()
+        self._done = done
+        threading.Thread(target=self._run, name=f"camera-probe-{device_id}", daemon=True).start()
+
+    def _run(self):
+        cap, info = None, None
+        for backend_name in self.backend_names:
+            if self._abandoned:
+                break
+            try:
+                cap, info = open_camera(self.device_id, backend_name, *self._args)
+            except Exception as e:
+                self.error = e
+            if cap is not None:
+                break
+        with self._lock:
+            if self._abandoned:
+                if cap is not None:
+                    cap.release()
+                cap, info = None, None
+            self.cap, self.info = cap, info
+            self.finished = True
+        with self._done:
+            self._done.notify_all()
+
+    def abandon(self):
+        """결과를 쓰지 않음 (열린 카메라는 닫고, 아직 여는 중이면 끝난 뒤 닫힘)"""
+        with self._lock:
+            self._abandoned = True
+            cap, self.cap = self.cap, None
+        if cap is not None:
+            cap.release()
+
+
+def probe_cameras(candidates, width=1280, height=720, fps=15, parallel=False, timeout=3.0):
+    """(device_id, backend_name) 후보를 순서대로 시도해 처음 성공한 (cap, info) 반환
+
+    parallel=True면 디바이스별로 동시에 열고 (같은 디바이스의 백엔드는 차례로), 전체가 timeout초 안에
+    끝나야 한다. 성공한 디바이스가 여럿이면 후보 순서상 앞선 것을 쓰고 나머지는 닫는다.
+    """
+    if not parallel:
+        for device_id, backend_name in candidates:
+            print(f"디바이스 {device_id}, {backend_name} 백엔드로 시도 중...")
+            try:
+                cap, info = open_camera(device_id, backend_name, width, height, fps)
+            except Exception as e:
+                print(f"  오류: {e}")
+                continue
+            if cap is not None:
+                return cap, info
+            print(f"  카메라를 열 수 없거나 프레임을 읽을 수 없음")
+        return None, None
+
+    backends_by_device = {}
+    for device_id, backend_name in candidates:
+        backends_by_device.setdefault(device_id, []).append(backend_name)
+
+    print(f"카메라 디바이스 {len(backends_by_device)}개 동시 시도 중 (시간 제한 {timeout:.1f}초)...")
+    done = threading.Condition()
+    probes = [_Probe(device_id, backend_names, width, height, fps, done)
+              for device_id, backend_names in backends_by_device.items()]
+    deadline = time.monotonic() + timeout
+
+    # 앞선 후보가 끝날 때까지 기다린 뒤 결과 확인 (앞선 후보가 성공하면 바로 사용)
+    chosen = None
+    with done:
+        for probe in probes:
+            remaining = deadline - time.monotonic()
+            if not done.wait_for(lambda: probe.finished, max(remaining, 0)):
+                print(f"  디바이스 {probe.device_id}: 시간 초과")
+                continue
+            if probe.cap is not None:
+                chosen = probe
+                break
+
+    for probe in probes:
+        if probe is not chosen:
+            probe.abandon()
+    if chosen is None:
+        return None, None
+    return chosen.cap, chosen.info
+
+
+def find_camera(cache_path=CAMERA_CACHE_FILE, width=1280, height=720, fps=15,
+                parallel=False, timeout=3.0):
+    """캐시된 카메라 설정을 먼저 시도하고, 실패하면 전체 후보를 탐색한다
+
+    성공한 설정은 cache_path에 저장해 다음 시작 때 바로 연다. 실패하면 (None, None).
+    """
+    cached = load_camera_cache(cache_path) if cache_path else None
+    if cached is not None:
+        print(f"캐시된 카메라 설정 시도: 디바이스 {cached['device']}, {cached['backend']} 백엔드")
+        try:
+            cap, info = open_camera(cached['device'], cached['backend'],
+                                    cached.get('width', width), cached.get('height', height),
+                                    cached.get('fps', fps))
+        except Exception as e:
+            print(f"  오류: {e}")
+            cap, info = None, None
+        if cap is not None:
+            return cap, info
+        print("  캐시된 설정 실패, 전체 탐색")
+
+    candidates = [(device_id, backend_name) for device_id in DEVICE_IDS
+                  for _, backend_name in BACKENDS]
+    cap, info = probe_cameras(candidates, width, height, fps, parallel=parallel, timeout=timeout)
+    if cap is not None and cache_path:
+        save_camera_cache(info, cache_path)
+    return cap, info
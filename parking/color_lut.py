@@ -0,0 +1,135 @@
+# color_lut.py
+import cv2
+import numpy as np
+
+# 하나의 색상으로 합쳐서 탐지할 범위 (빨간색은 Hue 0 근처와 180 근처 두 범위)
+COLOR_ALIASES = {
+    'red2': 'red',
+}
+
+# 라벨 이미지가 uint8 비트마스크라서 범위는 최대 8개
+MAX_RANGES = 8
+
+
+class ColorClassifier:
+    """color_ranges를 HSV 룩업 테이블로 컴파일해서 프레임당 라벨 이미지 하나를 만든다
+
+    inRange 범위는 H, S, V 각 채널 조건의 AND 이므로 채널별 256칸 테이블에
+    범위마다 비트 하나를 할당해 두면 LUT 3번 + AND 2번으로 모든 색상을 한 번에 분류할 수 있다.
+    색상별 마스크는 라벨 이미지에서 해당 비트만 골라내면 된다.
+
+    라벨/마스크 버퍼는 프레임마다 재사용하므로 다음 classify 호출 전까지만 유효하다.
+    """
+
+    def __init__(self, color_ranges=None):
+        self._key = None
+        self._luts = None
+        self._buffers = None   # 프레임 크기별 재사용 버퍼 (채널 3개, 라벨, 색상 마스크)
+        self._buffer_shape = None
+        self.colors = []       # 탐지 색상 이름 (color_ranges 순서, 별칭은 합쳐짐)
+        self.color_bits = {}   # 색상 이름 -> 라벨 비트마스크
+        self._mask_luts = {}   # 색상 이름 -> 라벨 값 -> 0/255 마스크 테이블
+
+        if color_ranges is not None:
+            self.update(color_ranges)
+
+    def update(self, color_ranges):
+        """color_ranges가 바뀌었을 때만 룩업 테이블을 다시 만든다"""
+        key = tuple((name, tuple(int(v) for v in lower), tuple(int(v) for v in upper))
+                    for name, (lower, upper) in color_ranges.items())
+        if key == self._key:
+            return False
+
+        if len(key) > MAX_RANGES:
+            raise ValueError(f"색상 범위는 최대 {MAX_RANGES}개까지 지원한다: {len(key)}개")
+
+        # H, S, V 채널별 256칸 테이블 (값 -> 그 값을 포함하는 범위들의 비트)
+        luts = np.zeros((3, 256), dtype=np.uint8)
+        colors = []
+        color_bits = {}
+
+        for i, (name, lower, upper) in enumerate(key):
+            bit = 1 << i
+            for channel in range(3):
+                lo = max(lower[channel], 0)
+                hi = min(upper[channel], 255)
+                if lo <= hi:
+                    luts[channel, lo:hi + 1] |= bit
+
+            color_name = COLOR_ALIASES.get(name, name)
+            if color_name not in color_bits:
+                colors.append(color_name)
+                color_bits[color_name] = 0
+            color_bits[color_name] |= bit
+
+        self._key = key
+        self._luts = luts
+        self.colors = colors
+        self.color_bits = color_bits
+
+        # 라벨 값(0~255)마다 해당 색상 비트가 켜져 있으면 255
+        label_values = np.arange(256, dtype=np.uint8)
+        self._mask_luts = {
+            name: np.where(label_values & bits, 255, 0).astype(np.uint8)
+            for name, bits in color_bits.items()
+        }
+        return True
+
+    def _get_buffers(self, shape):
+        # 해상도가 바뀔 때만 새로 할당 (큰 배열을 매 프레임 할당하면 페이지 폴트 비용이 크다)
+        if self._buffer_shape != shape:
+            self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(5)]
+            self._buffer_shape = shape
+        return self._buffers
+
+    def classify(self, hsv):
+        """HSV 이미지를 범위별 비트가 켜진 uint8 라벨 이미지로 변환"""
+        h, s, v, labels, _ = self._get_buffers(hsv.shape[:2])
+        cv2.split(hsv, [h, s, v])
+
+        cv2.LUT(h, self._luts[0], dst=labels)
+        cv2.LUT(s, self._luts[1], dst=s)
+        cv2.LUT(v, self._luts[2], dst=v)
+        cv2.bitwise_and(labels, s, dst=labels)
+        cv2.bitwise_and(labels, v, dst=labels)
+        return labels
+
+    def color_mask(self, labels, color_name):
+        """라벨 이미지에서 한 색상의 0/255 마스크를 뽑는다"""
+        mask = self._get_buffers(labels.shape[:2])[4]
+        cv2.LUT(labels, self._mask_luts[color_name], dst=mask)
+        return mask
+
+
+if __name__ == "__main__":
+    # 자체 검사: 색상별 마스크가 범위마다 cv2.inRange 한 결과를 OR 한 것과 같아야 함
+    # (실행: python3 -m parking.color_lut)
+    color_ranges = {
+        'red': ([0, 50, 50], [10, 255, 255]),
+        'red2': ([170, 50, 50], [180, 255, 255]),
+        'blue': ([100, 50, 50], [130, 255, 255]),
+        'orange': ([10, 50, 50], [25, 255, 255]),   # red와 H=10이 겹침
+        'yellow': ([25, 50, 50], [35, 255, 255]),
+        'clipped': ([-5, 0, 200], [300, 49, 255]),  # 0~255 밖으로 나가는 범위
+    }
+    rng = np.random.default_rng(0)
+    hsv = rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8)
+    hsv[0, :, :] = np.arange(160, dtype=np.uint8)[:, None]  # 범위 경계 값이 모두 들어가도록
+
+    classifier = ColorClassifier(color_ranges)
+    assert classifier.colors == ['red', 'blue', 'orange', 'yellow', 'clipped'], classifier.colors
+    labels = classifier.classify(hsv)
+    for name in classifier.colors:
+        expected = np.zeros(hsv.shape[:2], dtype=np.uint8)
+        for range_name, (lower, upper) in color_ranges.items():
+            if COLOR_ALIASES.get(range_name, range_name) == name:
+                expected |= cv2.inRange(hsv, np.array(lower), np.array(upper))
+        assert np.array_equal(classifier.color_mask(labels, name), expected), name
+
+    # 같은 범위면 다시 만들지 않고, 바뀌면 다시 만든다
+    assert not classifier.update(color_ranges)
+    assert classifier.update({'blue': ([90, 0, 0], [140, 255, 255])})
+    expected = cv2.inRange(hsv, np.array([90, 0, 0]), np.array([140, 255, 255]))
+    assert np.array_equal(classifier.color_mask(classifier.classify(hsv), 'blue'), expected)
+
+    print("color_lut: 자체 검사 통과")
@@ -0,0 +1,108 @@
+# detections.py
+import numpy as np
+
+# 색상 코드 = 인덱스 (처음 보는 색상 이름은 뒤에 추가됨)
+COLOR_NAMES = ['red', 'blue', 'orange', 'yellow']
+_COLOR_CODES = {name: code for code, name in enumerate(COLOR_NAMES)}
+
+# 추적 ID가 아직 없는 탐지 (추적 ID는 1부터)
+NO_TRACK = 0
+
+# 탐지 결과 한 행 (탐지 -> 기하 -> 추적 -> 출력 단계가 모두 이 배열을 주고받는다)
+DETECTION_DTYPE = np.dtype([
+    ('color', np.uint8),                # 색상 코드 (COLOR_NAMES 인덱스)
+    ('center', np.int32, (2,)),         # 바운딩 박스 중심 (x, y)
+    ('bbox', np.int32, (4,)),           # x, y, w, h
+    ('area', np.float64),               # 컨투어 면적 (전체 해상도 픽셀)
+    ('aspect_ratio', np.float32),
+    ('extent', np.float32),
+    ('distance', np.float64),           # 경계까지 부호 있는 거리 (영역이 없으면 inf)
+    ('predicted_distance', np.float64), # warning_horizon초 뒤 예측 위치의 경계 거리
+    ('track_id', np.int32),             # NO_TRACK이면 추적 전
+    ('velocity', np.float64, (2,)),     # 중심점 속도 (px/s)
+])
+
+
+def color_code(name):
+    """색상 이름 -> 코드 (없으면 새로 등록)"""
+    code = _COLOR_CODES.get(name)
+    if code is None:
+        if len(COLOR_NAMES) > np.iinfo(np.uint8).max:
+            raise ValueError(f"색상은 최대 {np.iinfo(np.uint8).max + 1}개까지 지원한다")
+        code = len(COLOR_NAMES)
+        COLOR_NAMES.append(name)
+        _COLOR_CODES[name] = code
+    return code
+
+
+def color_name(code):
+    return COLOR_NAMES[int(code)]
+
+
+class DetectionBuffer:
+    """프레임마다 비우고 다시 쓰는 탐지 결과 구조화 배열
+
+    view()는 버퍼 앞쪽 count개를 가리키는 배열이라 clear() 후 다시 쓰면 내용이 바뀐다.
+    용량이 모자라면 두 배로 늘린다 (이전 view는 예전 메모리를 계속 가리킴).
+    """
+
+    def __init__(self, capacity=32):
+        self.data = np.zeros(capacity, dtype=DETECTION_DTYPE)
+        self.count = 0
+
+    def clear(self):
+        self.count = 0
+
+    def _reserve(self, count):
+        if count > len(self.data):
+            data = np.zeros(max(count, len(self.data) * 2), dtype=DETECTION_DTYPE)
+            data[:self.count] = self.data[:self.count]
+            self.data = data
+
+    def append(self, color, bbox, area, aspect_ratio, extent):
+        """탐지 하나 추가 (거리는 inf, 추적 정보는 비운 상태)"""
+        self._reserve(self.count + 1)
+        x, y, w, h = bbox
+        self.data[self.count] = (color, (x + w // 2, y + h // 2), bbox, area, aspect_ratio, extent,
+                                 np.inf, np.inf, NO_TRACK, (0, 0))
+        self.count += 1
+
+    def extend(self, rows):
+        """탐지 배열의 행들을 그대로 복사해서 추가"""
+        self._reserve(self.count + len(rows))
+        self.data[self.count:self.count + len(rows)] = rows
+        self.count += len(rows)
+
+    def compact(self, keep):
+        """keep(bool 배열 또는 인덱스)에 해당하는 행만 앞으로 모아서 남긴다"""
+        kept = self.data[:self.count][keep]
+        self.data[:len(kept)] = kept
+        self.count = len(kept)
+
+    def view(self):
+        return self.data[:self.count]
+
+
+class DetectionPool:
+    """다른 스레드로 넘길 탐지 결과용 DetectionBuffer 링
+
+    next()는 가장 오래전에 쓴 버퍼를 비워서 돌려준다. 돌려받은 결과는
+    이후 slots - 1번의 next() 호출 동안 그대로 유지되므로, 파이프라인 큐에
+    동시에 머무를 수 있는 결과 수보다 slots가 커야 한다.
+    """
+
+    def __init__(self, slots=8, capacity=32):
+        self.capacity = capacity
+        self.buffers = [DetectionBuffer(capacity) for _ in range(slots)]
+        self._index = 0
+
+    def reserve(self, slots):
+        """링 크기를 최소 slots개로"""
+        while len(self.buffers) < slots:
+            self.buffers.append(DetectionBuffer(self.capacity))
+
+    def next(self):
+        buffer = self.buffers[self._index]
+        self._index = (self._index + 1) % len(self.buffers)
+        buffer.clear()
+        return buffer
@@ -0,0 +1,257 @@
+# framebus.py
+import sys
+import threading
+import time
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from parking.sources import FrameSource
+
+FRAME_BUS_MAGIC = 0x53504642  # 'SPFB'
+FRAME_BUS_VERSION = 2
+
+# 공유 메모리 맨 앞 헤더
+HEADER_DTYPE = np.dtype([
+    ('magic', np.uint32),
+    ('version', np.uint32),
+    ('slots', np.uint32),
+    ('height', np.uint32),
+    ('width', np.uint32),
+    ('channels', np.uint32),
+    ('latest', np.uint64),      # 마지막으로 다 쓴 프레임 번호 (1부터, 0이면 아직 없음)
+    ('closed', np.uint32),      # 생산자가 종료했으면 1
+    ('_pad', np.uint32),
+])
+
+# 슬롯마다 프레임 앞에 붙는 헤더 (seqlock: 홀수면 쓰는 중, 2n이면 프레임 n 완료)
+# numpy 저장에는 메모리 배리어가 없어서 ARM처럼 순서가 약한 CPU에서는 읽는 쪽이 sequence를
+# 프레임 내용보다 먼저 볼 수 있다. 그래서 sequence만 믿지 않고 읽은 프레임의 CRC32를 checksum과 비교한다
+SLOT_HEADER_DTYPE = np.dtype([
+    ('sequence', np.uint64),
+    ('timestamp', np.float64),  # 캡처 시각 (time.time())
+    ('checksum', np.uint32),    # 프레임 내용 CRC32
+    ('_pad', np.uint32),
+])
+
+SLOT_ALIGN = 64
+
+
+def _slot_stride(frame_bytes):
+    size = SLOT_HEADER_DTYPE.itemsize + frame_bytes
+    return (size + SLOT_ALIGN - 1) // SLOT_ALIGN * SLOT_ALIGN
+
+
+_attach_lock = threading.Lock()
+
+
+def _attach(name):
+    """이미 있는 공유 메모리에 붙기 (생산자가 지우므로 소비자 쪽 resource_tracker에는 등록하지 않음)
+
+    등록하면 소비자 프로세스가 끝날 때 공유 메모리를 지워 버리고, 등록 후 해제하면
+    같은 resource_tracker를 쓰는 생산자(fork된 자식 소비자)의 등록까지 지워진다.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    # resource_tracker.register를 잠시 바꿔치기하므로 동시에 붙는 스레드끼리는 차례로
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class _FrameBus:
+    """공유 메모리 링 배치 (헤더 + 슬롯 N개), 쓰기/읽기 쪽이 같은 배치를 numpy 뷰로 본다"""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+        if int(self.header['magic']) != FRAME_BUS_MAGIC or int(self.header['version']) != FRAME_BUS_VERSION:
+            raise ValueError(f"프레임 버스 형식이 아니다: {shm.name}")
+
+        self.slots = int(self.header['slots'])
+        self.shape = (int(self.header['height']), int(self.header['width']), int(self.header['channels']))
+        frame_bytes = int(np.prod(self.shape))
+        stride = _slot_stride(frame_bytes)
+
+        self.slot_headers = []
+        self.frames = []
+        for index in range(self.slots):
+            offset = HEADER_DTYPE.itemsize + index * stride
+            self.slot_headers.append(np.ndarray((), dtype=SLOT_HEADER_DTYPE, buffer=shm.buf, offset=offset))
+            self.frames.append(np.ndarray(self.shape, dtype=np.uint8, buffer=shm.buf,
+                                          offset=offset + SLOT_HEADER_DTYPE.itemsize))
+
+    @property
+    def latest(self):
+        return int(self.header['latest'])
+
+    def release_views(self):
+        # 공유 메모리를 닫기 전에 버퍼를 잡고 있는 뷰를 모두 놓는다
+        self.header = None
+        self.slot_headers = []
+        self.frames = []
+
+
+class FrameBusWriter:
+    """카메라 프로세스 쪽: 프레임을 공유 메모리 링에 쓴다 (읽는 쪽을 기다리지 않음)
+
+    프레임 n은 슬롯 n % slots에 쓰고 (CRC32를 checksum에), 슬롯 sequence를 2n-1(쓰는 중) -> 2n(완료)으로
+    바꾼 뒤 헤더 latest를 n으로 올린다. 느린 소비자는 링을 한 바퀴 돌아 덮어쓰인 슬롯을
+    sequence로 알아채고 최신 프레임으로 건너뛴다.
+    """
+
+    def __init__(self, name, shape, slots=4):
+        height, width = shape[:2]
+        channels = shape[2] if len(shape) > 2 else 1
+        frame_bytes = height * width * channels
+        size = HEADER_DTYPE.itemsize + slots * _slot_stride(frame_bytes)
+
+        self.name = name
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._shm.buf)
+        header[()] = (FRAME_BUS_MAGIC, FRAME_BUS_VERSION, slots, height, width, channels, 0, 0, 0)
+        del header
+        self._bus = _FrameBus(self._shm)
+        self.published = 0
+
+    @property
+    def shape(self):
+        return self._bus.shape
+
+    def publish(self, frame, timestamp=None):
+        """프레임 한 장 쓰기 (복사 한 번), 프레임 번호 반환"""
+        bus = self._bus
+        if frame.shape != bus.shape or frame.dtype != np.uint8:
+            raise ValueError(f"프레임 버스 크기와 다르다: {frame.shape} != {bus.shape}")
+
+        number = bus.latest + 1
+        index = number % bus.slots
+        slot = bus.slot_headers[index]
+        slot['sequence'] = 2 * number - 1
+        np.copyto(bus.frames[index], frame)
+        slot['checksum'] = zlib.crc32(bus.frames[index])
+        slot['timestamp'] = time.time() if timestamp is None else timestamp
+        slot['sequence'] = 2 * number
+        bus.header['latest'] = number
+        self.published += 1
+        return number
+
+    def close(self):
+        """버스 종료 표시 후 공유 메모리 삭제 (이미 붙어 있는 소비자는 종료를 보고 끝낸다)"""
+        if self._bus is None:
+            return
+        self._bus.header['closed'] = 1
+        self._bus.release_views()
+        self._bus = None
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameBusReader:
+    """소비자 쪽: 공유 메모리 링에 붙어서 최신 프레임을 읽는다 (직렬화/피클 없음)
+
+    read(copy=False)는 공유 메모리를 직접 가리키는 뷰를 돌려준다. 뷰는 생산자가 링을 한 바퀴
+    돌면 덮어써지므로 다 쓴 뒤 still_valid(number)로 확인한다. 프레임을 수정하거나
+    오래 들고 있을 거라면 copy=True (복사 한 번).
+    읽은 프레임은 sequence를 다시 확인하고 CRC32도 맞춰 본다 (메모리 순서가 약한 CPU에서 덜 써진 프레임 방지).
+    """
+
+    def __init__(self, name, poll_interval=0.001):
+        self.name = name
+        self.poll_interval = poll_interval
+        self._shm = _attach(name)
+        self._bus = _FrameBus(self._shm)
+        self.last_number = 0
+
+        # 통계
+        self.frames = 0
+        self.skipped = 0    # 읽기 전에 지나간 프레임 수 (느린 소비자)
+        self.torn = 0       # 읽는 도중 덮어쓰여서 다시 읽은 수
+
+    @property
+    def shape(self):
+        return self._bus.shape
+
+    @property
+    def closed(self):
+        return self._bus is None or bool(self._bus.header['closed'])
+
+    def read(self, timeout=None, copy=True):
+        """새 프레임이 올 때까지 대기해서 (프레임 번호, 캡처 시각, 프레임) 반환, 타임아웃/종료면 None"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        bus = self._bus
+        while bus is not None:
+            number = bus.latest
+            if number != self.last_number and number > 0:
+                index = number % bus.slots
+                slot = bus.slot_headers[index]
+                if int(slot['sequence']) == 2 * number:
+                    timestamp = float(slot['timestamp'])
+                    checksum = int(slot['checksum'])
+                    frame = bus.frames[index].copy() if copy else bus.frames[index]
+                    # 읽는 동안 덮어쓰이지 않았는지, 다 써진 내용을 봤는지 확인
+                    if int(slot['sequence']) == 2 * number and zlib.crc32(frame) == checksum:
+                        if self.last_number and number > self.last_number + 1:
+                            self.skipped += number - self.last_number - 1
+                        self.last_number = number
+                        self.frames += 1
+                        return number, timestamp, frame
+                self.torn += 1
+                continue
+
+            if bus.header['closed']:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+        return None
+
+    def still_valid(self, number):
+        """read(copy=False)로 받은 프레임 number가 아직 덮어쓰이지 않았는지"""
+        if self._bus is None:
+            return False
+        slot = self._bus.slot_headers[number % self._bus.slots]
+        return int(slot['sequence']) == 2 * number
+
+    def close(self):
+        if self._bus is None:
+            return
+        self._bus.release_views()
+        self._bus = None
+        self._shm.close()
+
+
+class FrameBusSource(FrameSource):
+    """프레임 버스를 ParkingTracker 프레임 소스로 (shm://이름), 프레임은 복사본이라 그려도 된다"""
+
+    def __init__(self, name, read_timeout=5.0, **kwargs):
+        super().__init__(**kwargs)
+        self.reader = FrameBusReader(name)
+        self.read_timeout = read_timeout
+        self.last_timestamp = None
+
+    @property
+    def dropped(self):
+        return self.reader.skipped
+
+    def _read_frame(self):
+        result = self.reader.read(timeout=self.read_timeout, copy=True)
+        if result is None:
+            return False, None
+        _, self.last_timestamp, frame = result
+        return True, frame
+
+    def isOpened(self):
+        return not self.reader.closed
+
+    def release(self):
+        self.reader.close()
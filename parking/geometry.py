@@ -0,0 +1,145 @@
+# geometry.py
+import numpy as np
+
+
+class PolygonGeometry:
+    """다각형 변의 직선 계수를 캐시해 두고, 여러 점의 내부 여부와 경계 거리를 한 번에 계산한다
+
+    내부 여부는 수평 반직선 교차 횟수(짝홀), 경계 거리는 각 변 직선까지 거리의 최솟값이며
+    한 프레임의 모든 중심점(N x 2 배열)에 대해 벡터 연산 한 번으로 낸다.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._edges = None  # 변이 없으면 None
+
+    def update(self, polygon):
+        """다각형이 바뀌었을 때만 변 계수를 다시 계산"""
+        key = tuple(tuple(p) for p in polygon)
+        if key == self._key:
+            return False
+
+        self._key = key
+        if len(polygon) < 3:
+            self._edges = None
+            return True
+
+        p1 = np.asarray(polygon, dtype=np.float64)
+        p2 = np.roll(p1, -1, axis=0)
+        p1x, p1y = p1[:, 0], p1[:, 1]
+        p2x, p2y = p2[:, 0], p2[:, 1]
+
+        # 직선 Ax + By + C = 0 계수와 정규화 값
+        a = p2y - p1y
+        b = p1x - p2x
+        c = p2x * p1y - p1x * p2y
+        norm = np.hypot(a, b)
+        norm[norm == 0] = np.nan  # 길이 0인 변은 거리 계산에서 제외
+
+        # 교차 판정용 (수평 변은 교차점이 없으므로 기울기 0으로 둔다)
+        dy = p2y - p1y
+        slope = np.divide(p2x - p1x, dy, out=np.zeros_like(dy), where=dy != 0)
+
+        self._edges = {
+            'p1x': p1x,
+            'p1y': p1y,
+            'min_y': np.minimum(p1y, p2y),
+            'max_y': np.maximum(p1y, p2y),
+            'max_x': np.maximum(p1x, p2x),
+            'vertical': p1x == p2x,
+            'slope': slope,
+            'a': a,
+            'b': b,
+            'c': c,
+            'norm': norm,
+        }
+        return True
+
+    def classify(self, points):
+        """점 배열의 (내부 여부, 부호 있는 경계 거리) 반환
+
+        거리는 가장 가까운 변(직선)까지의 거리로, 내부는 양수, 외부는 음수다.
+        다각형이 없으면 모두 내부, 거리는 inf.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        count = len(points)
+        if self._edges is None:
+            return np.ones(count, dtype=bool), np.full(count, np.inf)
+        if count == 0:
+            return np.zeros(0, dtype=bool), np.zeros(0)
+
+        e = self._edges
+        x = points[:, 0:1]  # (N, 1) 로 두고 변 (E,) 와 브로드캐스트
+        y = points[:, 1:2]
+
+        # 수평 반직선 교차 횟수 (변 위 점은 위쪽 끝점 포함, 아래쪽 끝점 제외)
+        xinters = (y - e['p1y']) * e['slope'] + e['p1x']
+        crossing = ((y > e['min_y']) & (y <= e['max_y']) & (x <= e['max_x'])
+                    & (e['vertical'] | (x <= xinters)))
+        inside = (np.count_nonzero(crossing, axis=1) % 2) == 1
+
+        # 각 변 직선까지의 거리 중 최소값
+        distances = np.abs(e['a'] * x + e['b'] * y + e['c']) / e['norm']
+        distance = np.nanmin(distances, axis=1)
+
+        return inside, np.where(inside, distance, -distance)
+
+
+if __name__ == "__main__":
+    # 자체 검사: 예전 ParkingTracker.point_in_polygon / calculate_distance_to_boundary (점 하나씩)와
+    # 같은 결과여야 함 (실행: python3 -m parking.geometry)
+    import math
+
+    def point_in_polygon(point, polygon):
+        x, y = point
+        n = len(polygon)
+        inside = False
+        p1x, p1y = polygon[0]
+        for i in range(1, n + 1):
+            p2x, p2y = polygon[i % n]
+            if y > min(p1y, p2y):
+                if y <= max(p1y, p2y):
+                    if x <= max(p1x, p2x):
+                        if p1y != p2y:
+                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+                        if p1x == p2x or x <= xinters:
+                            inside = not inside
+            p1x, p1y = p2x, p2y
+        return inside
+
+    def distance_to_boundary(point, polygon):
+        x, y = point
+        min_distance = float('inf')
+        for i in range(len(polygon)):
+            p1 = polygon[i]
+            p2 = polygon[(i + 1) % len(polygon)]
+            A = p2[1] - p1[1]
+            B = p1[0] - p2[0]
+            C = p2[0] * p1[1] - p1[0] * p2[1]
+            min_distance = min(min_distance, abs(A * x + B * y + C) / math.sqrt(A * A + B * B))
+        return min_distance
+
+    polygons = [
+        [(320, 180), (960, 180), (960, 540), (320, 540)],  # 기본 영역 (직사각형)
+        [(300, 200), (980, 150), (1000, 600), (280, 560)],  # 카메라 원근으로 비뚤어진 영역
+        [(100, 100), (500, 100), (300, 300), (500, 500)],   # 오목한 사각형
+    ]
+    rng = np.random.default_rng(0)
+    geometry = PolygonGeometry()
+    for polygon in polygons:
+        # 정수 격자 점 (꼭짓점/변 위의 점 포함) + 꼭짓점 자체
+        points = np.vstack([rng.integers(0, 1280, size=(2000, 2)), polygon])
+        assert geometry.update(polygon) and not geometry.update(polygon)
+        inside, distance = geometry.classify(points)
+        for point, point_inside, point_distance in zip(points.tolist(), inside, distance):
+            assert point_inside == point_in_polygon(point, polygon), (polygon, point)
+            expected = distance_to_boundary(point, polygon)
+            assert math.isclose(abs(point_distance), expected, rel_tol=1e-9, abs_tol=1e-9), (polygon, point)
+            assert (point_distance >= 0) == point_inside or expected == 0, (polygon, point)
+
+    # 영역이 없으면 모두 내부, 거리는 inf
+    geometry.update([])
+    inside, distance = geometry.classify([(1, 2), (3, 4)])
+    assert inside.all() and np.isinf(distance).all()
+
+    print("geometry: 자체 검사 통과")
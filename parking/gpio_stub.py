@@ -0,0 +1,23 @@
+# gpio_stub.py
+import random
+
+from parking.iolib import SimGPIO, VirtualClock
+
+
+class StubGPIO(SimGPIO):
+    """RPi.GPIO 대신 쓰는 가짜 GPIO (라즈베리파이가 아닌 환경에서 벤치마크/재생용)
+
+    에코 모델(TRIG/ECHO 쌍, 거리, 센서 간 간섭)은 io/lib/hal.py의 SimGPIO 그대로이고, 시계만 실제 시간을
+    따른다. add_event_detect로 등록한 콜백은 RPi.GPIO처럼 별도 스레드(시계 스레드)에서 에코 상승/하강 시각에 불린다.
+    pair_echo로 센서를 하나도 등록하지 않으면 어느 출력 핀을 트리거해도 모든 입력 핀이
+    echo_distance(cm)만큼 응답한다 (ParkingTracker처럼 센서가 하나일 때). None이면 에코 없음 (타임아웃).
+    """
+
+    def __init__(self, echo_distance=50.0, echo_delay=0.0005):
+        super().__init__(VirtualClock(realtime=True), random.Random(0), echo_delay=echo_delay, input_cost=0.0)
+        self.echo_distance = echo_distance
+
+    def _echo_targets(self, trig_pin):
+        if self._sensors:
+            return super()._echo_targets(trig_pin)
+        return [(pin, self.echo_distance) for pin, mode in self.modes.items() if mode == self.IN]
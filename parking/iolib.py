@@ -0,0 +1,13 @@
+# iolib.py
+#
+# io 서비스의 하드웨어 계층(io/lib)을 parking에서 쓰기 위한 연결
+# io/lib는 평평한 import(from hal import ...)를 쓰므로 경로를 sys.path 끝에 붙여서 가져온다
+import os
+import sys
+
+IO_LIB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'io', 'lib')
+if IO_LIB not in sys.path:
+    sys.path.append(IO_LIB)
+
+from echo_timer import EchoEdgeTimer  # noqa: E402,F401
+from hal import SimGPIO, VirtualClock  # noqa: E402,F401
@@ -0,0 +1,197 @@
+# metrics.py
+import bisect
+import json
+import math
+import signal
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 히스토그램 버킷 경계 (ns): 1us ~ 10s를 로그 간격으로 나눈 고정 크기
+BUCKETS_PER_DECADE = 20
+MIN_LATENCY_NS = 1_000
+MAX_LATENCY_NS = 10_000_000_000
+BUCKET_EDGES = [
+    int(MIN_LATENCY_NS * 10 ** (i / BUCKETS_PER_DECADE))
+    for i in range(int(math.log10(MAX_LATENCY_NS / MIN_LATENCY_NS) * BUCKETS_PER_DECADE) + 1)
+]
+
+
+class LatencyHistogram:
+    """고정 크기 로그 스케일 지연 히스토그램 (기록은 O(log 버킷 수), 메모리는 일정)
+
+    백분위 값은 버킷 경계 기준이라 오차는 버킷 폭(약 12%) 이내다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKET_EDGES) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, elapsed_ns):
+        index = bisect.bisect_left(BUCKET_EDGES, elapsed_ns)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ns += elapsed_ns
+            if elapsed_ns > self.max_ns:
+                self.max_ns = elapsed_ns
+
+    def percentile(self, q):
+        """q(0~100) 백분위 지연 (ns), 버킷 상한으로 근사"""
+        with self._lock:
+            if self.count == 0:
+                return 0
+            target = self.count * q / 100.0
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target and count:
+                    if index >= len(BUCKET_EDGES):
+                        return self.max_ns
+                    return min(BUCKET_EDGES[index], self.max_ns)
+            return self.max_ns
+
+    def summary(self):
+        mean = self.total_ns / self.count if self.count else 0
+        return {
+            'count': self.count,
+            'mean_ms': mean / 1e6,
+            'p50_ms': self.percentile(50) / 1e6,
+            'p95_ms': self.percentile(95) / 1e6,
+            'p99_ms': self.percentile(99) / 1e6,
+            'max_ms': self.max_ns / 1e6,
+        }
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class StageMetrics:
+    """run 루프 단계별 지연 히스토그램과 최근 fps
+
+    with metrics.stage('hsv'): ... 형태로 감싸면 단조 시계로 잰 시간이 단계 히스토그램에 쌓인다.
+    snapshot()으로 단계별 p50/p95/p99와 최근 fps를 얻고, 파일(dump)이나
+    HTTP(serve_http), SIGUSR1(install_signal_handler)로 바로 내보낼 수 있다.
+    """
+
+    def __init__(self, enabled=True, fps_window=60):
+        self.enabled = enabled
+        self.stages = {}
+        self._stages_lock = threading.Lock()
+        self._frame_times = deque(maxlen=fps_window)
+        self.frames = 0
+        self.started_at = time.monotonic()
+        self._server = None
+
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return _StageTimer(self, name)
+
+    def record(self, name, elapsed_ns):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            with self._stages_lock:
+                histogram = self.stages.setdefault(name, LatencyHistogram())
+        histogram.record(elapsed_ns)
+
+    def tick(self):
+        """출력된 프레임 하나 (fps 계산용)"""
+        self.frames += 1
+        self._frame_times.append(time.monotonic())
+
+    def fps(self):
+        """최근 fps_window 프레임 기준 fps"""
+        times = list(self._frame_times)
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def snapshot(self):
+        with self._stages_lock:
+            stages = dict(self.stages)
+        return {
+            'timestamp': time.time(),
+            'uptime_s': time.monotonic() - self.started_at,
+            'frames': self.frames,
+            'fps': self.fps(),
+            'stages': {name: histogram.summary() for name, histogram in stages.items()},
+        }
+
+    def format_summary(self):
+        snapshot = self.snapshot()
+        lines = [f"fps {snapshot['fps']:.1f}, 프레임 {snapshot['frames']}"]
+        for name, s in snapshot['stages'].items():
+            lines.append(f"  {name:>10}: p50 {s['p50_ms']:7.2f}ms  p95 {s['p95_ms']:7.2f}ms  "
+                         f"p99 {s['p99_ms']:7.2f}ms  ({s['count']}회)")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """스냅샷을 JSON 파일로 저장"""
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+    def install_signal_handler(self, path, signum=signal.SIGUSR1):
+        """kill -USR1 <pid> 로 스냅샷 파일 저장 (메인 스레드에서만 호출 가능)"""
+        def handler(signum, frame):
+            print(f"계측 스냅샷 저장: {self.dump(path)}")
+        signal.signal(signum, handler)
+
+    def serve_http(self, port, host='0.0.0.0'):
+        """GET /metrics 로 스냅샷 JSON을 돌려주는 HTTP 서버를 백그라운드 스레드로 시작"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = json.dumps(metrics.snapshot()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,78 @@
+# motion.py
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """주차장 ROI의 축소 이미지로 변화가 있었는지 싸게 판단한다
+
+    이동 평균 배경과 현재 프레임의 채널별 차이 중 최대값이 diff_threshold를 넘는 픽셀 비율이
+    motion_threshold 이하이면 '정지' 로 보고 전체 탐지를 건너뛸 수 있게 한다.
+    refresh_interval 프레임 동안 건너뛰기만 했으면 한 번은 강제로 탐지한다.
+    """
+
+    def __init__(self, scale=0.25, diff_threshold=25, motion_threshold=0.002,
+                 refresh_interval=30, learning_rate=0.05):
+        self.scale = scale                        # 비교용 축소 비율
+        self.diff_threshold = diff_threshold      # 픽셀 밝기 차이 임계값 (0~255)
+        self.motion_threshold = motion_threshold  # 바뀐 픽셀 비율 임계값
+        self.refresh_interval = refresh_interval  # 이 프레임 수마다 강제 탐지 (0이면 사용 안 함)
+        self.learning_rate = learning_rate        # 배경 이동 평균 갱신 비율
+
+        self._background = None
+        self._key = None
+        self._skipped = 0
+
+        # 통계
+        self.checked = 0
+        self.skipped_total = 0
+        self.last_motion = 0.0
+
+    def reset(self):
+        self._background = None
+        self._skipped = 0
+
+    def _small(self, frame, roi):
+        x, y, w, h = roi
+        crop = frame[y:y + h, x:x + w]
+        small_w = max(int(w * self.scale), 1)
+        small_h = max(int(h * self.scale), 1)
+        # 흑백으로 바꾸면 어두운 바닥 위 파란 차처럼 밝기가 비슷한 변화를 놓치므로 컬러 그대로 비교
+        return cv2.resize(crop, (small_w, small_h), interpolation=cv2.INTER_AREA)
+
+    def should_detect(self, frame, roi):
+        """전체 탐지가 필요하면 True, 이전 결과를 재사용해도 되면 False"""
+        self.checked += 1
+        small = self._small(frame, roi)
+
+        # ROI가 바뀌면 배경을 새로 시작
+        key = (tuple(roi), small.shape)
+        if key != self._key or self._background is None:
+            self._key = key
+            self._background = small.astype(np.float32)
+            self._skipped = 0
+            self.last_motion = 1.0
+            return True
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self._background)).max(axis=2)
+        changed = np.count_nonzero(diff > self.diff_threshold)
+        self.last_motion = changed / float(diff.size)
+        cv2.accumulateWeighted(small, self._background, self.learning_rate)
+
+        if self.last_motion > self.motion_threshold:
+            self._skipped = 0
+            return True
+
+        if self.refresh_interval and self._skipped >= self.refresh_interval:
+            self._skipped = 0
+            return True
+
+        self._skipped += 1
+        self.skipped_total += 1
+        return False
+
+    def hit_rate(self):
+        """탐지를 건너뛴 프레임 비율"""
+        if self.checked == 0:
+            return 0.0
+        return self.skipped_total / self.checked
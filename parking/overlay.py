@@ -0,0 +1,37 @@
+# overlay.py
+import cv2
+import numpy as np
+
+from parking.roi import AreaMask
+
+
+class AreaOverlay:
+    """parking_area 반투명 오버레이를 영역이 바뀔 때만 만들어 두고, 영역 ROI 안에서만 합성한다
+
+    전체 프레임 복사 + 전체 addWeighted 와 결과는 같다 (다각형 밖은 원래 값 그대로).
+    """
+
+    def __init__(self, color=(255, 255, 0), alpha=0.1):
+        self.color = color
+        self.alpha = alpha
+        self.area_mask = AreaMask(margin=0)
+        self._key = None
+        self._tile = None    # ROI 크기 단색 이미지
+        self._inside = None  # ROI 크기 다각형 마스크 (uint8)
+
+    def apply(self, frame, parking_area):
+        roi, mask = self.area_mask.get(parking_area, frame.shape)
+        x, y, w, h = roi
+        if mask is None or w == 0 or h == 0:
+            return
+
+        key = (tuple(parking_area), frame.shape, frame.dtype)
+        if key != self._key:
+            self._tile = np.empty((h, w, 3), dtype=frame.dtype)
+            self._tile[:] = self.color
+            self._inside = mask
+            self._key = key
+
+        region = frame[y:y + h, x:x + w]
+        blended = cv2.addWeighted(self._tile, self.alpha, region, 1.0 - self.alpha, 0)
+        cv2.copyTo(blended, self._inside, region)
@@ -0,0 +1,222 @@
+# pipeline.py
+import threading
+import time
+from collections import deque
+
+
+class LatestFrameSlot:
+    """가장 최근 항목 하나만 보관하는 슬롯
+
+    소비자가 가져가기 전에 새 항목이 들어오면 이전 항목은 버리고 dropped를 올린다.
+    생산자(카메라)는 절대 막히지 않는다.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """새 항목이 올 때까지 대기, 닫혔거나 타임아웃이면 None"""
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait(timeout)
+            item = self._item
+            self._item = None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class DropOldestQueue:
+    """크기 제한 큐, 가득 차면 가장 오래된 항목을 버린다 (put은 막히지 않음)"""
+
+    def __init__(self, maxsize):
+        self._cond = threading.Condition()
+        self._items = deque()
+        self._maxsize = maxsize
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        """항목 추가, 가득 차서 밀려난 항목이 있으면 그 항목을 돌려준다"""
+        dropped_item = None
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                dropped_item = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        return dropped_item
+
+    def get(self, timeout=None):
+        """항목이 올 때까지 대기, 닫혔거나 타임아웃이면 None"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FramePipeline:
+    """ParkingTracker의 캡처 / 탐지 / 렌더 / 출력 단계를 스레드로 나눠 돌린다
+
+    캡처 -> LatestFrameSlot -> 탐지 -> DropOldestQueue -> 렌더 -> DropOldestQueue -> 출력
+    출력 단계(경고 처리, 저장, 화면 표시)는 imshow 때문에 run()을 호출한 스레드에서 돈다.
+    뒤 단계가 느리면 앞 단계가 막히는 대신 프레임을 버리고 그 수를 센다.
+    """
+
+    def __init__(self, tracker, queue_size=2):
+        self.tracker = tracker
+        self.stop_event = threading.Event()
+
+        self.capture_slot = LatestFrameSlot()
+        self.render_queue = DropOldestQueue(queue_size)
+        self.output_queue = DropOldestQueue(queue_size)
+
+        # 탐지 결과 링 버퍼는 큐 두 개 + 탐지/렌더/출력 스레드가 잡고 있는 결과보다 커야 한다
+        tracker.detection_pool.reserve(2 * queue_size + 4)
+
+        # 통계
+        self.captured = 0
+        self.capture_failed = False
+        self.latency_sum = 0.0   # 캡처 ~ 출력 완료 지연 합 (초)
+        self.latency_count = 0
+
+        self._threads = []
+
+    # 단계별 스레드 ----------------------------------------------------------------
+
+    def _capture_loop(self):
+        while not self.stop_event.is_set():
+            with self.tracker.metrics.stage('capture'):
+                ret, frame = self.tracker.cap.read()
+            if not ret:
+                print("카메라에서 프레임을 읽을 수 없다")
+                self.capture_failed = True
+                break
+
+            self.captured += 1
+            self.capture_slot.put((time.monotonic(), frame))
+
+        self.stop_event.set()
+        self.capture_slot.close()
+
+    def _detect_loop(self):
+        while not self.stop_event.is_set():
+            item = self.capture_slot.get(timeout=0.5)
+            if item is None:
+                continue
+
+            captured_at, frame = item
+            detected_cars = self.tracker.process_frame(frame, captured_at)
+            # 영역/점유는 이 프레임의 스냅샷을 같이 넘긴다 (뒤 단계는 트래커 필드를 읽지 않음)
+            state = self.tracker.frame_state()
+            self.render_queue.put((captured_at, frame, detected_cars, state))
+
+        self.render_queue.close()
+
+    def _render_loop(self):
+        while not self.stop_event.is_set():
+            item = self.render_queue.get(timeout=0.5)
+            if item is None:
+                continue
+
+            captured_at, frame, detected_cars, state = item
+            near_mask = self.tracker.near_boundary_mask(detected_cars, state)
+            cars_near_boundary = detected_cars[near_mask]
+
+            # 화면에 표시하거나 저장할 프레임만 그린다
+            rendered = self.tracker.render_due()
+            if rendered:
+                with self.tracker.metrics.stage('draw'):
+                    self.tracker.draw_interface(frame, detected_cars, near_mask, state)
+            self.output_queue.put((captured_at, frame, detected_cars, cars_near_boundary, rendered, state))
+
+        self.output_queue.close()
+
+    # 실행 ----------------------------------------------------------------
+
+    def dropped_counts(self):
+        """단계별로 버려진 프레임 수"""
+        return {
+            'capture': self.capture_slot.dropped,
+            'render': self.render_queue.dropped,
+            'output': self.output_queue.dropped,
+        }
+
+    def average_latency(self):
+        if self.latency_count == 0:
+            return 0.0
+        return self.latency_sum / self.latency_count
+
+    def start(self):
+        for name, target in (('capture', self._capture_loop),
+                             ('detect', self._detect_loop),
+                             ('render', self._render_loop)):
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        self.capture_slot.close()
+        self.render_queue.close()
+        self.output_queue.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    def run(self):
+        """출력 단계를 현재 스레드에서 돌린다, 종료 요청이나 캡처 실패 시 반환"""
+        self.start()
+        try:
+            while not self.stop_event.is_set():
+                item = self.output_queue.get(timeout=0.5)
+                if item is None:
+                    continue
+
+                captured_at, frame, detected_cars, cars_near_boundary, rendered, state = item
+                with self.tracker.metrics.stage('warning'):
+                    self.tracker.handle_warning(cars_near_boundary)
+                keep_running = self.tracker.handle_output(frame, detected_cars, cars_near_boundary, rendered, state)
+
+                self.latency_sum += time.monotonic() - captured_at
+                self.latency_count += 1
+
+                # 30프레임마다 드롭/지연 통계 출력
+                if self.tracker.frame_count % 30 == 0:
+                    dropped = self.dropped_counts()
+                    print(f"  파이프라인: 캡처 {self.captured}프레임, "
+                          f"드롭 (캡처 {dropped['capture']}, 렌더 {dropped['render']}, 출력 {dropped['output']}), "
+                          f"평균 지연 {self.average_latency() * 1000:.1f}ms")
+
+                if not keep_running:
+                    break
+        finally:
+            self.stop()
@@ -0,0 +1,100 @@
+# rectify.py
+import cv2
+import numpy as np
+
+from parking.geometry import PolygonGeometry
+
+
+class LotRectifier:
+    """parking_area 사각형을 실제 크기(cm) 기준 위에서 본 고정 크기 이미지로 펴는 호모그래피
+
+    호모그래피와 cv2.remap 맵(convertMaps로 고정소수점 변환)은 parking_area가 바뀔 때만 다시 만든다.
+    펴진 이미지는 px_per_cm 해상도라 거리(px)를 px_per_cm로 나누면 cm가 된다.
+    parking_area 꼭짓점 순서는 좌상단, 우상단, 우하단, 좌하단.
+    """
+
+    def __init__(self, width_cm, height_cm, px_per_cm=2.0):
+        self.width_cm = width_cm
+        self.height_cm = height_cm
+        self.px_per_cm = px_per_cm
+        self.size = (max(int(round(width_cm * px_per_cm)), 2), max(int(round(height_cm * px_per_cm)), 2))
+
+        self.geometry = PolygonGeometry()  # 펴진 이미지 테두리 (경계 거리 계산용)
+        w, h = self.size
+        self.geometry.update([(0, 0), (w - 1, 0), (w - 1, h - 1), (0, h - 1)])
+
+        self._key = None
+        self.homography = None          # 프레임 -> 펴진 이미지
+        self.inverse = None             # 펴진 이미지 -> 프레임
+        self.frame_px_per_rect_px = 1.0 # 크기 비율 (커널/최소 면적 환산용)
+        self._maps = None
+        self._warped = None
+
+    @property
+    def ready(self):
+        return self.homography is not None
+
+    def update(self, parking_area):
+        """영역이 바뀌었을 때만 호모그래피와 remap 맵 재계산, 영역이 4점이 아니면 해제"""
+        key = tuple(tuple(p) for p in parking_area)
+        if key == self._key:
+            return False
+        self._key = key
+
+        if len(parking_area) != 4:
+            self.homography = self.inverse = self._maps = None
+            return True
+
+        w, h = self.size
+        src = np.array(parking_area, dtype=np.float32)
+        dst = np.array([(0, 0), (w - 1, 0), (w - 1, h - 1), (0, h - 1)], dtype=np.float32)
+        self.homography = cv2.getPerspectiveTransform(src, dst)
+        self.inverse = cv2.getPerspectiveTransform(dst, src)
+
+        # 펴진 이미지 픽셀마다 원본 좌표 (remap은 역방향 맵)
+        xs, ys = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
+        grid = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+        source = cv2.perspectiveTransform(grid, self.inverse).reshape(h, w, 2)
+        self._maps = cv2.convertMaps(source[..., 0], source[..., 1], cv2.CV_16SC2)
+        self._warped = None
+
+        # 원본 영역 면적 / 펴진 이미지 면적 (길이 비율은 제곱근)
+        self.frame_px_per_rect_px = float(np.sqrt(cv2.contourArea(src) / float(w * h)))
+        return True
+
+    def warp(self, frame):
+        """영역만 펴진 이미지로 (출력 버퍼는 재사용, 다음 호출 전까지만 유효)"""
+        w, h = self.size
+        if self._warped is None or self._warped.shape[2:] != frame.shape[2:] or self._warped.dtype != frame.dtype:
+            self._warped = np.empty((h, w) + frame.shape[2:], dtype=frame.dtype)
+        cv2.remap(frame, self._maps[0], self._maps[1], cv2.INTER_LINEAR, dst=self._warped,
+                  borderMode=cv2.BORDER_CONSTANT)
+        return self._warped
+
+    def to_rectified(self, points):
+        """프레임 좌표 (N, 2) -> 펴진 이미지 좌표"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.homography).reshape(-1, 2)
+
+    def to_frame(self, points):
+        """펴진 이미지 좌표 (N, 2) -> 프레임 좌표"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.inverse).reshape(-1, 2)
+
+    def classify(self, points):
+        """프레임 좌표 점들의 (영역 내부 여부, 부호 있는 경계 거리 cm)"""
+        inside, distances = self.geometry.classify(self.to_rectified(points))
+        return inside, distances / self.px_per_cm
+
+    def boxes_to_frame(self, boxes):
+        """펴진 이미지 바운딩 박스 (N, 4: x, y, w, h) -> 꼭짓점 4개를 되돌린 프레임 바운딩 박스"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        x, y, w, h = boxes.T
+        corners = np.stack([
+            np.stack([x, y], axis=1), np.stack([x + w, y], axis=1),
+            np.stack([x + w, y + h], axis=1), np.stack([x, y + h], axis=1),
+        ], axis=1)  # (N, 4, 2)
+        projected = self.to_frame(corners.reshape(-1, 2)).reshape(-1, 4, 2)
+        top_left = np.floor(projected.min(axis=1))
+        bottom_right = np.ceil(projected.max(axis=1))
+        return np.concatenate([top_left, bottom_right - top_left], axis=1).astype(np.int32)
@@ -0,0 +1,66 @@
+# roi.py
+import cv2
+import numpy as np
+
+
+class AreaMask:
+    """parking_area 다각형의 바운딩 ROI와 ROI 크기 마스크를 캐시한다
+
+    parking_area나 프레임 크기가 바뀔 때만 fillPoly를 다시 하고,
+    영역이 설정되지 않았으면 전체 프레임 ROI에 마스크 없음(None)을 돌려준다.
+    """
+
+    def __init__(self, margin=8):
+        # 모폴로지 연산이 ROI 경계에서 전체 프레임과 같은 결과를 내도록 두는 여유 픽셀 (7x7 커널 기준)
+        self.margin = margin
+        self._key = None
+        self.roi = None    # (x, y, w, h) 전체 프레임 좌표
+        self.mask = None   # ROI 크기 uint8 마스크 (다각형 내부 255), 영역이 없으면 None
+        self._scaled = {}  # 배율 -> 축소 마스크
+
+    def get(self, parking_area, frame_shape):
+        """(roi, mask) 반환, 바뀐 게 없으면 캐시된 값을 그대로 돌려준다"""
+        height, width = frame_shape[:2]
+        key = (tuple(parking_area), height, width)
+        if key == self._key:
+            return self.roi, self.mask
+
+        if len(parking_area) == 4:
+            pts = np.array(parking_area, np.int32)
+            x, y, w, h = cv2.boundingRect(pts)
+
+            # 여유 픽셀을 붙이고 프레임 안으로 자르기
+            x0 = min(max(x - self.margin, 0), width)
+            y0 = min(max(y - self.margin, 0), height)
+            x1 = max(min(x + w + self.margin, width), x0)
+            y1 = max(min(y + h + self.margin, height), y0)
+
+            mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+            cv2.fillPoly(mask, [pts - (x0, y0)], 255)
+            roi = (x0, y0, x1 - x0, y1 - y0)
+        else:
+            mask = None
+            roi = (0, 0, width, height)
+
+        self._key = key
+        self.roi = roi
+        self.mask = mask
+        self._scaled = {}
+        return roi, mask
+
+    @staticmethod
+    def scaled_size(roi, scale):
+        """ROI를 scale 배율로 줄였을 때의 (가로, 세로)"""
+        _, _, w, h = roi
+        return max(int(round(w * scale)), 1), max(int(round(h * scale)), 1)
+
+    def scaled_mask(self, scale):
+        """마지막 get() 마스크를 scale 배율로 줄인 마스크 (배율별 캐시), 영역이 없으면 None"""
+        if self.mask is None:
+            return None
+
+        mask = self._scaled.get(scale)
+        if mask is None:
+            mask = cv2.resize(self.mask, self.scaled_size(self.roi, scale), interpolation=cv2.INTER_NEAREST)
+            self._scaled[scale] = mask
+        return mask
@@ -0,0 +1,101 @@
+# slots.py
+import json
+
+import cv2
+import numpy as np
+
+
+def load_slots(path):
+    """주차칸 설정 파일 읽기
+
+    {"occupied_ratio": 0.3, "slots": [{"id": "A1", "polygon": [[x, y], ...]}, ...]}
+    좌표는 전체 해상도 프레임 기준. occupied_ratio는 생략 가능.
+    """
+    with open(path) as f:
+        config = json.load(f)
+
+    slots = []
+    for index, slot in enumerate(config.get('slots', [])):
+        polygon = [(int(x), int(y)) for x, y in slot['polygon']]
+        if len(polygon) < 3:
+            raise ValueError(f"주차칸 {slot.get('id', index)}: 꼭짓점이 3개 이상이어야 한다")
+        slots.append((str(slot.get('id', index + 1)), polygon))
+    return slots, config.get('occupied_ratio')
+
+
+class SlotOccupancy:
+    """주차칸 다각형들을 슬롯 ID 라벨 맵으로 한 번 래스터화해 두고,
+    색상 라벨 이미지에서 칸별 차량 색 픽셀 수를 히스토그램 한 번으로 센다
+
+    라벨 맵은 색상 분류에 쓰는 ROI/배율에 맞춰 만들고 ROI나 배율이 바뀔 때만 다시 만든다.
+    프레임당 비용은 ROI 픽셀 수에 비례하고 주차칸 수와는 거의 무관하다.
+    겹치는 칸은 뒤에 나온 칸이 차지한다.
+    """
+
+    def __init__(self, slots=(), occupied_ratio=0.3):
+        self.occupied_ratio = occupied_ratio  # 칸 면적 중 차량 색 픽셀 비율이 이 값 이상이면 점유
+        self.set_slots(slots)
+
+    def set_slots(self, slots):
+        """[(id, 다각형), ...] 설정, 라벨 맵은 다음 update에서 다시 만든다"""
+        self.slot_ids = [slot_id for slot_id, _ in slots]
+        self.polygons = [np.array(polygon, dtype=np.float64) for _, polygon in slots]
+        count = len(self.slot_ids)
+        self._key = None
+        self._label_map = None
+        self._slot_area = np.zeros(count)
+
+        # 최근 결과
+        self.ratios = np.zeros(count)
+        self.occupied = np.zeros(count, dtype=bool)
+        self.frames = 0
+
+    def __len__(self):
+        return len(self.slot_ids)
+
+    def _build(self, roi, scale, shape, area_mask):
+        roi_x, roi_y = roi[:2]
+        count = len(self.slot_ids)
+        dtype = np.uint8 if count < 256 else np.uint16
+        label_map = np.zeros(shape, dtype=dtype)
+        for index, polygon in enumerate(self.polygons):
+            points = np.round((polygon - (roi_x, roi_y)) * scale).astype(np.int32)
+            cv2.fillPoly(label_map, [points], index + 1)
+
+        # 칸 면적 (주차장 영역 마스크 밖은 제외, 분류 라벨 이미지와 같은 조건)
+        self._slot_area = self._histogram(label_map, area_mask, count + 1)[1:]
+        self._label_map = label_map
+
+    @staticmethod
+    def _histogram(label_map, mask, bins):
+        return cv2.calcHist([label_map], [0], mask, [bins], [0, bins]).ravel().astype(np.float64)
+
+    def update(self, labels, roi, scale=1.0, area_mask=None, area_key=None):
+        """색상 라벨 이미지(ROI 크기, 0이 아니면 차량 색)로 칸별 점유 갱신, 점유 bool 배열 반환
+
+        area_mask는 labels에 적용된 주차장 영역 마스크 (칸 면적 계산용, 없으면 None),
+        area_key는 그 마스크가 바뀌었는지 알 수 있는 값 (예: parking_area 좌표).
+        """
+        count = len(self.slot_ids)
+        if count == 0:
+            return self.occupied
+
+        key = (tuple(roi), scale, labels.shape, area_key)
+        if key != self._key:
+            self._build(roi, scale, labels.shape, area_mask)
+            self._key = key
+
+        # 차량 색 픽셀(라벨 != 0)만 마스크로 해서 슬롯 ID 히스토그램 (0번은 칸 밖)
+        counts = self._histogram(self._label_map, labels, count + 1)
+        np.divide(counts[1:], self._slot_area, out=self.ratios, where=self._slot_area > 0)
+        self.ratios[self._slot_area == 0] = 0.0
+        self.occupied = self.ratios >= self.occupied_ratio
+        self.frames += 1
+        return self.occupied
+
+    def bitmap(self):
+        """칸 순서대로 점유 여부를 비트로 묶은 bytes (첫 칸이 첫 바이트의 최상위 비트)"""
+        return np.packbits(self.occupied).tobytes()
+
+    def occupied_ids(self):
+        return [slot_id for slot_id, occupied in zip(self.slot_ids, self.occupied) if occupied]
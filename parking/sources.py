@@ -0,0 +1,357 @@
+# sources.py
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import cv2
+import numpy as np
+
+from parking.pipeline import LatestFrameSlot
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# camera/h264udp/camera.c 송출 설정 (rtph264pay pt=96, 기본 포트 5000)
+RTP_PAYLOAD_TYPE = 96
+DEFAULT_STREAM_PORT = 5000
+
+# FFmpeg 백엔드 저지연 옵션 (디코더 버퍼링, 재정렬 대기 없음)
+FFMPEG_LOW_LATENCY_OPTIONS = 'protocol_whitelist;file,udp,rtp|fflags;nobuffer|flags;low_delay|max_delay;0|reorder_queue_size;0'
+
+
+class FrameSource:
+    """cv2.VideoCapture 대신 ParkingTracker에 넣을 수 있는 프레임 소스 기본 클래스
+
+    read() / isOpened() / release() 만 구현하면 되고,
+    fps를 주면 실시간 카메라처럼 프레임 간격을 맞추고 max_frames를 주면 그만큼만 내보낸다.
+    """
+
+    def __init__(self, fps=None, max_frames=None, resolution=None):
+        self.fps = fps                  # None이면 최대 속도
+        self.max_frames = max_frames    # None이면 무한
+        self.resolution = resolution    # (가로, 세로), None이면 원본 크기
+        self.frames_read = 0
+        self._next_time = None
+
+    def _read_frame(self):
+        raise NotImplementedError
+
+    def _pace(self):
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_time is None:
+            self._next_time = now
+        elif now < self._next_time:
+            time.sleep(self._next_time - now)
+        self._next_time = max(self._next_time, now) + 1.0 / self.fps
+
+    def read(self):
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            return False, None
+
+        self._pace()
+        ret, frame = self._read_frame()
+        if not ret or frame is None:
+            return False, None
+
+        if self.resolution is not None and (frame.shape[1], frame.shape[0]) != tuple(self.resolution):
+            frame = cv2.resize(frame, tuple(self.resolution), interpolation=cv2.INTER_AREA)
+
+        self.frames_read += 1
+        return True, frame
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+
+class LoopedImageSource(FrameSource):
+    """이미지 한 장을 계속 내보낸다 (매번 복사본이라 draw_interface가 그려도 원본은 그대로)"""
+
+    def __init__(self, path='image.jpg', **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.image = cv2.imread(path)
+        if self.image is None:
+            print(f"이미지를 읽을 수 없다: {path}")
+        elif self.resolution is not None:
+            self.image = cv2.resize(self.image, tuple(self.resolution), interpolation=cv2.INTER_AREA)
+
+    def _read_frame(self):
+        if self.image is None:
+            return False, None
+        return True, self.image.copy()
+
+    def isOpened(self):
+        return self.image is not None
+
+
+class ImageDirectorySource(FrameSource):
+    """디렉토리의 이미지를 이름 순서대로 내보낸다 (loop면 처음부터 반복)"""
+
+    def __init__(self, directory, loop=True, **kwargs):
+        super().__init__(**kwargs)
+        self.loop = loop
+        self.paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self._index = 0
+        if not self.paths:
+            print(f"디렉토리에 이미지가 없다: {directory}")
+
+    def _read_frame(self):
+        if self._index >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self._index = 0
+
+        frame = cv2.imread(self.paths[self._index])
+        self._index += 1
+        return frame is not None, frame
+
+    def isOpened(self):
+        return bool(self.paths)
+
+
+class VideoFileSource(FrameSource):
+    """동영상 파일을 내보낸다 (loop면 끝에서 처음으로 되감기)"""
+
+    def __init__(self, path, loop=True, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            print(f"동영상을 열 수 없다: {path}")
+
+    def _read_frame(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class StreamSource(FrameSource):
+    """네트워크 스트림을 전용 스레드에서 계속 디코딩하고 가장 최근 프레임만 남긴다
+
+    read()는 디코딩을 기다리지 않고 최신 프레임을 가져가며, 그 사이 쌓인 프레임은 버린다 (dropped).
+    연결이 끊기면 reconnect_delay초 뒤 다시 연결한다. read_timeout초 동안 새 프레임이 없으면 read()는 실패.
+    """
+
+    def __init__(self, url, read_timeout=5.0, reconnect_delay=1.0, open_timeout=5.0, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.read_timeout = read_timeout
+        self.reconnect_delay = reconnect_delay
+        self.open_timeout = open_timeout
+
+        # 통계
+        self.decoded = 0
+        self.skipped = 0      # 디코딩하기 전에 더 새 프레임이 와서 건너뛴 수
+        self.reconnects = 0
+
+        self.slot = LatestFrameSlot()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stream-decoder", daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        return self.slot.dropped + self.skipped
+
+    def _stream(self):
+        """연결해서 끊길 때까지 _publish()로 프레임을 내보낸다"""
+        raise NotImplementedError
+
+    def _publish(self, frame):
+        self.decoded += 1
+        self.slot.put(frame)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._stream()
+            except Exception as e:
+                print(f"스트림 오류: {self.url} ({e})")
+            if self._stop.wait(self.reconnect_delay):
+                break
+            self.reconnects += 1
+            print(f"스트림 재연결 시도: {self.url}")
+
+    def _read_frame(self):
+        frame = self.slot.get(timeout=self.read_timeout)
+        return frame is not None, frame
+
+    def isOpened(self):
+        return not self._stop.is_set()
+
+    def release(self):
+        self._stop.set()
+        self.slot.close()
+        self._thread.join(timeout=self.open_timeout + 1.0)
+
+
+class MjpegStreamSource(StreamSource):
+    """MJPEG over HTTP (camera/camera.sh의 mjpg-streamer, 예: http://host:5000/?action=stream)
+
+    multipart 응답에서 JPEG 시작/끝 마커로 프레임을 잘라낸다.
+    한 번에 여러 프레임이 도착하면 마지막 프레임만 디코딩한다.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    MAX_BUFFER = 8 * 1024 * 1024  # 마커를 못 찾고 이만큼 쌓이면 버림
+
+    def _stream(self):
+        with urllib.request.urlopen(self.url, timeout=self.open_timeout) as response:
+            print(f"MJPEG 스트림 연결: {self.url}")
+            buffer = bytearray()
+            while not self._stop.is_set():
+                chunk = response.read1(self.CHUNK_SIZE)
+                if not chunk:
+                    raise ConnectionError("스트림이 끝났다")
+                buffer += chunk
+
+                latest = None
+                while True:
+                    start = buffer.find(b'\xff\xd8')
+                    if start < 0:
+                        # 마커가 청크 경계에 걸쳤을 수 있으므로 마지막 바이트는 남김
+                        del buffer[:-1]
+                        break
+                    end = buffer.find(b'\xff\xd9', start + 2)
+                    if end < 0:
+                        del buffer[:start]
+                        break
+                    if latest is not None:
+                        self.skipped += 1
+                    latest = bytes(buffer[start:end + 2])
+                    del buffer[:end + 2]
+
+                if len(buffer) > self.MAX_BUFFER:
+                    buffer.clear()
+
+                if latest is not None:
+                    frame = cv2.imdecode(np.frombuffer(latest, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if frame is not None:
+                        self._publish(frame)
+
+
+def gstreamer_available():
+    return any(line.strip().startswith('GStreamer:') and 'YES' in line
+               for line in cv2.getBuildInformation().splitlines())
+
+
+class RtpH264Source(StreamSource):
+    """RTP/H.264 over UDP (camera/h264udp/camera.c, 예: rtp://0.0.0.0:5000)
+
+    OpenCV에 GStreamer가 있으면 지터 버퍼 지연 0, 늦은 패킷 버림, appsink 버퍼 1개 파이프라인을 쓰고,
+    없으면 SDP 파일을 만들어 FFmpeg 백엔드를 버퍼링 없는 옵션으로 연다.
+    """
+
+    def __init__(self, url, **kwargs):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname or '0.0.0.0'
+        self.port = parts.port or DEFAULT_STREAM_PORT
+        self._sdp_path = None
+        super().__init__(url, **kwargs)
+
+    def gstreamer_pipeline(self):
+        return (
+            f'udpsrc address={self.host} port={self.port} '
+            f'caps="application/x-rtp,media=video,encoding-name=H264,payload={RTP_PAYLOAD_TYPE},clock-rate=90000" '
+            '! rtpjitterbuffer latency=0 drop-on-latency=true '
+            '! rtph264depay ! h264parse ! avdec_h264 ! videoconvert '
+            '! appsink drop=true max-buffers=1 sync=false'
+        )
+
+    def _write_sdp(self):
+        if self._sdp_path is None:
+            fd, self._sdp_path = tempfile.mkstemp(suffix='.sdp', prefix='safepark-rtp-')
+            with os.fdopen(fd, 'w') as f:
+                f.write("v=0\n"
+                        f"o=- 0 0 IN IP4 {self.host}\n"
+                        "s=SafePark\n"
+                        f"c=IN IP4 {self.host}\n"
+                        "t=0 0\n"
+                        f"m=video {self.port} RTP/AVP {RTP_PAYLOAD_TYPE}\n"
+                        f"a=rtpmap:{RTP_PAYLOAD_TYPE} H264/90000\n")
+        return self._sdp_path
+
+    def _open_capture(self):
+        if gstreamer_available():
+            return cv2.VideoCapture(self.gstreamer_pipeline(), cv2.CAP_GSTREAMER)
+
+        # FFmpeg 캡처 옵션은 환경 변수로만 줄 수 있어서 여는 동안만 바꿔 둔다
+        previous = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+        os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = FFMPEG_LOW_LATENCY_OPTIONS
+        try:
+            return cv2.VideoCapture(self._write_sdp(), cv2.CAP_FFMPEG,
+                                    [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.open_timeout * 1000),
+                                     cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.read_timeout * 1000)])
+        finally:
+            if previous is None:
+                os.environ.pop('OPENCV_FFMPEG_CAPTURE_OPTIONS', None)
+            else:
+                os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = previous
+
+    def _stream(self):
+        cap = self._open_capture()
+        try:
+            if not cap.isOpened():
+                raise ConnectionError("RTP 스트림을 열 수 없다")
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            print(f"RTP/H.264 스트림 수신: {self.host}:{self.port}")
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    raise ConnectionError("프레임을 받을 수 없다")
+                self._publish(frame)
+        finally:
+            cap.release()
+
+    def release(self):
+        super().release()
+        if self._sdp_path is not None:
+            try:
+                os.remove(self._sdp_path)
+            except OSError:
+                pass
+            self._sdp_path = None
+
+
+def open_source(spec, **kwargs):
+    """경로 종류에 맞는 프레임 소스 생성 (프레임 버스 shm:// / 네트워크 스트림 URL / 디렉토리 / 이미지 파일 / 동영상 파일)"""
+    scheme = urllib.parse.urlsplit(spec).scheme.lower()
+    if scheme == 'shm':
+        # 프레임 버스 (framebus가 FrameSource를 가져다 쓰므로 여기서 import)
+        from parking.framebus import FrameBusSource
+        kwargs.pop('loop', None)
+        return FrameBusSource(spec[len('shm://'):], **kwargs)
+    if scheme in ('http', 'https'):
+        kwargs.pop('loop', None)
+        return MjpegStreamSource(spec, **kwargs)
+    if scheme in ('rtp', 'udp'):
+        kwargs.pop('loop', None)
+        return RtpH264Source(spec, **kwargs)
+
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, **kwargs)
+
+    if spec.lower().endswith(IMAGE_EXTENSIONS):
+        kwargs.pop('loop', None)
+        return LoopedImageSource(spec, **kwargs)
+
+    return VideoFileSource(spec, **kwargs)
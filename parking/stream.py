@@ -0,0 +1,174 @@
+# stream.py
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from parking.pipeline import LatestFrameSlot
+
+BOUNDARY = 'safeparkframe'
+CLIENT_CHECK_INTERVAL = 1.0  # 보낼 프레임이 없을 때 클라이언트 연결을 확인하는 간격 (초)
+
+
+def _peer_closed(sock):
+    """MJPEG 클라이언트는 요청 뒤로 보내는 것이 없으므로, 읽을 게 생겼다면 연결 종료(EOF)나 오류다"""
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return True
+
+
+class MjpegBroadcaster:
+    """프레임을 한 번만 JPEG로 인코딩해서 접속한 모든 클라이언트에게 같은 바이트를 보내는 MJPEG over HTTP 서버
+
+    publish()는 인코딩 스레드에 최신 프레임만 넘기고 바로 돌아온다 (인코딩이 밀리면 이전 프레임은 버림).
+    클라이언트가 없으면 인코딩하지 않는다. 클라이언트마다 자기 스레드에서 가장 최근 JPEG만 가져가므로
+    느린 클라이언트는 그 사이 프레임을 건너뛰고, 다른 클라이언트나 인코딩을 막지 않는다.
+    max_fps를 주면 그 이상은 인코딩하지 않는다.
+    """
+
+    def __init__(self, jpeg_quality=80, max_fps=None):
+        self.jpeg_quality = jpeg_quality
+        self.max_fps = max_fps
+        self._slot = LatestFrameSlot()
+        self._cond = threading.Condition()
+        self._jpeg = None
+        self._sequence = 0
+        self._clients = 0
+        self._last_accepted = 0.0
+        self._closed = False
+        self._server = None
+
+        # 통계
+        self.encoded = 0
+        self.skipped = 0         # 클라이언트가 없거나 max_fps 때문에 인코딩하지 않은 프레임
+        self.client_dropped = 0  # 클라이언트가 느려서 건너뛴 프레임 합 (모든 클라이언트)
+
+        self._thread = threading.Thread(target=self._encode_loop, name="mjpeg-encoder", daemon=True)
+        self._thread.start()
+
+    @property
+    def clients(self):
+        return self._clients
+
+    @property
+    def encode_dropped(self):
+        """인코딩 스레드가 밀려서 버린 프레임 수"""
+        return self._slot.dropped
+
+    def wants_frame(self):
+        """지금 프레임을 넘기면 인코딩할지 (클라이언트가 있고 max_fps 간격이 지났는지)
+
+        그리기를 생략하는 모드에서 이 값으로 그릴 프레임을 정한다.
+        """
+        if self._clients == 0 or self._closed:
+            return False
+        if self.max_fps:
+            return time.monotonic() - self._last_accepted >= 1.0 / self.max_fps
+        return True
+
+    def publish(self, frame):
+        """그려진 프레임 넘기기 (막히지 않음), 인코딩 대상이면 True
+
+        frame은 인코딩이 끝날 때까지 참조하므로 넘긴 뒤에 수정하지 않는다.
+        """
+        if not self.wants_frame():
+            self.skipped += 1
+            return False
+        self._last_accepted = time.monotonic()
+        self._slot.put(frame)
+        return True
+
+    def _encode_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        while not self._closed:
+            frame = self._slot.get(timeout=0.5)
+            if frame is None:
+                continue
+            ok, encoded = cv2.imencode('.jpg', frame, params)
+            if not ok:
+                continue
+            with self._cond:
+                self._jpeg = encoded.tobytes()
+                self._sequence += 1
+                self._cond.notify_all()
+            self.encoded += 1
+
+    def wait_next(self, last_sequence, timeout=5.0):
+        """last_sequence 이후 새 JPEG가 나올 때까지 대기, (번호, JPEG) 반환 (타임아웃이면 JPEG는 None)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._sequence != last_sequence or self._closed, timeout):
+                return last_sequence, None
+            return self._sequence, self._jpeg
+
+    def _client_connected(self):
+        """클라이언트 수를 올리고 현재 JPEG 번호 반환"""
+        with self._cond:
+            self._clients += 1
+            return self._sequence
+
+    def _client_disconnected(self, dropped):
+        with self._cond:
+            self._clients -= 1
+            self.client_dropped += dropped
+
+    def serve_http(self, port, host='0.0.0.0'):
+        """GET 요청에 multipart/x-mixed-replace MJPEG 스트림으로 응답하는 서버를 백그라운드 스레드로 시작"""
+        broadcaster = self
+
+        class Handler(BaseHTTPRequestHandler):
+            timeout = 10  # 응답 없는 클라이언트는 쓰기 타임아웃으로 정리
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+
+                # 접속 전에 인코딩된 JPEG는 오래됐을 수 있으므로 다음 프레임부터 보낸다
+                sequence = broadcaster._client_connected()
+                dropped = 0
+                try:
+                    while not broadcaster._closed:
+                        next_sequence, jpeg = broadcaster.wait_next(sequence, timeout=CLIENT_CHECK_INTERVAL)
+                        if jpeg is None or broadcaster._closed:
+                            # 프레임이 없는 동안에도 끊긴 클라이언트는 바로 정리 (클라이언트 수가 인코딩 여부를 정함)
+                            if _peer_closed(self.connection):
+                                break
+                            continue
+                        if next_sequence > sequence + 1:
+                            dropped += next_sequence - sequence - 1
+                        sequence = next_sequence
+                        self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                         f"Content-Length: {len(jpeg)}\r\n\r\n".encode('ascii'))
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except OSError:
+                    pass  # 연결 끊김, 쓰기 타임아웃
+                finally:
+                    broadcaster._client_disconnected(dropped)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mjpeg-http", daemon=True).start()
+        return self._server
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._slot.close()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._thread.join(timeout=1.0)
@@ -0,0 +1,301 @@
+# supervisor.py
+import json
+import multiprocessing
+import os
+import queue
+import time
+
+import cv2
+
+from parking.camera import BACKENDS, probe_cameras
+from parking.detections import color_name
+from parking.gpio_stub import StubGPIO
+from parking.sources import open_source
+
+
+def load_cameras(path):
+    """카메라별 추적 설정 파일 읽기
+
+    {"cameras": [{"name": "A", "source": "rtp://0.0.0.0:5000", "parking_area": [[x, y], ...],
+                  "slots": "slots_a.json", "scale": 0.5, "stream_port": 8081, "cpu": 2}, ...]}
+    source 대신 "device": 0 이면 로컬 카메라. 나머지 키는 모두 생략 가능 (run_worker 참고).
+    """
+    with open(path) as f:
+        config = json.load(f)
+
+    cameras = []
+    names = set()
+    for index, camera in enumerate(config.get('cameras', [])):
+        camera = dict(camera)
+        camera.setdefault('name', str(index + 1))
+        if camera['name'] in names:
+            raise ValueError(f"카메라 이름이 겹친다: {camera['name']}")
+        if 'source' not in camera and 'device' not in camera:
+            raise ValueError(f"카메라 {camera['name']}: source 또는 device가 필요하다")
+        names.add(camera['name'])
+        cameras.append(camera)
+    return cameras
+
+
+def _open_camera_source(camera):
+    if 'source' in camera:
+        return open_source(camera['source'], fps=camera.get('fps'))
+    candidates = [(camera['device'], backend_name) for _, backend_name in BACKENDS]
+    cap, _ = probe_cameras(candidates, camera.get('width', 1280), camera.get('height', 720),
+                           camera.get('fps') or 15)
+    return cap
+
+
+def run_worker(camera, results, stop_event, cpu=None):
+    """카메라 하나를 맡는 추적 프로세스 본체 (TrackerSupervisor가 프로세스마다 실행)
+
+    프레임마다 탐지/경고를 처리하고 결과 요약을 results 큐로 보낸다. 큐가 가득 차면
+    (감독 프로세스가 밀리면) 기다리지 않고 그 결과를 버린다. 소스가 끝나거나 끊기면
+    종료 코드 1로 끝나서 감독 프로세스가 다시 시작하게 한다.
+    GPIO는 "gpio": true인 카메라만 실제 RPi.GPIO, 나머지는 StubGPIO.
+    """
+    # parking_tracker가 parking 패키지를 가져다 쓰므로 여기서 import
+    from parking_tracker import ParkingTracker
+
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+    # 코어 하나에 고정했으므로 OpenCV 내부 스레드 풀은 쓰지 않는다 (코어마다 프로세스 하나)
+    cv2.setNumThreads(1)
+
+    name = camera['name']
+    source = _open_camera_source(camera)
+    if source is None or not source.isOpened():
+        print(f"[{name}] 프레임 소스를 열 수 없다")
+        raise SystemExit(1)
+
+    gpio = None if camera.get('gpio') else StubGPIO()
+    tracker = ParkingTracker(headless=True, source=source, gpio=gpio, camera_cache=None)
+    tracker.render_enabled = False  # 이미지 저장 없이 송출(stream_port)을 볼 때만 그린다
+    if 'parking_area' in camera:
+        tracker.parking_area = tuple(tuple(point) for point in camera['parking_area'])
+    tracker.processing_scale = camera.get('scale', 1.0)
+    tracker.refine_full_resolution = camera.get('refine', False)
+    tracker.motion_gating = camera.get('motion_gate', False)
+    tracker.detect_interval = camera.get('detect_interval', 1)
+    if camera.get('rectify'):
+        width_cm, height_cm = (float(v) for v in camera['rectify'].lower().split('x'))
+        tracker.enable_rectification(width_cm, height_cm, camera.get('px_per_cm', 2.0))
+    if camera.get('slots'):
+        tracker.load_slot_config(camera['slots'])
+    if camera.get('stream_port'):
+        tracker.start_stream(camera['stream_port'], max_fps=camera.get('stream_fps'))
+
+    frame_number = 0
+    dropped = 0
+    exit_code = 0
+    try:
+        while not stop_event.is_set():
+            ret, frame = tracker.cap.read()
+            if not ret:
+                print(f"[{name}] 프레임을 읽을 수 없다")
+                exit_code = 1
+                break
+
+            timestamp = time.time()
+            detected_cars = tracker.process_frame(frame)
+            near_mask = tracker.near_boundary_mask(detected_cars)
+            if tracker.render_due():
+                tracker.draw_interface(frame, detected_cars, near_mask)
+                tracker.stream.publish(frame)
+            tracker.handle_warning(detected_cars[near_mask])
+            tracker.metrics.tick()
+            frame_number += 1
+
+            occupancy = tracker.slot_occupancy
+            message = {
+                'camera': name,
+                'pid': os.getpid(),
+                'frame': frame_number,
+                'timestamp': timestamp,
+                'fps': tracker.metrics.fps(),
+                'cars': [
+                    {
+                        'color': color_name(car['color']),
+                        'center': car['center'].tolist(),
+                        'track_id': int(car['track_id']),
+                        'distance': round(float(car['distance']), 1),
+                        'near': bool(near),
+                    }
+                    for car, near in zip(detected_cars, near_mask)
+                ],
+                'slots': len(occupancy),
+                'occupied': occupancy.occupied_ids(),
+                'dropped': dropped,
+            }
+            try:
+                results.put_nowait(message)
+            except queue.Full:
+                dropped += 1
+    except KeyboardInterrupt:
+        pass  # Ctrl+C는 감독 프로세스가 stop()으로 처리
+    finally:
+        tracker.cleanup()
+    raise SystemExit(exit_code)
+
+
+class _WorkerState:
+    def __init__(self, camera, cpu):
+        self.camera = camera
+        self.cpu = cpu
+        self.process = None
+        self.started_at = 0.0
+        self.last_seen = 0.0
+        self.last_result = None
+        self.restarts = 0
+        self.restart_at = None
+        self.backoff = None
+        self.last_exit = None
+
+
+class TrackerSupervisor:
+    """카메라마다 추적 프로세스를 하나씩 띄우고 (코어 고정), 죽거나 멈춘 프로세스를 다시 시작하며,
+    각 프로세스 결과를 모아 하나의 집계 스트림으로 만든다
+
+    프로세스는 spawn으로 만든다 (OpenCV/카메라 스레드가 있는 상태에서 fork하지 않도록).
+    코어가 카메라 수보다 많으면 첫 코어는 감독 프로세스와 OS 몫으로 남긴다.
+    결과가 stall_timeout초 동안 없으면 멈춘 것으로 보고 종료 후 다시 시작한다.
+    재시작 간격은 restart_backoff (최소, 최대)초 사이에서 연속 실패마다 두 배로 늘린다.
+    """
+
+    def __init__(self, cameras, stall_timeout=10.0, restart_backoff=(1.0, 30.0), queue_size=256):
+        self.stall_timeout = stall_timeout
+        self.restart_backoff = restart_backoff
+        self._ctx = multiprocessing.get_context('spawn')
+        self.results = self._ctx.Queue(maxsize=queue_size)
+        self.stop_event = self._ctx.Event()
+        self.workers = {}
+        for camera, cpu in zip(cameras, self.assign_cpus(cameras)):
+            self.workers[camera['name']] = _WorkerState(camera, cpu)
+
+    @staticmethod
+    def assign_cpus(cameras):
+        """카메라별 코어 ("cpu" 설정이 없으면 사용 가능한 코어를 돌아가며), 고정할 수 없으면 None"""
+        if not hasattr(os, 'sched_getaffinity'):
+            return [camera.get('cpu') for camera in cameras]
+        available = sorted(os.sched_getaffinity(0))
+        if len(available) > len(cameras):
+            available = available[1:]
+        return [camera.get('cpu', available[index % len(available)]) for index, camera in enumerate(cameras)]
+
+    def _spawn(self, state):
+        name = state.camera['name']
+        process = self._ctx.Process(target=run_worker, args=(state.camera, self.results, self.stop_event, state.cpu),
+                                    name=f"tracker-{name}", daemon=True)
+        process.start()
+        state.process = process
+        state.started_at = state.last_seen = time.monotonic()
+        state.restart_at = None
+        print(f"추적 프로세스 시작: {name} (pid {process.pid}, 코어 {state.cpu})")
+
+    def start(self):
+        for state in self.workers.values():
+            self._spawn(state)
+
+    def poll(self, timeout=0.5):
+        """큐에 쌓인 결과를 모두 받아 카메라별 최신 결과를 갱신하고 프로세스 상태 확인, 받은 결과 목록 반환"""
+        received = []
+        try:
+            received.append(self.results.get(timeout=timeout))
+            while True:
+                received.append(self.results.get_nowait())
+        except queue.Empty:
+            pass
+
+        now = time.monotonic()
+        for message in received:
+            state = self.workers.get(message['camera'])
+            if state is not None:
+                state.last_result = message
+                state.last_seen = now
+        self._check_workers(now)
+        return received
+
+    def _check_workers(self, now):
+        if self.stop_event.is_set():
+            return
+        minimum, maximum = self.restart_backoff
+        for name, state in self.workers.items():
+            process = state.process
+            if process is not None and process.is_alive():
+                if now - state.last_seen > self.stall_timeout:
+                    print(f"추적 프로세스 응답 없음: {name} ({now - state.last_seen:.1f}초), 종료 후 재시작")
+                    process.terminate()
+                    process.join(timeout=2.0)
+                    if process.is_alive():
+                        process.kill()
+                        process.join()
+                else:
+                    continue
+
+            if state.restart_at is None:
+                # 방금 종료됨: 오래 돌았으면 재시작 간격 초기화, 금방 죽었으면 두 배로
+                state.last_exit = process.exitcode if process is not None else None
+                if state.backoff is None or now - state.started_at > maximum * 2:
+                    state.backoff = minimum
+                else:
+                    state.backoff = min(state.backoff * 2, maximum)
+                state.restart_at = now + state.backoff
+                print(f"추적 프로세스 종료: {name} (코드 {state.last_exit}), {state.backoff:.0f}초 뒤 재시작")
+            elif now >= state.restart_at:
+                state.restarts += 1
+                self._spawn(state)
+
+    def aggregate(self):
+        """카메라별 최신 결과를 합친 집계 (JSON으로 바로 쓸 수 있는 dict)"""
+        now = time.monotonic()
+        cameras = {}
+        total_cars = near = occupied = slots = 0
+        for name, state in self.workers.items():
+            result = state.last_result or {}
+            cars = result.get('cars', [])
+            alive = state.process is not None and state.process.is_alive()
+            cameras[name] = {
+                'alive': alive,
+                'pid': state.process.pid if state.process is not None else None,
+                'cpu': state.cpu,
+                'restarts': state.restarts,
+                'last_exit': state.last_exit,
+                'age': round(now - state.last_seen, 3) if state.last_result else None,
+                'frame': result.get('frame', 0),
+                'fps': round(result.get('fps', 0.0), 1),
+                'dropped': result.get('dropped', 0),
+                'cars': cars,
+                'slots': result.get('slots', 0),
+                'occupied': result.get('occupied', []),
+            }
+            total_cars += len(cars)
+            near += sum(1 for car in cars if car['near'])
+            occupied += len(result.get('occupied', []))
+            slots += result.get('slots', 0)
+
+        return {
+            'timestamp': time.time(),
+            'cars': total_cars,
+            'near': near,
+            'slots': slots,
+            'occupied': occupied,
+            'cameras': cameras,
+        }
+
+    def stop(self, timeout=5.0):
+        """모든 프로세스에 종료 요청, 시간 안에 안 끝나면 강제 종료"""
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for state in self.workers.values():
+            process = state.process
+            if process is None:
+                continue
+            # 큐에 남은 결과를 비워야 자식 프로세스의 큐 전송 스레드가 끝난다
+            while process.is_alive() and time.monotonic() < deadline:
+                try:
+                    self.results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=1.0)
@@ -0,0 +1,256 @@
+# tracking.py
+import itertools
+
+import numpy as np
+
+from parking.detections import DetectionBuffer
+
+# 연결할 수 없는 쌍의 비용 (다른 색상, 게이트 밖)
+INFEASIBLE_COST = 1e6
+
+
+def linear_sum_assignment(cost):
+    """최소 비용 할당 (헝가리안 알고리즘, O(n^3))
+
+    scipy.optimize.linear_sum_assignment와 같은 형식으로 (행 인덱스, 열 인덱스)를 돌려준다.
+    프레임당 차량 수가 수십 대 수준이라 순수 numpy로 충분하다.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # 1부터 시작하는 인덱스 (0은 가상 열)
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)    # 열 j에 할당된 행
+    way = np.zeros(m + 1, dtype=int)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[1:][free] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        # 증가 경로를 따라 할당 갱신
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def bbox_iou(box_a, boxes_b):
+    """(x, y, w, h) 박스 하나와 박스 배열 (N, 4) 의 IoU"""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = boxes_b[:, 0], boxes_b[:, 1], boxes_b[:, 2], boxes_b[:, 3]
+
+    iw = np.clip(np.minimum(ax + aw, bx + bw) - np.maximum(ax, bx), 0, None)
+    ih = np.clip(np.minimum(ay + ah, by + bh) - np.maximum(ay, by), 0, None)
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return np.divide(inter, union, out=np.zeros_like(inter, dtype=np.float64), where=union > 0)
+
+
+class Track:
+    """ID가 고정된 추적 차량 하나 (등속 모델)"""
+
+    def __init__(self, track_id, car, timestamp, index):
+        self.id = track_id
+        self.color = int(car['color'])  # 색상 코드
+        self.bbox = car['bbox'].astype(np.float64)
+        self.velocity = np.zeros(2)    # 중심점 속도 (px/s)
+        self.last_update = timestamp
+        self.hits = 1                  # 매칭된 횟수
+        self.misses = 0                # 연속으로 놓친 횟수
+        self.index = index             # 이번 프레임 탐지 배열에서 매칭된 행
+
+    @property
+    def center(self):
+        x, y, w, h = self.bbox
+        return np.array([x + w / 2.0, y + h / 2.0])
+
+    def predict_bbox(self, timestamp):
+        """timestamp 시점의 예측 바운딩 박스"""
+        dt = timestamp - self.last_update
+        x, y, w, h = self.bbox
+        dx, dy = self.velocity * dt
+        return np.array([x + dx, y + dy, w, h])
+
+    def predict_center(self, timestamp):
+        return self.center + self.velocity * (timestamp - self.last_update)
+
+    def update(self, car, timestamp, smoothing, index):
+        bbox = car['bbox'].astype(np.float64)
+        dt = timestamp - self.last_update
+        if dt > 0:
+            old_center = self.center
+            new_center = bbox[:2] + bbox[2:] / 2.0
+            measured = (new_center - old_center) / dt
+            self.velocity = smoothing * measured + (1 - smoothing) * self.velocity
+
+        self.bbox = bbox
+        self.last_update = timestamp
+        self.hits += 1
+        self.misses = 0
+        self.index = index
+
+
+class MultiObjectTracker:
+    """프레임 간 탐지 결과를 연결해 차량마다 고정 ID와 속도를 유지한다
+
+    비용은 (1 - IoU) + 중심점 거리 / gate_distance 이고, 색상이 다르거나
+    예측 위치에서 gate_distance 넘게 떨어진 쌍은 연결하지 않는다.
+    할당은 헝가리안 알고리즘으로 전체 비용이 최소가 되게 한다.
+    """
+
+    def __init__(self, gate_distance=150.0, max_misses=5, velocity_smoothing=0.5):
+        self.gate_distance = gate_distance            # 연결 가능한 최대 중심점 이동 (px)
+        self.max_misses = max_misses                  # 이 횟수만큼 연속으로 놓치면 추적 종료
+        self.velocity_smoothing = velocity_smoothing  # 속도 EMA 계수
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def _cost_matrix(self, detections, timestamp):
+        cost = np.full((len(self.tracks), len(detections)), INFEASIBLE_COST)
+        if not self.tracks or not len(detections):
+            return cost
+
+        boxes = detections['bbox'].astype(np.float64)
+        centers = boxes[:, :2] + boxes[:, 2:] / 2.0
+        colors = detections['color']
+
+        for row, track in enumerate(self.tracks):
+            predicted = track.predict_bbox(timestamp)
+            predicted_center = predicted[:2] + predicted[2:] / 2.0
+
+            distance = np.hypot(*(centers - predicted_center).T)
+            iou = bbox_iou(predicted, boxes)
+            feasible = (colors == track.color) & (distance <= self.gate_distance)
+            cost[row] = np.where(feasible, (1.0 - iou) + distance / self.gate_distance, INFEASIBLE_COST)
+
+        return cost
+
+    def update(self, detections, timestamp, spawn=True, out=None):
+        """탐지 배열로 추적 갱신, 이번 프레임에 매칭된 추적의 탐지 행에 'track_id'와 'velocity'를
+        채워서 out(DetectionBuffer, 없으면 새로 만듦)에 담아 돌려준다
+
+        spawn=False면 매칭되지 않은 탐지로 새 추적을 만들지 않는다 (ROI 보정 프레임용).
+        """
+        cost = self._cost_matrix(detections, timestamp)
+        rows, cols = linear_sum_assignment(cost)
+
+        matched_tracks = set()
+        matched_detections = set()
+        for row, col in zip(rows, cols):
+            if cost[row, col] >= INFEASIBLE_COST:
+                continue
+            self.tracks[row].update(detections[col], timestamp, self.velocity_smoothing, col)
+            matched_tracks.add(row)
+            matched_detections.add(col)
+
+        # 놓친 추적 정리
+        for row, track in enumerate(self.tracks):
+            if row not in matched_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        # 새 차량
+        if spawn:
+            for col in range(len(detections)):
+                if col not in matched_detections:
+                    self.tracks.append(Track(next(self._ids), detections[col], timestamp, col))
+
+        # 탐지 결과에 추적 정보 표시
+        if out is None:
+            out = DetectionBuffer(max(len(detections), 1))
+        current = [track for track in self.tracks if track.misses == 0]
+        if current:
+            start = out.count
+            out.extend(detections[[track.index for track in current]])
+            tracked = out.view()[start:]
+            tracked['track_id'] = [track.id for track in current]
+            tracked['velocity'] = [track.velocity for track in current]
+        return out.view()
+
+    def predicted_boxes(self, timestamp):
+        """(track, 예측 바운딩 박스) 목록"""
+        return [(track, track.predict_bbox(timestamp)) for track in self.tracks]
+
+    def reset(self):
+        self.tracks = []
+
+
+if __name__ == "__main__":
+    # 자체 검사: 헝가리안 할당의 총비용이 모든 할당을 다 따져 본 최솟값과 같아야 함
+    # (실행: python3 -m parking.tracking)
+    from parking.detections import color_code
+
+    def brute_force_cost(cost):
+        n, m = cost.shape
+        if n <= m:
+            return min(cost[range(n), list(cols)].sum() for cols in itertools.permutations(range(m), n))
+        return min(cost[list(rows), range(m)].sum() for rows in itertools.permutations(range(n), m))
+
+    rng = np.random.default_rng(0)
+    for trial in range(300):
+        n, m = rng.integers(1, 7, size=2)
+        if trial % 3 == 0:
+            cost = rng.integers(0, 4, size=(n, m)).astype(np.float64)  # 같은 비용이 많은 경우
+        else:
+            cost = rng.random((n, m))
+        if trial % 5 == 0:
+            cost[rng.random((n, m)) < 0.4] = INFEASIBLE_COST
+        rows, cols = linear_sum_assignment(cost)
+        assert len(rows) == min(n, m), (cost, rows, cols)
+        assert np.all(np.diff(rows) > 0) and len(set(cols.tolist())) == len(cols), (rows, cols)
+        assert np.isclose(cost[rows, cols].sum(), brute_force_cost(cost)), cost
+    assert len(linear_sum_assignment(np.zeros((0, 3)))[0]) == 0
+
+    # 같은 색 차량 두 대가 나란히 움직여도 ID가 바뀌지 않고, 다른 색으로는 연결되지 않음
+    tracker = MultiObjectTracker()
+    for step in range(5):
+        detections = DetectionBuffer()
+        detections.append(color_code('red'), (100 + 20 * step, 100, 40, 20), 800, 2.0, 1.0)
+        detections.append(color_code('red'), (100 + 20 * step, 160, 40, 20), 800, 2.0, 1.0)
+        detections.append(color_code('blue' if step < 2 else 'yellow'), (400, 100, 40, 20), 800, 2.0, 1.0)
+        tracked = tracker.update(detections.view(), step * 0.1)
+        ids = {int(car['center'][1]): int(car['track_id']) for car in tracked if car['color'] == color_code('red')}
+        assert ids == {110: 1, 170: 2}, (step, ids)
+    assert [track.color for track in tracker.tracks if track.misses == 0][-1] == color_code('yellow')
+    assert np.allclose(tracker.tracks[0].velocity, (200.0 * (1 - 0.5 ** 4), 0.0))  # 속도 EMA, 0에서 시작
+
+    print("tracking: 자체 검사 통과")
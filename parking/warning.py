@@ -0,0 +1,146 @@
+# warning.py
+import heapq
+import itertools
+import threading
+import time
+
+# 초음파 엣지 측정기는 io 서비스와 같은 구현(io/lib/echo_timer.py)을 쓴다
+from parking.iolib import EchoEdgeTimer  # noqa: F401
+
+
+class UltrasonicSampler:
+    """초음파 측정을 전용 스레드에서 돌리고 마지막 측정값을 시각과 함께 보관한다
+
+    measure()는 에코가 올 때까지 막히므로 (엣지 검출을 못 쓰면 바쁜 대기) 비전 루프에서 직접 부르지 않는다.
+    request()로 깨우면 active_period초 동안 interval마다 측정하고, 그 뒤로는 쉰다
+    (경고가 없을 때는 측정 스레드가 CPU와 GIL을 쓰지 않음). latest()는 막히지 않는다.
+    """
+
+    def __init__(self, measure, interval=0.1, active_period=3.0):
+        self.measure = measure
+        self.interval = interval
+        self.active_period = active_period
+
+        # 통계
+        self.samples = 0
+        self.timeouts = 0
+
+        self._reading = None  # (거리 cm, time.monotonic() 측정 시각)
+        self._active_until = 0.0
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="ultrasonic-sampler", daemon=True)
+        self._thread.start()
+
+    def request(self):
+        """측정 요청 (막히지 않음), 이미 측정 중이면 측정 기간만 늘어난다"""
+        self._active_until = time.monotonic() + self.active_period
+        self._wake.set()
+
+    def latest(self, max_age=None):
+        """마지막 측정값 (거리 cm, 경과 초), 측정값이 없거나 max_age보다 오래됐으면 None"""
+        reading = self._reading
+        if reading is None:
+            return None
+        distance, measured_at = reading
+        age = time.monotonic() - measured_at
+        if max_age is not None and age > max_age:
+            return None
+        return distance, age
+
+    def _run(self):
+        while not self._closed:
+            if time.monotonic() >= self._active_until:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            started = time.monotonic()
+            try:
+                distance = self.measure()
+            except Exception as e:
+                print(f"초음파 측정 오류: {e}")
+                distance = None
+            self.samples += 1
+            if distance is None:
+                self.timeouts += 1
+            else:
+                self._reading = (distance, time.monotonic())
+
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=1.0)
+
+
+class TimerScheduler:
+    """스레드 하나로 지연 작업을 처리하는 타이머 (이벤트마다 threading.Timer 스레드를 만들지 않음)
+
+    같은 key로 다시 예약하면 이전 예약은 취소된다 (예: 경고가 이어지면 LED 끄기를 뒤로 미룸).
+    """
+
+    def __init__(self):
+        self._heap = []  # (실행 시각, 순번, key)
+        self._callbacks = {}  # key -> (순번, callback)
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="timer-scheduler", daemon=True)
+        self._thread.start()
+
+    def schedule(self, delay, callback, key=None):
+        """delay초 뒤 callback() 실행 예약"""
+        seq = next(self._counter)
+        if key is None:
+            key = ('once', seq)
+        with self._cond:
+            self._callbacks[key] = (seq, callback)
+            heapq.heappush(self._heap, (time.monotonic() + delay, seq, key))
+            self._cond.notify()
+
+    def cancel(self, key):
+        with self._cond:
+            self._callbacks.pop(key, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    due, seq, key = self._heap[0]
+                    remaining = due - time.monotonic()
+                    if remaining > 0:
+                        self._cond.wait(remaining)
+                        continue
+                    heapq.heappop(self._heap)
+                    # 취소되었거나 같은 key로 다시 예약된 항목은 건너뜀
+                    entry = self._callbacks.get(key)
+                    if entry is not None and entry[0] == seq:
+                        del self._callbacks[key]
+                        callback = entry[1]
+                        break
+                else:
+                    return
+
+            try:
+                callback()
+            except Exception as e:
+                print(f"예약 작업 오류: {e}")
+
+    def close(self, run_pending=False):
+        """스레드 종료, run_pending이면 남은 예약을 바로 실행"""
+        with self._cond:
+            self._closed = True
+            pending = [callback for _, callback in sorted(self._callbacks.values())] if run_pending else []
+            self._callbacks.clear()
+            self._heap.clear()
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+        for callback in pending:
+            callback()
@@ -0,0 +1,121 @@
+# writer.py
+import glob
+import os
+import threading
+from collections import deque
+
+import cv2
+
+from parking.pipeline import DropOldestQueue
+
+
+class AsyncFrameWriter:
+    """JPEG 인코딩과 파일 저장을 백그라운드 스레드 풀에서 처리한다
+
+    submit()은 큐에 넣기만 하고 바로 돌아온다. 디스크가 밀려서 큐가 가득 차면
+    가장 오래된 요청을 버린다. retention을 주면 retention_pattern에 맞는 파일은
+    가장 최근 retention개만 남기고 지운다.
+    """
+
+    def __init__(self, workers=2, max_queue=4, jpeg_quality=95,
+                 retention=None, retention_pattern='output_*.jpg'):
+        self.jpeg_quality = jpeg_quality
+        self.retention = None
+        self.retention_pattern = retention_pattern
+        self.queue = DropOldestQueue(max_queue)
+
+        # 통계
+        self.written = 0
+        self.failed = 0
+
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._retained = deque()
+        self._retained_lock = threading.Lock()
+        self.set_retention(retention)
+
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"frame-writer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def set_retention(self, retention):
+        """보관 개수 설정 (None이면 지우지 않음), 이전 실행에서 남은 파일도 개수에 포함"""
+        with self._retained_lock:
+            self.retention = retention
+            self._retained.clear()
+            if retention is not None:
+                self._retained.extend(sorted(glob.glob(self.retention_pattern), key=os.path.getmtime))
+        if retention is not None:
+            self._enforce_retention()
+
+    @property
+    def dropped(self):
+        return self.queue.dropped
+
+    def submit(self, filename, frame, copy=False, retain=True):
+        """저장 요청 (막히지 않음), 호출 후 frame을 수정할 거라면 copy=True"""
+        if copy:
+            frame = frame.copy()
+        with self._pending_cond:
+            self._pending += 1
+        # 큐에서 밀려난 요청은 처리되지 않으므로 대기 수에서 뺀다
+        if self.queue.put((filename, frame, retain)) is not None:
+            self._done()
+
+    def _done(self):
+        with self._pending_cond:
+            self._pending -= 1
+            self._pending_cond.notify_all()
+
+    def _worker(self):
+        while True:
+            item = self.queue.get(timeout=0.5)
+            if item is None:
+                if self.queue.closed:
+                    return
+                continue
+
+            filename, frame, retain = item
+            try:
+                ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if not ok:
+                    raise ValueError("JPEG 인코딩 실패")
+                with open(filename, 'wb') as f:
+                    f.write(encoded.tobytes())
+                self.written += 1
+
+                if retain and self.retention is not None:
+                    with self._retained_lock:
+                        self._retained.append(filename)
+                    self._enforce_retention()
+            except Exception as e:
+                self.failed += 1
+                print(f"이미지 저장 실패: {filename} ({e})")
+            finally:
+                self._done()
+
+    def _enforce_retention(self):
+        with self._retained_lock:
+            expired = []
+            while len(self._retained) > self.retention:
+                expired.append(self._retained.popleft())
+        for path in expired:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def flush(self, timeout=None):
+        """지금까지 요청된 저장이 끝날 때까지 대기, 시간 안에 끝나면 True"""
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending <= 0, timeout)
+
+    def close(self, timeout=5.0):
+        """남은 요청을 처리하고 스레드 종료"""
+        self.flush(timeout)
+        self.queue.close()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
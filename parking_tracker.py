@@ -5,16 +5,51 @@ import os
 try:
     import RPi.GPIO as GPIO
 except ImportError:
-    print("RPi.GPIO를 설치해라: pip3 install --break-system-packages RPi.GPIO")
-    exit(1)
+    GPIO = None  # 라즈베리파이가 아니면 gpio 인자로 StubGPIO를 넘겨서 사용
 import time
-import threading
-from collections import deque
-import math
+
+from parking.color_lut import ColorClassifier
+from parking.roi import AreaMask
+from parking.geometry import PolygonGeometry
+from parking.tracking import MultiObjectTracker
+from parking.motion import MotionGate
+from parking.sources import open_source
+from parking.gpio_stub import StubGPIO
+from parking.metrics import StageMetrics
+from parking.writer import AsyncFrameWriter
+from parking.stream import MjpegBroadcaster
+from parking.overlay import AreaOverlay
+from parking.pipeline import FramePipeline
+from parking.camera import find_camera, CAMERA_CACHE_FILE
+from parking.warning import EchoEdgeTimer, UltrasonicSampler, TimerScheduler
+from parking.detections import DetectionBuffer, DetectionPool, NO_TRACK, color_code, color_name
+from parking.slots import SlotOccupancy, load_slots
+from parking.rectify import LotRectifier
+
+# 차량 색상별 표시 색 (BGR)
+CAR_DRAW_COLORS = {
+    'red': (0, 0, 255), 
+    'blue': (255, 0, 0), 
+    'orange': (0, 165, 255),  # 주황색 추가
+    'yellow': (0, 255, 255)
+}
+
+# render_due() 결과: 그리지 않음 / 화면 표시·이미지 저장용 / 화면 송출(--stream-port)만
+RENDER_NONE = 0
+RENDER_SAVE = 1
+RENDER_STREAM = 2
 
 class ParkingTracker:
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, pipelined=False, source=None, gpio=None,
+                 camera_cache=CAMERA_CACHE_FILE, parallel_probe=False, probe_timeout=3.0):
         self.headless = headless  # 헤드리스 모드 설정
+        self.pipelined = pipelined  # 캡처/탐지/렌더/출력 스레드 분리 모드
+        
+        # GPIO 모듈 (기본은 RPi.GPIO, 벤치마크/재생용으로 StubGPIO를 넘길 수 있음)
+        self.gpio = gpio if gpio is not None else GPIO
+        if self.gpio is None:
+            print("RPi.GPIO를 설치해라: pip3 install --break-system-packages RPi.GPIO")
+            exit(1)
         
         # GPIO 설정
         self.LED_PIN = 18
@@ -22,20 +57,35 @@ class ParkingTracker:
         self.ECHO_PIN = 23
         
         # GPIO 초기화
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.LED_PIN, GPIO.OUT)
-        GPIO.setup(self.TRIG_PIN, GPIO.OUT)
-        GPIO.setup(self.ECHO_PIN, GPIO.IN)
-        GPIO.output(self.LED_PIN, GPIO.LOW)
-        GPIO.output(self.TRIG_PIN, GPIO.LOW)
-        
-        # 카메라 설정
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(self.LED_PIN, self.gpio.OUT)
+        self.gpio.setup(self.TRIG_PIN, self.gpio.OUT)
+        self.gpio.setup(self.ECHO_PIN, self.gpio.IN)
+        self.gpio.output(self.LED_PIN, self.gpio.LOW)
+        self.gpio.output(self.TRIG_PIN, self.gpio.LOW)
+        
+        # 초음파 에코는 ECHO 핀 엣지 콜백으로 (못 쓰면 None, 바쁜 대기로 측정)
+        self.echo_timer = EchoEdgeTimer.attach(self.gpio, self.ECHO_PIN)
+        
+        # 카메라 설정 (source를 주면 카메라 대신 동영상/이미지 등 프레임 소스 사용)
         self.cap = None
-        self.initialize_camera()
+        self.camera_cache = camera_cache  # 마지막으로 성공한 카메라 설정 파일 (None이면 캐시 안 함)
+        self.parallel_probe = parallel_probe  # 캐시 실패 시 디바이스 동시 탐색
+        self.probe_timeout = probe_timeout
+        if source is not None:
+            self.cap = source
+        else:
+            self.initialize_camera()
         
         # 주차장 영역 좌표 (초기값, 마우스로 설정 가능)
-        self.parking_area = []
+        # 파이프라인 모드에서는 출력 스레드(GUI)가 바꾸고 탐지 스레드가 읽으므로
+        # 제자리에서 고치지 않고 완성된 튜플을 통째로 바꿔 끼운다
+        self.parking_area = ()
+        self.frame_area = ()  # 탐지 중인 프레임의 영역 스냅샷 (process_frame에서, 탐지 스레드만 씀)
         self.setting_area = False
+        self.setup_points = []  # 설정 중인 꼭짓점 (설정이 끝나야 parking_area에 반영)
+        self.area_mask = AreaMask()  # 주차장 영역 ROI/마스크 캐시
+        self.geometry = PolygonGeometry()  # 주차장 영역 변 계수 캐시 (내부 판정, 경계 거리)
         
         # 색상 범위 설정 (HSV)
         self.color_ranges = {
@@ -46,73 +96,82 @@ class ParkingTracker:
             'yellow': ([25, 50, 50], [35, 255, 255])    # 노란색 범위 조정
         }
         
-        # 탐지된 차량 추적
-        self.tracked_cars = deque(maxlen=10)  # 최근 10프레임 저장
+        # 색상 범위를 한 번에 분류하는 룩업 테이블 (color_ranges가 바뀔 때만 재생성)
+        self.color_classifier = ColorClassifier(self.color_ranges)
+        
+        # 탐지 설정
+        self.min_car_area = 800  # 최소 면적 (전체 해상도 픽셀 기준)
+        self.morph_kernel_size = 7  # 노이즈 제거 커널 크기 (전체 해상도 기준)
+        self._morph_kernels = {}
+        self.processing_scale = 1.0  # 색상 분할/컨투어 탐색 배율 (0.5면 가로세로 절반 크기에서 탐지)
+        self.refine_full_resolution = False  # 축소 탐지 후보를 전체 해상도에서 다시 측정
+        
+        # 탐지된 차량 추적 (프레임 간 ID 유지, 속도 추정)
+        self.car_tracker = MultiObjectTracker()
+        
+        # 탐지 결과 버퍼 (프레임마다 재사용, 추적 결과는 다른 스레드로 넘기므로 링 버퍼)
+        self._candidates = DetectionBuffer()
+        self._refined = DetectionBuffer()
+        self._roi_blobs = DetectionBuffer()
+        self.detection_pool = DetectionPool(slots=8)
+        
+        # 주차칸별 점유 (load_slot_config로 설정, 전체 탐지 프레임마다 갱신)
+        self.slot_occupancy = SlotOccupancy()
+        self.detect_interval = 1  # N프레임마다 전체 탐지, 사이에는 예측 위치 주변만 보정 (1이면 매 프레임)
+        self.track_search_margin = 0.5  # 보정 ROI 여유 (바운딩 박스 크기 대비)
+        self.processed_count = 0
+        self.last_cars = None  # 직전 프레임 결과 (모션 게이트가 재사용)
+        
+        # 모션 게이트 (정지 프레임은 탐지 생략)
+        self.motion_gating = False
+        self.motion_gate = MotionGate(motion_threshold=0.002, refresh_interval=30)
         
         # 경고 설정
         self.warning_distance = 100  # 픽셀 단위
+        self.warning_distance_cm = 30  # 위에서 본 보정 모드(enable_rectification)일 때 cm 단위
+        self.rectifier = None  # LotRectifier, 설정하면 영역만 펴서 탐지하고 거리는 cm
         self.last_warning_time = 0
         self.warning_cooldown = 2.0  # 2초 쿨다운
+        self.warning_horizon = 0.5  # 예측 궤적으로 경고할 시간 범위 (초)
+        self.ultrasonic_max_age = 0.5  # 경고에 쓸 초음파 측정값의 최대 경과 시간 (초)
+        
+        # 초음파 측정은 전용 스레드에서 (경고가 프레임 시간을 쓰지 않도록), LED 끄기는 타이머 스레드 하나로
+        self.ultrasonic = UltrasonicSampler(self.trigger_ultrasonic, interval=0.1)
+        self.led_scheduler = TimerScheduler()
         
         # 헤드리스 모드용 설정
         self.frame_count = 0
         self.save_interval = 30  # 30프레임마다 이미지 저장
+        self.render_counter = 0  # 그릴지 결정한 프레임 수 (헤드리스 모드는 저장할 프레임만 그림)
+        self.render_enabled = True  # False면 헤드리스 모드에서 그리기와 이미지 저장 생략
+        self.area_overlay = AreaOverlay()  # 주차장 영역 반투명 오버레이 캐시
+        self.headless_delay = 0.1  # 헤드리스 모드 프레임 간 딜레이 (초)
+        
+        # 이미지 저장 스레드 풀 (디스크가 밀리면 오래된 요청부터 버림)
+        self.frame_writer = AsyncFrameWriter(workers=2, max_queue=4, jpeg_quality=95, retention=None)
+        
+        # 그려진 화면 MJPEG 송출 (start_stream으로 시작, 보는 클라이언트가 있을 때만 그리고 인코딩)
+        self.stream = None
+        
+        # 단계별 지연 계측 (kill -USR1 <pid> 또는 metrics_port의 /metrics 로 스냅샷 확인)
+        self.metrics = StageMetrics()
         
         # 기본 주차장 영역 (헤드리스 모드용)
         if self.headless:
             self.setup_default_parking_area()
     
     def initialize_camera(self):
-        """카메라 초기화 with 디버깅"""
+        """카메라 초기화 (캐시된 디바이스/백엔드 먼저, 실패하면 전체 탐색)"""
         print("카메라 초기화 중...")
+        started = time.monotonic()
         
-        # 여러 백엔드 시도
-        backends = [
-            (cv2.CAP_V4L2, "V4L2"),
-            (cv2.CAP_GSTREAMER, "GStreamer"), 
-            (cv2.CAP_ANY, "Any")
-        ]
-        
-        # 여러 디바이스 번호 시도
-        device_ids = [0, 1, 2]
-        
-        for device_id in device_ids:
-            print(f"디바이스 {device_id} 시도 중...")
-            
-            for backend, backend_name in backends:
-                print(f"  {backend_name} 백엔드로 시도 중...")
-                
-                try:
-                    self.cap = cv2.VideoCapture(device_id, backend)
-                    
-                    if self.cap.isOpened():
-                        # 테스트 프레임 읽기
-                        ret, frame = self.cap.read()
-                        if ret and frame is not None:
-                            print(f"성공! 디바이스 {device_id}, {backend_name} 백엔드")
-                            
-                            # 해상도 설정
-                            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                            self.cap.set(cv2.CAP_PROP_FPS, 15)
-                            
-                            # 실제 설정된 값 확인
-                            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                            fps = self.cap.get(cv2.CAP_PROP_FPS)
-                            
-                            print(f"해상도: {width}x{height}, FPS: {fps}")
-                            return
-                        else:
-                            print(f"  프레임을 읽을 수 없음")
-                            self.cap.release()
-                    else:
-                        print(f"  카메라를 열 수 없음")
-                        
-                except Exception as e:
-                    print(f"  오류: {e}")
-                    if self.cap:
-                        self.cap.release()
+        self.cap, info = find_camera(self.camera_cache, width=1280, height=720, fps=15,
+                                     parallel=self.parallel_probe, timeout=self.probe_timeout)
+        if self.cap is not None:
+            print(f"성공! 디바이스 {info['device']}, {info['backend']} 백엔드 "
+                  f"({time.monotonic() - started:.2f}초)")
+            print(f"해상도: {info['width']}x{info['height']}, FPS: {info['fps']}")
+            return
         
         print("사용 가능한 카메라를 찾을 수 없다!")
         print("해결방법:")
@@ -121,6 +180,33 @@ class ParkingTracker:
         print("3. 다른 프로그램에서 카메라를 사용 중인지 확인")
         self.cap = None
     
+    def load_slot_config(self, path):
+        """주차칸 설정 파일 (parking/slots.py 형식) 적용"""
+        slots, occupied_ratio = load_slots(path)
+        self.slot_occupancy.set_slots(slots)
+        if occupied_ratio is not None:
+            self.slot_occupancy.occupied_ratio = occupied_ratio
+        print(f"주차칸 {len(slots)}개 로드: {path} (점유 기준 {self.slot_occupancy.occupied_ratio * 100:.0f}%)")
+    
+    def enable_rectification(self, width_cm, height_cm, px_per_cm=2.0):
+        """parking_area를 width_cm x height_cm 실제 크기로 펴서 탐지 (거리는 cm, 경고는 warning_distance_cm)"""
+        self.rectifier = LotRectifier(width_cm, height_cm, px_per_cm)
+        w, h = self.rectifier.size
+        print(f"위에서 본 보정 모드: {width_cm}x{height_cm}cm -> {w}x{h}px ({px_per_cm}px/cm)")
+    
+    def rectification_active(self):
+        """보정 모드이고 영역이 설정되어 있으면 True (영역이 바뀌었으면 remap 맵 재계산)"""
+        if self.rectifier is None:
+            return False
+        self.rectifier.update(self.frame_area)
+        return self.rectifier.ready
+    
+    def start_stream(self, port, jpeg_quality=80, max_fps=None):
+        """http://<주소>:port/ 로 그려진 화면 MJPEG 송출 시작"""
+        self.stream = MjpegBroadcaster(jpeg_quality=jpeg_quality, max_fps=max_fps)
+        self.stream.serve_http(port)
+        print(f"화면 송출: http://localhost:{port}/")
+    
     def setup_default_parking_area(self):
         """기본 주차장 영역 설정 (헤드리스 모드용)"""
         # 1280x720 해상도 기준 기본 영역
@@ -129,12 +215,12 @@ class ParkingTracker:
         margin_x = width // 4
         margin_y = height // 4
         
-        self.parking_area = [
+        self.parking_area = (
             (margin_x, margin_y),                    # 좌상단
             (width - margin_x, margin_y),            # 우상단  
             (width - margin_x, height - margin_y),   # 우하단
             (margin_x, height - margin_y)            # 좌하단
-        ]
+        )
         
         print(f"기본 주차장 영역 설정: {self.parking_area}")
         print("더 정확한 설정을 원한다면 프로그램 실행 후 현재 프레임을 확인하고")
@@ -143,10 +229,10 @@ class ParkingTracker:
     def mouse_callback(self, event, x, y, flags, param):
         """마우스 콜백으로 주차장 영역 설정"""
         if self.setting_area and event == cv2.EVENT_LBUTTONDOWN:
-            self.parking_area.append((x, y))
+            self.setup_points.append((x, y))
             print(f"좌표 설정: ({x}, {y})")
             
-            if len(self.parking_area) == 4:
+            if len(self.setup_points) == 4:
                 self.setting_area = False
                 print("주차장 영역 설정 완료!")
     
@@ -158,24 +244,28 @@ class ParkingTracker:
             print(f"이미지 크기: {frame.shape[1]}x{frame.shape[0]} (가로x세로)")
             
             # 현재 프레임을 파일로 저장
-            cv2.imwrite('current_frame.jpg', frame)
+            # 백그라운드 저장 후 완료 대기 (좌표 입력 전에 파일이 있어야 한다)
+            self.frame_writer.submit('current_frame.jpg', frame, copy=True, retain=False)
+            self.frame_writer.flush(timeout=2.0)
             print("현재 화면을 'current_frame.jpg'로 저장했다. 이를 참고해서 좌표를 입력해라.")
             
+            points = []
             try:
                 for i in range(4):
                     corner_names = ["좌상단", "우상단", "우하단", "좌하단"]
                     print(f"{corner_names[i]} 좌표를 입력해라 (x,y 형식, 예: 100,50):")
                     coord_input = input().strip()
                     x, y = map(int, coord_input.split(','))
-                    self.parking_area.append((x, y))
+                    points.append((x, y))
                     print(f"{corner_names[i]} 설정: ({x}, {y})")
                 
+                self.parking_area = tuple(points)
                 print("주차장 영역 설정 완료!")
                 return
                 
             except (ValueError, KeyboardInterrupt):
                 print("좌표 입력이 취소되었거나 잘못되었다.")
-                self.parking_area = []
+                self.parking_area = ()
                 return
         
         # GUI 모드
@@ -183,6 +273,7 @@ class ParkingTracker:
         print("순서: 좌상단 -> 우상단 -> 우하단 -> 좌하단")
         print("잘못 클릭했으면 'r'키로 리셋, 완료되면 자동으로 닫힌다.")
         
+        self.setup_points = []
         self.setting_area = True
         cv2.namedWindow('Setup', cv2.WINDOW_NORMAL)
         cv2.setMouseCallback('Setup', self.mouse_callback)
@@ -191,31 +282,31 @@ class ParkingTracker:
             display_frame = frame.copy()
             
             # 설정된 점들 표시
-            for i, point in enumerate(self.parking_area):
+            for i, point in enumerate(self.setup_points):
                 cv2.circle(display_frame, point, 8, (0, 255, 0), -1)
                 cv2.putText(display_frame, str(i+1), 
                            (point[0]+15, point[1]-10), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
             
             # 선분 연결
-            if len(self.parking_area) > 1:
-                for i in range(len(self.parking_area)-1):
-                    cv2.line(display_frame, self.parking_area[i], 
-                            self.parking_area[i+1], (0, 255, 0), 3)
+            if len(self.setup_points) > 1:
+                for i in range(len(self.setup_points)-1):
+                    cv2.line(display_frame, self.setup_points[i], 
+                            self.setup_points[i+1], (0, 255, 0), 3)
                 
                 # 마지막 점과 첫 번째 점 연결 (4개 점이 모두 설정되었을 때)
-                if len(self.parking_area) == 4:
-                    cv2.line(display_frame, self.parking_area[3], 
-                            self.parking_area[0], (0, 255, 0), 3)
+                if len(self.setup_points) == 4:
+                    cv2.line(display_frame, self.setup_points[3], 
+                            self.setup_points[0], (0, 255, 0), 3)
                     # 반투명 영역 표시
-                    pts = np.array(self.parking_area, np.int32)
+                    pts = np.array(self.setup_points, np.int32)
                     overlay = display_frame.copy()
                     cv2.fillPoly(overlay, [pts], (0, 255, 0))
                     cv2.addWeighted(overlay, 0.2, display_frame, 0.8, 0, display_frame)
             
             # 안내 메시지
             cv2.rectangle(display_frame, (5, 5), (500, 80), (0, 0, 0), -1)
-            cv2.putText(display_frame, f"Click point {len(self.parking_area)+1}/4", 
+            cv2.putText(display_frame, f"Click point {len(self.setup_points)+1}/4", 
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
             cv2.putText(display_frame, "Press 'r' to reset, 'q' to quit", 
                        (10, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
@@ -225,58 +316,193 @@ class ParkingTracker:
             if key == ord('q'):
                 break
             elif key == ord('r'):
-                self.parking_area = []
+                self.setup_points = []
                 print("영역 설정 리셋!")
         
         if not self.headless:
             cv2.destroyWindow('Setup')
+        
+        # 네 점을 다 찍었을 때만 한 번에 반영 (탐지 스레드는 이전 영역 아니면 새 영역만 본다)
+        if len(self.setup_points) == 4:
+            self.parking_area = tuple(self.setup_points)
     
     def detect_cars_by_color(self, frame):
         """색상 기반 차량 탐지 (주차장 영역 내에서만)"""
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        detected_cars = []
+        if self.rectification_active():
+            return self.detect_cars_rectified(frame)
         
+        # 주차장 영역의 바운딩 ROI와 마스크 (영역이 바뀔 때만 다시 만든다)
         # 주차장 영역이 설정되지 않았으면 전체 화면에서 탐지
-        if len(self.parking_area) == 4:
-            # 주차장 영역 마스크 생성
-            mask_polygon = np.zeros(hsv.shape[:2], dtype=np.uint8)
-            pts = np.array(self.parking_area, np.int32)
-            cv2.fillPoly(mask_polygon, [pts], 255)
-        else:
-            mask_polygon = np.ones(hsv.shape[:2], dtype=np.uint8) * 255
+        roi, mask_polygon = self.area_mask.get(self.frame_area, frame.shape)
+        
+        # 색상 범위가 바뀌었을 때만 룩업 테이블 재생성
+        self.color_classifier.update(self.color_ranges)
+        
+        scale = self.processing_scale
+        if scale != 1.0:
+            mask_polygon = self.area_mask.scaled_mask(scale)
+        
+        candidates = self._candidates
+        candidates.clear()
+        labels = self.classify_roi(frame, roi, mask_polygon, scale)
+        
+        # 주차칸 점유는 같은 라벨 이미지에서 (칸 수와 무관하게 히스토그램 한 번)
+        if len(self.slot_occupancy) and labels is not None:
+            with self.metrics.stage('slots'):
+                self.slot_occupancy.update(labels, roi, scale, mask_polygon, self.frame_area)
         
-        for color_name, (lower, upper) in self.color_ranges.items():
-            if color_name == 'red2':  # 빨간색 두 번째 범위는 첫 번째와 합침
+        self.find_color_blobs(frame, roi, mask_polygon, self.color_classifier.colors, scale,
+                              out=candidates, labels=labels)
+        
+        # 축소 탐지 결과를 전체 해상도에서 다시 측정
+        if scale != 1.0 and self.refine_full_resolution:
+            candidates = self.refine_candidates(frame, candidates.view())
+        
+        return self.filter_in_parking_area(candidates)
+    
+    def detect_cars_rectified(self, frame):
+        """주차장 영역만 위에서 본 이미지로 펴서 탐지, 결과 좌표는 프레임 기준으로 되돌린다
+        
+        커널 크기와 최소 면적은 펴진 이미지 해상도에 맞춰 환산한다.
+        (주차칸 점유는 프레임 좌표 라벨 맵 기준이라 이 모드에서는 갱신하지 않음)
+        """
+        rectifier = self.rectifier
+        with self.metrics.stage('rectify'):
+            warped = rectifier.warp(frame)
+        
+        self.color_classifier.update(self.color_ranges)
+        w, h = rectifier.size
+        size_scale = 1.0 / rectifier.frame_px_per_rect_px  # 펴진 이미지 px / 프레임 px
+        
+        candidates = self._candidates
+        candidates.clear()
+        labels = self.classify_roi(warped, (0, 0, w, h), None)
+        self.find_color_blobs(warped, (0, 0, w, h), None, self.color_classifier.colors,
+                              out=candidates, labels=labels, size_scale=size_scale)
+        
+        # 펴진 이미지 좌표 -> 프레임 좌표 (중심점은 점 변환, 박스는 꼭짓점 변환 후 외접 박스)
+        if candidates.count:
+            with self.metrics.stage('rectify'):
+                cars = candidates.view()
+                rect_centers = cars['center'].copy()
+                cars['bbox'] = rectifier.boxes_to_frame(cars['bbox'])
+                cars['center'] = np.round(rectifier.to_frame(rect_centers)).astype(np.int32)
+                cars['area'] /= size_scale * size_scale
+        
+        return self.filter_in_parking_area(candidates)
+    
+    def get_morph_kernel(self, scale):
+        """처리 배율에 맞춘 노이즈 제거 커널 (홀수 크기, 최소 3)"""
+        size = max(3, int(round(self.morph_kernel_size * scale)) | 1)
+        kernel = self._morph_kernels.get(size)
+        if kernel is None:
+            kernel = np.ones((size, size), np.uint8)
+            self._morph_kernels[size] = kernel
+        return kernel
+    
+    def refine_candidates(self, frame, candidates):
+        """후보 바운딩 박스 주변만 전체 해상도로 다시 측정 (못 찾으면 축소 결과 유지)"""
+        (area_x, area_y, area_w, area_h), mask_polygon = self.area_mask.get(self.frame_area, frame.shape)
+        
+        refined = self._refined
+        refined.clear()
+        blobs = self._roi_blobs
+        for index in range(len(candidates)):
+            car = candidates[index:index + 1]
+            x, y, w, h = car['bbox'][0].tolist()
+            pad = self.morph_kernel_size * 2
+            x0 = max(x - pad, area_x)
+            y0 = max(y - pad, area_y)
+            x1 = min(x + w + pad, area_x + area_w)
+            y1 = min(y + h + pad, area_y + area_h)
+            if x1 <= x0 or y1 <= y0:
+                refined.extend(car)
                 continue
-                
-            lower = np.array(lower)
-            upper = np.array(upper)
             
-            mask = cv2.inRange(hsv, lower, upper)
+            mask = None
+            if mask_polygon is not None:
+                mask = mask_polygon[y0 - area_y:y1 - area_y, x0 - area_x:x1 - area_x]
             
-            # 빨간색의 경우 두 범위를 합침
-            if color_name == 'red':
-                lower2 = np.array(self.color_ranges['red2'][0])
-                upper2 = np.array(self.color_ranges['red2'][1])
-                mask2 = cv2.inRange(hsv, lower2, upper2)
-                mask = cv2.bitwise_or(mask, mask2)
+            blobs.clear()
+            self.find_color_blobs(frame, (x0, y0, x1 - x0, y1 - y0), mask, [color_name(car['color'][0])],
+                                  out=blobs)
+            if blobs.count:
+                best = int(np.argmax(blobs.view()['area']))
+                refined.extend(blobs.view()[best:best + 1])
+            else:
+                refined.extend(car)
+        
+        return refined
+    
+    def classify_roi(self, frame, roi, mask_polygon, scale=1.0):
+        """ROI를 (scale배로 축소해서) 색상 라벨 이미지로 분류, ROI가 비었으면 None
+        
+        라벨 이미지는 색상 분류기 버퍼라 다음 호출 전까지만 유효하다.
+        """
+        roi_x, roi_y, roi_w, roi_h = roi
+        if roi_w == 0 or roi_h == 0:
+            return None
+        
+        with self.metrics.stage('hsv'):
+            crop = frame[roi_y:roi_y + roi_h, roi_x:roi_x + roi_w]
+            if scale != 1.0:
+                crop = cv2.resize(crop, self.area_mask.scaled_size(roi, scale), interpolation=cv2.INTER_AREA)
+            
+            # ROI 부분만 HSV 변환
+            hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+        
+        # 모든 색상을 한 번에 분류한 라벨 이미지 (주차장 영역 밖은 0)
+        with self.metrics.stage('mask'):
+            labels = self.color_classifier.classify(hsv)
+            if mask_polygon is not None:
+                cv2.bitwise_and(labels, mask_polygon, dst=labels)
+        return labels
+    
+    def find_color_blobs(self, frame, roi, mask_polygon, colors, scale=1.0, out=None, labels=None,
+                         size_scale=None):
+        """ROI 안에서 색상별 차량 후보를 찾아 out(DetectionBuffer)에 추가 (결과 좌표는 전체 프레임 기준)
+        
+        scale < 1이면 ROI를 축소해서 분할/컨투어 탐색을 하고, 커널 크기와 최소 면적도
+        같은 비율로 맞춘다. mask_polygon은 축소된 ROI 크기여야 한다.
+        labels는 같은 ROI/배율로 이미 만든 classify_roi 결과 (없으면 여기서 분류).
+        size_scale을 주면 커널 크기와 최소 면적은 scale 대신 이 비율로 맞춘다 (펴진 이미지용).
+        """
+        candidates = out if out is not None else DetectionBuffer()
+        roi_x, roi_y, roi_w, roi_h = roi
+        if labels is None:
+            labels = self.classify_roi(frame, roi, mask_polygon, scale)
+            if labels is None:
+                return candidates
+        
+        # 처리 배율에 맞춘 커널과 최소 면적
+        if size_scale is None:
+            size_scale = scale
+        kernel = self.get_morph_kernel(size_scale)
+        min_area = self.min_car_area * size_scale * size_scale
+        
+        for name in colors:
+            code = color_code(name)
             
-            # 주차장 영역과 교집합
-            mask = cv2.bitwise_and(mask, mask_polygon)
+            # 라벨 이미지에서 해당 색상 마스크 추출 (red2는 red에 합쳐져 있음)
+            with self.metrics.stage('mask'):
+                mask = self.color_classifier.color_mask(labels, name)
             
             # 노이즈 제거 강화
-            kernel = np.ones((7,7), np.uint8)  # 커널 크기 증가
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+            with self.metrics.stage('morphology'):
+                mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+                mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
             
-            # 컨투어 찾기
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            # 컨투어 찾기 (축소하지 않았으면 ROI 오프셋을 더해서 바로 전체 프레임 좌표로)
+            with self.metrics.stage('contours'):
+                offset = (roi_x, roi_y) if scale == 1.0 else (0, 0)
+                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                               offset=offset)
             
             for contour in contours:
                 area = cv2.contourArea(contour)
                 
                 # 면적 필터링 강화
-                if area < 800:  # 최소 면적 증가
+                if area < min_area:  # 최소 면적 증가
                     continue
                     
                 # 형태 필터링 추가
@@ -295,83 +521,151 @@ class ParkingTracker:
                 if extent < 0.3:
                     continue
                 
-                center_x = x + w // 2
-                center_y = y + h // 2
-                
-                # 중심점이 주차장 영역 내부에 있는지 확인
-                if len(self.parking_area) == 4:
-                    if not self.point_in_polygon((center_x, center_y), self.parking_area):
-                        continue
+                # 축소 좌표를 전체 해상도 프레임 좌표로
+                if scale != 1.0:
+                    x = roi_x + int(round(x / scale))
+                    y = roi_y + int(round(y / scale))
+                    w = int(round(w / scale))
+                    h = int(round(h / scale))
+                    area = area / (scale * scale)
                 
-                detected_cars.append({
-                    'color': color_name,
-                    'center': (center_x, center_y),
-                    'bbox': (x, y, w, h),
-                    'area': area,
-                    'aspect_ratio': aspect_ratio,
-                    'extent': extent
-                })
-        
-        return detected_cars
-    
-    def point_in_polygon(self, point, polygon):
-        """점이 다각형 내부에 있는지 확인"""
-        x, y = point
-        n = len(polygon)
-        inside = False
-        
-        p1x, p1y = polygon[0]
-        for i in range(1, n + 1):
-            p2x, p2y = polygon[i % n]
-            if y > min(p1y, p2y):
-                if y <= max(p1y, p2y):
-                    if x <= max(p1x, p2x):
-                        if p1y != p2y:
-                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                        if p1x == p2x or x <= xinters:
-                            inside = not inside
-            p1x, p1y = p2x, p2y
-        
-        return inside
-    
-    def calculate_distance_to_boundary(self, point):
-        """주차장 경계까지의 최단 거리 계산"""
-        if len(self.parking_area) < 4:
-            return float('inf')
-        
-        x, y = point
-        min_distance = float('inf')
-        
-        # 각 변까지의 거리 계산
-        for i in range(len(self.parking_area)):
-            p1 = self.parking_area[i]
-            p2 = self.parking_area[(i + 1) % len(self.parking_area)]
-            
-            # 점과 직선 사이의 거리 계산
-            A = p2[1] - p1[1]
-            B = p1[0] - p2[0]
-            C = p2[0] * p1[1] - p1[0] * p2[1]
-            
-            distance = abs(A * x + B * y + C) / math.sqrt(A * A + B * B)
-            min_distance = min(min_distance, distance)
-        
-        return min_distance
+                # 중심점은 append에서 바운딩 박스로 계산
+                candidates.append(code, (x, y, w, h), area, aspect_ratio, extent)
+        
+        return candidates
+    
+    def boundary_distances(self, points):
+        """프레임 좌표 점들의 (영역 내부 여부, 부호 있는 경계 거리), 보정 모드면 거리는 cm"""
+        if self.rectification_active():
+            return self.rectifier.classify(points)
+        self.geometry.update(self.frame_area if len(self.frame_area) == 4 else [])
+        return self.geometry.classify(points)
+    
+    def filter_in_parking_area(self, candidates):
+        """중심점이 주차장 영역 밖인 후보를 빼고 경계까지의 거리를 채운다 (candidates 버퍼를 그 자리에서 줄임)"""
+        if not candidates.count:
+            return candidates.view()
+        
+        # 모든 후보 중심점의 영역 내부 여부와 경계 거리를 한 번에 계산
+        with self.metrics.stage('geometry'):
+            cars = candidates.view()
+            inside, distances = self.boundary_distances(cars['center'])
+            
+            # 경계까지의 거리 (영역이 없으면 inf), 예측 거리는 추적 전까지 현재 거리와 같게
+            cars['distance'] = distances
+            cars['predicted_distance'] = distances
+            
+            # 중심점이 주차장 영역 밖이면 제외
+            if not inside.all():
+                candidates.compact(inside)
+        
+        return candidates.view()
+    
+    def refine_tracked_cars(self, frame, timestamp):
+        """추적 중인 차량의 예측 위치 주변 작은 ROI에서만 해당 색상을 다시 탐지"""
+        (area_x, area_y, area_w, area_h), mask_polygon = self.area_mask.get(self.frame_area, frame.shape)
+        self.color_classifier.update(self.color_ranges)
+        
+        candidates = self._candidates
+        candidates.clear()
+        for track, (x, y, w, h) in self.car_tracker.predicted_boxes(timestamp):
+            # 예측 박스에 여유를 붙이고 주차장 ROI 안으로 자르기
+            pad_x = w * self.track_search_margin + 8
+            pad_y = h * self.track_search_margin + 8
+            x0 = int(max(x - pad_x, area_x))
+            y0 = int(max(y - pad_y, area_y))
+            x1 = int(min(x + w + pad_x, area_x + area_w))
+            y1 = int(min(y + h + pad_y, area_y + area_h))
+            if x1 <= x0 or y1 <= y0:
+                continue
+            
+            mask = None
+            if mask_polygon is not None:
+                mask = mask_polygon[y0 - area_y:y1 - area_y, x0 - area_x:x1 - area_x]
+            
+            self.find_color_blobs(frame, (x0, y0, x1 - x0, y1 - y0), mask, [color_name(track.color)],
+                                  out=candidates)
+        
+        # 겹치는 ROI에서 같은 차량이 두 번 잡히는 경우 제외 (처음 찾은 것만 남김)
+        if candidates.count > 1:
+            cars = candidates.view()
+            keys = np.column_stack((cars['color'], cars['bbox']))
+            _, first = np.unique(keys, axis=0, return_index=True)
+            if len(first) < candidates.count:
+                candidates.compact(np.sort(first))
+        
+        return self.filter_in_parking_area(candidates)
+    
+    def process_frame(self, frame, timestamp=None):
+        """차량 탐지 + 추적, 추적 ID와 속도가 채워진 탐지 배열 (DETECTION_DTYPE) 반환
+        
+        detect_interval 프레임마다 전체 색상 탐지를 하고, 그 사이 프레임은
+        추적 중인 차량의 예측 위치 주변만 다시 탐지해서 보정한다.
+        반환 배열은 detection_pool 링 버퍼라 다음 slots - 1 프레임 동안 유효하고,
+        모션 게이트로 탐지를 생략한 프레임은 이전 배열을 그대로 돌려준다 (읽기 전용으로 쓸 것).
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        
+        # 이 프레임 동안 쓸 주차장 영역 (도중에 GUI가 영역을 바꿔도 한 프레임 안에서는 같은 영역)
+        self.frame_area = self.parking_area
+        
+        # 주차장 영역에 변화가 없으면 이전 프레임 결과 재사용
+        if self.motion_gating:
+            roi, _ = self.area_mask.get(self.frame_area, frame.shape)
+            if not self.motion_gate.should_detect(frame, roi) and self.last_cars is not None:
+                return self.last_cars
+        
+        full_detection = (self.detect_interval <= 1
+                          or self.processed_count % self.detect_interval == 0
+                          or not self.car_tracker.tracks)
+        self.processed_count += 1
+        
+        if full_detection:
+            detected_cars = self.detect_cars_by_color(frame)
+            tracked_cars = self.car_tracker.update(detected_cars, timestamp, out=self.detection_pool.next())
+        else:
+            detected_cars = self.refine_tracked_cars(frame, timestamp)
+            tracked_cars = self.car_tracker.update(detected_cars, timestamp, spawn=False,
+                                                   out=self.detection_pool.next())
+        
+        self.predict_boundary_distances(tracked_cars)
+        self.last_cars = tracked_cars
+        return tracked_cars
+    
+    def predict_boundary_distances(self, cars):
+        """warning_horizon초 뒤 예측 위치의 경계 거리 계산 (영역 밖으로 나가면 음수)"""
+        if not len(cars) or len(self.frame_area) != 4:
+            return
+        
+        with self.metrics.stage('geometry'):
+            predicted = cars['center'] + cars['velocity'] * self.warning_horizon
+            _, cars['predicted_distance'] = self.boundary_distances(predicted)
     
     def trigger_ultrasonic(self):
-        """초음파 센서 트리거"""
-        GPIO.output(self.TRIG_PIN, True)
+        """초음파 센서 트리거 후 거리(cm) 측정, 에코가 없으면 None"""
+        if self.echo_timer is not None:
+            return self.echo_timer.measure(self.send_trigger_pulse)
+        return self.measure_echo_busy_wait()
+    
+    def send_trigger_pulse(self):
+        self.gpio.output(self.TRIG_PIN, True)
         time.sleep(0.00001)
-        GPIO.output(self.TRIG_PIN, False)
+        self.gpio.output(self.TRIG_PIN, False)
+    
+    def measure_echo_busy_wait(self):
+        """ECHO 핀을 계속 읽어서 측정 (엣지 검출을 못 쓸 때)"""
+        self.send_trigger_pulse()
         
         pulse_start = time.time()
         pulse_end = time.time()
         
         # Echo 신호 대기
         timeout = time.time() + 0.1  # 100ms 타임아웃
-        while GPIO.input(self.ECHO_PIN) == 0 and time.time() < timeout:
+        while self.gpio.input(self.ECHO_PIN) == 0 and time.time() < timeout:
             pulse_start = time.time()
         
-        while GPIO.input(self.ECHO_PIN) == 1 and time.time() < timeout:
+        while self.gpio.input(self.ECHO_PIN) == 1 and time.time() < timeout:
             pulse_end = time.time()
         
         if pulse_end > pulse_start:
@@ -381,66 +675,122 @@ class ParkingTracker:
         else:
             return None
     
+    def led_off(self):
+        self.gpio.output(self.LED_PIN, self.gpio.LOW)
+    
     def handle_warning(self, cars_near_boundary):
-        """경고 처리"""
+        """경고 처리 (막히지 않음, 초음파 거리는 백그라운드 측정값 사용)"""
         current_time = time.time()
         
-        if cars_near_boundary and (current_time - self.last_warning_time) > self.warning_cooldown:
+        warned = len(cars_near_boundary) > 0
+        if warned:
+            # 차량이 경계 근처에 있는 동안 측정 유지
+            self.ultrasonic.request()
+        
+        if warned and (current_time - self.last_warning_time) > self.warning_cooldown:
             # LED 켜기
-            GPIO.output(self.LED_PIN, GPIO.HIGH)
+            self.gpio.output(self.LED_PIN, self.gpio.HIGH)
             
-            # 초음파 센서 측정
-            distance = self.trigger_ultrasonic()
+            # 초음파 센서 측정값 (첫 경고라 아직 측정 전이면 다음 경고부터 표시)
+            reading = self.ultrasonic.latest(self.ultrasonic_max_age)
             
             print(f"경고! 주차장 경계에 가까운 차량 감지")
-            if distance:
-                print(f"초음파 센서 거리: {distance}cm")
+            if reading:
+                distance, age = reading
+                print(f"초음파 센서 거리: {distance}cm ({age * 1000:.0f}ms 전 측정)")
             
             self.last_warning_time = current_time
             
             # LED를 0.5초 후 끄기
-            threading.Timer(0.5, lambda: GPIO.output(self.LED_PIN, GPIO.LOW)).start()
+            self.led_scheduler.schedule(0.5, self.led_off, key='led')
+        
+        elif not warned:
+            self.gpio.output(self.LED_PIN, self.gpio.LOW)
+    
+    def frame_state(self):
+        """방금 탐지한 프레임의 (주차장 영역, 보정 모드 여부, 주차칸 점유 복사본)
         
-        elif not cars_near_boundary:
-            GPIO.output(self.LED_PIN, GPIO.LOW)
+        process_frame 직후 탐지 스레드에서 불러 프레임과 함께 렌더/출력 단계로 넘긴다.
+        뒤 단계는 트래커 필드 대신 이 스냅샷만 읽으므로 그동안 GUI가 영역을 바꾸거나
+        다음 프레임 탐지가 점유를 갱신해도 한 프레임의 그림과 출력은 서로 맞는다.
+        """
+        rectified = self.rectifier is not None and self.rectifier.ready
+        return self.frame_area, rectified, self.slot_occupancy.occupied.copy()
     
-    def draw_interface(self, frame, detected_cars):
-        """인터페이스 그리기"""
+    def near_boundary_mask(self, detected_cars, state=None):
+        """경계에 가까운 차량 bool 배열 (현재 위치 또는 예측 궤적이 warning_distance 이내)"""
+        area, rectified, _ = state or self.frame_state()
+        if len(area) != 4:
+            return np.zeros(len(detected_cars), dtype=bool)
+        
+        threshold = self.warning_distance_cm if rectified else self.warning_distance
+        return np.minimum(detected_cars['distance'], detected_cars['predicted_distance']) < threshold
+    
+    def find_cars_near_boundary(self, detected_cars):
+        """경계에 가까운 차량만 골라낸 탐지 배열"""
+        return detected_cars[self.near_boundary_mask(detected_cars)]
+    
+    def render_due(self):
+        """이번 출력 프레임을 그려야 하는지 (화면에 표시하거나 저장하거나 송출할 프레임만 그린다)
+        
+        RENDER_NONE / RENDER_SAVE / RENDER_STREAM 중 하나 (그릴 때만 참).
+        --no-render여도 송출을 보는 클라이언트가 있으면 송출용으로 그린다.
+        render_counter는 여기서만 바뀌므로 렌더 단계 한 스레드에서만 부르고, 결정은 프레임과 함께 넘긴다.
+        """
+        self.render_counter += 1
+        if not self.headless:
+            return RENDER_SAVE
+        if self.render_enabled and self.render_counter % self.save_interval == 0:
+            return RENDER_SAVE
+        if self.stream is not None and self.stream.wants_frame():
+            return RENDER_STREAM
+        return RENDER_NONE
+    
+    def draw_interface(self, frame, detected_cars, near_mask=None, state=None):
+        """인터페이스 그리기 (near_mask를 안 주면 여기서 분류), 경계 근처 차량 반환
+        
+        state는 frame_state() 스냅샷 (안 주면 지금 값으로 만든다).
+        """
+        parking_area, rectified, occupied = state or self.frame_state()
+        if near_mask is None:
+            near_mask = self.near_boundary_mask(detected_cars, (parking_area, rectified, occupied))
+        
         # 주차장 영역 그리기
-        if len(self.parking_area) == 4:
-            pts = np.array(self.parking_area, np.int32)
+        if len(parking_area) == 4:
+            pts = np.array(parking_area, np.int32)
             pts = pts.reshape((-1, 1, 2))
             cv2.polylines(frame, [pts], True, (255, 255, 0), 3)  # 두꺼운 노란색 선
             
-            # 반투명 오버레이 추가
-            overlay = frame.copy()
-            cv2.fillPoly(overlay, [pts], (255, 255, 0))
-            cv2.addWeighted(overlay, 0.1, frame, 0.9, 0, frame)
+            # 반투명 오버레이 추가 (영역 ROI 안에서만 합성)
+            self.area_overlay.apply(frame, parking_area)
         
-        # 탐지된 차량 표시
-        cars_near_boundary = []
+        # 주차칸 표시 (점유: 빨간색, 빈 칸: 초록색)
+        occupancy = self.slot_occupancy
+        for slot_id, polygon, slot_occupied in zip(occupancy.slot_ids, occupancy.polygons, occupied):
+            pts = polygon.astype(np.int32).reshape((-1, 1, 2))
+            slot_color = (0, 0, 255) if slot_occupied else (0, 200, 0)
+            cv2.polylines(frame, [pts], True, slot_color, 2)
+            cv2.putText(frame, slot_id, tuple(pts[0, 0].tolist()), cv2.FONT_HERSHEY_SIMPLEX, 0.5, slot_color, 1)
         
-        for car in detected_cars:
-            center = car['center']
-            bbox = car['bbox']
-            color_name = car['color']
+        # 탐지된 차량 표시
+        distance_unit = 'cm' if rectified else 'px'
+        for car, warned in zip(detected_cars, near_mask):
+            center = tuple(car['center'].tolist())
+            name = color_name(car['color'])
             area = car['area']
             
             # 바운딩 박스 그리기
-            x, y, w, h = bbox
-            color_map = {
-                'red': (0, 0, 255), 
-                'blue': (255, 0, 0), 
-                'orange': (0, 165, 255),  # 주황색 추가
-                'yellow': (0, 255, 255)
-            }
-            color = color_map.get(color_name, (0, 255, 0))
+            x, y, w, h = car['bbox'].tolist()
+            color = CAR_DRAW_COLORS.get(name, (0, 255, 0))
             
             cv2.rectangle(frame, (x, y), (x + w, y + h), color, 3)
             cv2.circle(frame, center, 8, color, -1)
             
             # 차량 정보 표시
-            cv2.putText(frame, f"{color_name.upper()}", 
+            label = name.upper()
+            if car['track_id'] != NO_TRACK:
+                label += f" #{car['track_id']}"
+            cv2.putText(frame, label, 
                        (x, y - 35), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
             
             # 좌표 표시
@@ -451,21 +801,17 @@ class ParkingTracker:
             cv2.putText(frame, f"Area: {area}", 
                        (x, y + h + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
             
-            # 경계까지의 거리 계산
-            if len(self.parking_area) == 4:
-                if self.point_in_polygon(center, self.parking_area):
-                    distance_to_boundary = self.calculate_distance_to_boundary(center)
-                    
-                    cv2.putText(frame, f"Dist: {distance_to_boundary:.1f}px", 
-                               (x, y + h + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
-                    
-                    if distance_to_boundary < self.warning_distance:
-                        cars_near_boundary.append(car)
-                        # 경고 표시
-                        cv2.putText(frame, "WARNING!", 
-                                   (x, y - 55), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-                        # 경고 박스
-                        cv2.rectangle(frame, (x-5, y-5), (x + w + 5, y + h + 5), (0, 0, 255), 3)
+            # 경계까지의 거리 (탐지 단계에서 계산한 값)
+            if len(parking_area) == 4:
+                cv2.putText(frame, f"Dist: {car['distance']:.1f}{distance_unit}", 
+                           (x, y + h + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+                
+                if warned:
+                    # 경고 표시
+                    cv2.putText(frame, "WARNING!", 
+                               (x, y - 55), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+                    # 경고 박스
+                    cv2.rectangle(frame, (x-5, y-5), (x + w + 5, y + h + 5), (0, 0, 255), 3)
         
         # 상태 정보 표시 (배경 추가)
         cv2.rectangle(frame, (5, 5), (400, 100), (0, 0, 0), -1)  # 검은 배경
@@ -473,12 +819,12 @@ class ParkingTracker:
         
         cv2.putText(frame, f"Total cars detected: {len(detected_cars)}", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        cv2.putText(frame, f"Cars near boundary: {len(cars_near_boundary)}", 
+        cv2.putText(frame, f"Cars near boundary: {int(np.count_nonzero(near_mask))}", 
                    (10, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        cv2.putText(frame, f"Parking area: {'SET' if len(self.parking_area) == 4 else 'NOT SET'}", 
+        cv2.putText(frame, f"Parking area: {'SET' if len(parking_area) == 4 else 'NOT SET'}", 
                    (10, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
         
-        return cars_near_boundary
+        return detected_cars[near_mask]
     
     def run(self):
         """메인 실행 루프"""
@@ -499,63 +845,50 @@ class ParkingTracker:
             print("'q' - 종료")
             print("먼저 's'를 눌러서 주차장 영역을 설정해라!")
         
+        if self.pipelined:
+            print("파이프라인 모드: 캡처/탐지/렌더/출력을 별도 스레드로 실행한다.")
+            pipeline = FramePipeline(self)
+            try:
+                pipeline.run()
+            except KeyboardInterrupt:
+                print("프로그램 종료")
+            finally:
+                dropped = pipeline.dropped_counts()
+                print(f"드롭된 프레임: 캡처 {dropped['capture']}, 렌더 {dropped['render']}, "
+                      f"출력 {dropped['output']} / 캡처 {pipeline.captured}")
+                self.cleanup()
+            return
+        
         try:
             while True:
-                ret, frame = self.cap.read()
+                with self.metrics.stage('capture'):
+                    ret, frame = self.cap.read()
                 if not ret:
                     print("카메라에서 프레임을 읽을 수 없다")
                     break
                 
-                self.frame_count += 1
+                # 차량 탐지 및 추적
+                detected_cars = self.process_frame(frame)
+                state = self.frame_state()
                 
-                # 차량 탐지
-                detected_cars = self.detect_cars_by_color(frame)
-                
-                # 인터페이스 그리기 및 경고 확인
-                cars_near_boundary = self.draw_interface(frame, detected_cars)
+                # 경고 확인, 화면에 표시하거나 저장할 프레임만 그리기
+                near_mask = self.near_boundary_mask(detected_cars, state)
+                cars_near_boundary = detected_cars[near_mask]
+                rendered = self.render_due()
+                if rendered:
+                    with self.metrics.stage('draw'):
+                        self.draw_interface(frame, detected_cars, near_mask, state)
                 
                 # 경고 처리
-                self.handle_warning(cars_near_boundary)
+                with self.metrics.stage('warning'):
+                    self.handle_warning(cars_near_boundary)
                 
-                # 콘솔 출력 (상태 정보)
-                if self.frame_count % 30 == 0:  # 30프레임마다 출력
-                    print(f"프레임 {self.frame_count}: 탐지된 차량 {len(detected_cars)}대, "
-                          f"경계 근처 {len(cars_near_boundary)}대")
-                    
-                    for i, car in enumerate(detected_cars):
-                        center = car['center']
-                        color = car['color']
-                        print(f"  차량 {i+1}: {color} 색상, 위치 ({center[0]}, {center[1]})")
+                if not self.handle_output(frame, detected_cars, cars_near_boundary, rendered, state):
+                    break
                 
-                if self.headless:
-                    # 헤드리스 모드: 주기적으로 이미지 저장
-                    if self.frame_count % self.save_interval == 0:
-                        filename = f"output_{self.frame_count:04d}.jpg"
-                        cv2.imwrite(filename, frame)
-                        print(f"이미지 저장: {filename}")
-                    
+                if self.headless and self.headless_delay:
                     # 짧은 딜레이
-                    time.sleep(0.1)
-                    
-                else:
-                    # GUI 모드: 화면 표시
-                    cv2.imshow('Parking Tracker', frame)
-                    
-                    # 키 입력 처리
-                    key = cv2.waitKey(1) & 0xFF
-                    if key == ord('q'):
-                        break
-                    elif key == ord('s'):
-                        self.setup_parking_area(frame)
-                    elif key == ord('r'):
-                        self.parking_area = []
-                        print("주차장 영역 리셋!")
-                    elif key == ord('c'):
-                        # 색상 범위 조정 모드 (추가 기능)
-                        print("현재 색상 범위:")
-                        for color, (lower, upper) in self.color_ranges.items():
-                            if color != 'red2':
-                                print(f"  {color}: {lower} ~ {upper}")
+                    time.sleep(self.headless_delay)
                 
         except KeyboardInterrupt:
             print("프로그램 종료")
@@ -563,22 +896,151 @@ class ParkingTracker:
         finally:
             self.cleanup()
     
+    def handle_output(self, frame, detected_cars, cars_near_boundary, rendered=True, state=None):
+        """프레임 하나의 결과 출력 (콘솔, 이미지 저장 또는 화면 표시), 종료 요청 시 False
+        
+        헤드리스 모드에서는 저장용으로 그려진 프레임(RENDER_SAVE)만 저장하고, 그려진 프레임은 모두 송출에 넘긴다.
+        state는 이 프레임의 frame_state() 스냅샷 (주차칸 점유 출력용).
+        """
+        self.frame_count += 1
+        self.metrics.tick()
+        
+        # 콘솔 출력 (상태 정보)
+        if self.frame_count % 30 == 0:  # 30프레임마다 출력
+            print(f"프레임 {self.frame_count}: 탐지된 차량 {len(detected_cars)}대, "
+                  f"경계 근처 {len(cars_near_boundary)}대, {self.metrics.fps():.1f} fps")
+            
+            if self.motion_gating:
+                print(f"  모션 게이트: 탐지 생략 {self.motion_gate.skipped_total}/{self.motion_gate.checked}프레임 "
+                      f"({self.motion_gate.hit_rate() * 100:.1f}%), 변화율 {self.motion_gate.last_motion * 100:.2f}%")
+            
+            if len(self.slot_occupancy):
+                _, _, occupied = state or self.frame_state()
+                print(f"  주차칸 점유: {int(occupied.sum())}/{len(occupied)} "
+                      f"(비트맵 {np.packbits(occupied).tobytes().hex()})")
+            
+            if self.stream is not None and self.stream.clients:
+                print(f"  화면 송출: 클라이언트 {self.stream.clients}명, 인코딩 {self.stream.encoded}, "
+                      f"클라이언트 드롭 {self.stream.client_dropped}")
+            
+            for i, car in enumerate(detected_cars):
+                center = car['center']
+                print(f"  차량 {i+1}: {color_name(car['color'])} 색상, 위치 ({center[0]}, {center[1]})")
+        
+        # 그려진 프레임을 송출 (클라이언트가 없으면 인코딩하지 않음)
+        if rendered and self.stream is not None:
+            with self.metrics.stage('stream'):
+                self.stream.publish(frame)
+        
+        if self.headless:
+            # 헤드리스 모드: 주기적으로 (그려진 프레임만) 이미지 저장
+            if rendered == RENDER_SAVE:
+                filename = f"output_{self.frame_count:04d}.jpg"
+                # 인코딩/저장은 백그라운드 스레드에서 (탐지 루프는 디스크를 기다리지 않음)
+                with self.metrics.stage('save'):
+                    self.frame_writer.submit(filename, frame)
+                print(f"이미지 저장: {filename} (대기 {len(self.frame_writer.queue)}, "
+                      f"버림 {self.frame_writer.dropped})")
+            return True
+        
+        # GUI 모드: 화면 표시
+        cv2.imshow('Parking Tracker', frame)
+        
+        # 키 입력 처리
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            return False
+        elif key == ord('s'):
+            self.setup_parking_area(frame)
+        elif key == ord('r'):
+            self.parking_area = ()
+            print("주차장 영역 리셋!")
+        elif key == ord('c'):
+            # 색상 범위 조정 모드 (추가 기능)
+            print("현재 색상 범위:")
+            for color, (lower, upper) in self.color_ranges.items():
+                if color != 'red2':
+                    print(f"  {color}: {lower} ~ {upper}")
+        return True
+    
     def cleanup(self):
         """정리 작업"""
+        if self.metrics.frames:
+            print("단계별 지연:")
+            print(self.metrics.format_summary())
+        self.metrics.close()
+        self.ultrasonic.close()
+        self.led_scheduler.close(run_pending=True)
+        if self.echo_timer is not None:
+            self.echo_timer.close()
+        self.frame_writer.close()
+        if self.stream is not None:
+            self.stream.close()
         if self.cap:
             self.cap.release()
         if not self.headless:
             cv2.destroyAllWindows()
-        GPIO.cleanup()
+        self.gpio.cleanup()
         print("정리 완료")
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="미니카 주차장 추적 시스템")
+    # GUI 모드로 실행 (사용자가 GUI로 하겠다고 했으므로), --headless면 화면 없이 실행
+    parser.add_argument('--headless', action='store_true', help="화면 없이 실행, 주기적으로 이미지 저장")
+    parser.add_argument('--pipeline', action='store_true', help="캡처/탐지/렌더/출력 스레드 분리 모드")
+    parser.add_argument('--scale', type=float, default=1.0, help="탐지 처리 배율 (예: 0.5)")
+    parser.add_argument('--refine', action='store_true', help="축소 탐지 후보를 전체 해상도로 재측정")
+    parser.add_argument('--motion-gate', action='store_true', help="정지 프레임 탐지 생략")
+    parser.add_argument('--detect-interval', type=int, default=1, help="N프레임마다 전체 탐지")
+    parser.add_argument('--source', help="카메라 대신 사용할 동영상 파일, 이미지 디렉토리 또는 이미지 파일")
+    parser.add_argument('--parallel-probe', action='store_true', help="카메라 캐시 실패 시 디바이스 동시 탐색")
+    parser.add_argument('--probe-timeout', type=float, default=3.0, help="--parallel-probe 시간 제한 (초)")
+    parser.add_argument('--fps', type=float, help="--source 재생 속도 (기본: 최대 속도)")
+    parser.add_argument('--stub-gpio', action='store_true', help="RPi.GPIO 대신 가짜 GPIO 사용")
+    parser.add_argument('--no-render', action='store_true', help="헤드리스 모드에서 그리기와 이미지 저장 생략")
+    parser.add_argument('--jpeg-quality', type=int, default=95, help="헤드리스 저장 이미지 JPEG 품질")
+    parser.add_argument('--keep-images', type=int, help="output_XXXX.jpg 최대 보관 개수")
+    parser.add_argument('--rectify', help="주차장 영역 실제 크기 WxH (cm), 영역만 위에서 본 이미지로 펴서 탐지")
+    parser.add_argument('--px-per-cm', type=float, default=2.0, help="--rectify 이미지 해상도")
+    parser.add_argument('--slots', help="주차칸 설정 JSON 파일 (칸별 점유 판정)")
+    parser.add_argument('--stream-port', type=int, help="그려진 화면을 http://<주소>:포트/ MJPEG로 송출")
+    parser.add_argument('--stream-fps', type=float, help="--stream-port 최대 송출 fps")
+    parser.add_argument('--stream-quality', type=int, default=80, help="--stream-port JPEG 품질")
+    parser.add_argument('--metrics-port', type=int, help="GET /metrics 로 단계별 지연 스냅샷 제공")
+    parser.add_argument('--metrics-file', default='metrics.json', help="SIGUSR1 수신 시 스냅샷 저장 경로")
+    args = parser.parse_args()
+    
+    source = None
+    if args.source:
+        source = open_source(args.source, fps=args.fps)
+    
+    gpio = None
+    if args.stub_gpio:
+        gpio = StubGPIO()
+    
+    tracker = ParkingTracker(headless=args.headless, pipelined=args.pipeline, source=source, gpio=gpio,
+                             parallel_probe=args.parallel_probe, probe_timeout=args.probe_timeout)
+    tracker.processing_scale = args.scale
+    tracker.refine_full_resolution = args.refine
+    tracker.motion_gating = args.motion_gate
+    tracker.detect_interval = args.detect_interval
+    tracker.render_enabled = not args.no_render
+    tracker.frame_writer.jpeg_quality = args.jpeg_quality
+    tracker.frame_writer.set_retention(args.keep_images)
+    
+    if args.rectify:
+        width_cm, height_cm = (float(v) for v in args.rectify.lower().split('x'))
+        tracker.enable_rectification(width_cm, height_cm, args.px_per_cm)
+    if args.slots:
+        tracker.load_slot_config(args.slots)
+    if args.stream_port:
+        tracker.start_stream(args.stream_port, args.stream_quality, args.stream_fps)
     
-    # GUI 모드로 실행 (사용자가 GUI로 하겠다고 했으므로)
-    headless = False
-    if len(sys.argv) > 1 and sys.argv[1] == '--headless':
-        headless = True
+    # 단계별 지연 스냅샷 (kill -USR1 <pid>, --metrics-port)
+    tracker.metrics.install_signal_handler(args.metrics_file)
+    if args.metrics_port:
+        tracker.metrics.serve_http(args.metrics_port)
     
-    tracker = ParkingTracker(headless=headless)
-    tracker.run()
\ No newline at end of file
+    tracker.run()